@@ -5,7 +5,7 @@ experiments
 from .common import WorkflowError, Uninit, WORKFLOW_DEFAULT_FILENAME
 from .core import get_graph, begin_graph
 from .decorators import graph
-from .resource import FSResource, MultiResource, NilResource
+from .resource import FSResource, DirResource, MultiResource, NilResource
 from . import shell
 from .command import open_graph
 from .userargument import UserArgument
@@ -3,20 +3,38 @@ rflow.
 """
 
 import os
+import time
+import shutil
 import pickle
+import tempfile
+import threading
+import weakref
 from enum import Enum
 from collections import namedtuple
+from contextlib import contextmanager
 from inspect import isfunction
 
 import lmdb
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 from .common import Uninit, WorkflowError, BaseNode
 from .resource import Resource
+from ._encoding import encode, decode, is_encoded, FormatError
 from ._util import is_eq_override
 from ._ui import ui
 
 _LAMBDA_NAME = (lambda x: x).__name__
 
+BATCH_FLUSH_SIZE = 1000
+BATCH_FLUSH_INTERVAL = 5.0
+
+MAP_SIZE_ENV = "RFLOW_DB_MAP_SIZE"
+DEFAULT_MAP_SIZE = 10 << 20
+
 
 def _can_object_be_graph_argument(obj):
     if obj is None:
@@ -126,32 +144,406 @@ def get_sig_difference(other_args, curr_args):
     return diff_dict
 
 
+def _decode_record(value):
+    if not is_encoded(value):
+        # Legacy records, written before the encoding was versioned.
+        return pickle.loads(value)
+    try:
+        return decode(value)
+    except FormatError as exp:
+        raise WorkflowError("Can't read the workflow database: {}".format(
+            exp))
+
+
+def _get_locks_dir(database_path):
+    return os.path.join(database_path, "locks")
+
+
+def _lock_env(database_path):
+    # The shared lock held while the database is opened, see
+    # ArgumentSignatureDB.compact.
+    if fcntl is None:
+        return None
+    locks_dir = _get_locks_dir(database_path)
+    os.makedirs(locks_dir, exist_ok=True)
+    # Kept open by the process, like the environment.
+    lock_fd = os.open(os.path.join(locks_dir, "env.lock"),
+                      os.O_RDWR | os.O_CREAT)
+    fcntl.flock(lock_fd, fcntl.LOCK_SH)
+    return lock_fd
+
+
+class _Batch:
+    # Writes not committed yet and values already read, shared by all
+    # instances on the same database.
+    def __init__(self, flush_size, flush_interval):
+        self.depth = 0
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.values = {}
+        self.pending = {}
+        self.prefixes = set()
+        self.last_flush = time.monotonic()
+        self.lock = threading.RLock()
+
+
 class ArgumentSignatureDB:
     """
     Store and retrive node's argument signatures.
+
+    Inside :func:`batch`, reads come from a snapshot prefetched by
+    graph, and writes are committed together.
+
+    The LMDB map size doubles whenever a write doesn't fit on it.
+
+    Several processes can use the same database at once: LMDB
+    serializes their writes, stale reader slots of dead processes are
+    cleared when opening, and map growths of other processes are
+    adopted. Processes should still avoid evaluating the same node
+    twice, see :func:`rflow.node.Node.call`. Environments must not be
+    used across `fork`.
+
+    Processes hold a shared lock on `locks/env.lock` while they have
+    the database opened, so :func:`compact` can tell if it's used by
+    others.
     """
 
     __g_env = {}
+    __g_env_lock = {}
+    __g_dbs = weakref.WeakSet()
+    __g_batch = {}
+    __g_batch_lock = threading.Lock()
+    __g_write_lock = threading.Lock()
 
     def __init__(self):
         self.dbenv = None
+        self.database_path = None
 
-    def open(self, database_path):
+    def open(self, database_path, map_size=None):
         """
         Opens the database with the given path.
 
         Args:
 
             database_path (str): Path to lmdb database.
+
+            map_size (int, optional): Initial maximum size in bytes,
+             defaults to the `RFLOW_DB_MAP_SIZE` environment variable
+             or :data:`DEFAULT_MAP_SIZE`. Only used by the first
+             instance opening the path.
         """
         database_path = os.path.abspath(database_path)
+        self.database_path = database_path
 
         if database_path not in ArgumentSignatureDB.__g_env:
-            dbenv = lmdb.open(database_path)
+            if map_size is None:
+                map_size = int(os.environ.get(MAP_SIZE_ENV,
+                                              DEFAULT_MAP_SIZE))
+            ArgumentSignatureDB.__g_env_lock[database_path] = _lock_env(
+                database_path)
+            dbenv = lmdb.open(database_path, map_size=map_size)
+            # Frees the reader slots left by killed processes.
+            dbenv.reader_check()
             ArgumentSignatureDB.__g_env[database_path] = dbenv
             self.dbenv = dbenv
         else:
             self.dbenv = ArgumentSignatureDB.__g_env[database_path]
+        ArgumentSignatureDB.__g_dbs.add(self)
+
+    def _begin(self, write=False):
+        try:
+            return self.dbenv.begin(write=write)
+        except lmdb.MapResizedError:
+            # Another process grew the map.
+            self.dbenv.set_mapsize(0)
+            return self.dbenv.begin(write=write)
+
+    def _write(self, write_func):
+        with ArgumentSignatureDB.__g_write_lock:
+            while True:
+                try:
+                    with self._begin(write=True) as txn:
+                        write_func(txn)
+                    return
+                except lmdb.MapFullError:
+                    # The failed transaction was aborted, so the map
+                    # can be resized.
+                    self.dbenv.set_mapsize(
+                        self.dbenv.info()['map_size'] * 2)
+
+    def compact(self):
+        """Rewrites the database without its free pages and swaps it
+        in, for all instances opened on the same path. The pending
+        writes of the current batch are committed first. Only the data
+        file is replaced, the lock files are kept.
+
+        Returns:
+            Tuple[int, int]: The database file size in bytes before
+            and after.
+
+        Raises:
+            WorkflowError: If other processes have the database opened,
+             as they would keep writing to the replaced file.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+
+        self.flush()
+        with ArgumentSignatureDB.__g_write_lock:
+            path = self.database_path
+            lock_fd = ArgumentSignatureDB.__g_env_lock.get(path)
+            if lock_fd is not None:
+                try:
+                    fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Converting the lock may have released it.
+                    fcntl.flock(lock_fd, fcntl.LOCK_SH)
+                    raise WorkflowError(
+                        "Can't compact {}: other processes have it "
+                        "opened".format(path))
+
+            try:
+                return self._swap_compacted()
+            finally:
+                if lock_fd is not None:
+                    fcntl.flock(lock_fd, fcntl.LOCK_SH)
+
+    def _swap_compacted(self):
+        path = self.database_path
+        before = self._get_file_size()
+        map_size = self.dbenv.info()['map_size']
+
+        compact_path = tempfile.mkdtemp(dir=path, prefix=".compact-")
+        try:
+            self.dbenv.copy(compact_path, compact=True)
+            self.dbenv.close()
+            os.replace(os.path.join(compact_path, "data.mdb"),
+                       os.path.join(path, "data.mdb"))
+            # Holds the reader table of the replaced file.
+            lock_mdb = os.path.join(path, "lock.mdb")
+            if os.path.exists(lock_mdb):
+                os.remove(lock_mdb)
+        finally:
+            shutil.rmtree(compact_path)
+
+        dbenv = lmdb.open(path, map_size=map_size)
+        ArgumentSignatureDB.__g_env[path] = dbenv
+        for database in ArgumentSignatureDB.__g_dbs:
+            if database.database_path == path:
+                database.dbenv = dbenv
+        return before, self._get_file_size()
+
+    def migrate(self):
+        """Rewrites the records stored as pickles by older versions on
+        the current encoding, see :mod:`rflow._encoding`. Records that
+        can't be unpickled anymore are kept as they are.
+
+        Returns:
+            Tuple[int, int]: The number of migrated and not migrated
+            records.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+
+        self.flush()
+        migrated = {}
+        failed = 0
+        with self._begin(write=False) as txn:
+            for key, value in txn.cursor():
+                if is_encoded(value):
+                    continue
+                try:
+                    migrated[key] = encode(pickle.loads(value))
+                except Exception:  # pylint: disable=broad-except
+                    failed += 1
+
+        def _write_migrated(txn):
+            for key, value in migrated.items():
+                txn.put(key, value)
+        self._write(_write_migrated)
+        return len(migrated), failed
+
+    def _get_file_size(self):
+        return os.path.getsize(os.path.join(self.database_path, "data.mdb"))
+
+    def get_stats(self):
+        """Reports the database usage. Keys are grouped by graph name,
+        or by kind for the ones shared by graphs, like `__digest__`
+        for file digests.
+
+        Returns:
+            dict: The LMDB `map_size`, `file_size`, `page_size`, the
+            number of `entries` and `used_pages`, and `groups`, with the
+            `entries`, `bytes` and estimated `pages` of each group.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+        self.flush()
+
+        groups = {}
+        with self._begin(write=False) as txn:
+            stat = txn.stat()
+            for key, value in txn.cursor():
+                group = groups.setdefault(key.split(b':', 1)[0].decode(),
+                                          {"entries": 0, "bytes": 0})
+                group["entries"] += 1
+                group["bytes"] += len(key) + len(value)
+
+        page_size = stat['psize']
+        for group in groups.values():
+            group["pages"] = -(-group["bytes"] // page_size)
+        return {
+            "map_size": self.dbenv.info()['map_size'],
+            "file_size": self._get_file_size(),
+            "page_size": page_size,
+            "entries": stat['entries'],
+            "used_pages": (stat['branch_pages'] + stat['leaf_pages']
+                           + stat['overflow_pages']),
+            "groups": groups}
+
+    @contextmanager
+    def batch(self, flush_size=BATCH_FLUSH_SIZE,
+              flush_interval=BATCH_FLUSH_INTERVAL):
+        """Groups reads and writes until the context exits. The first
+        read of a graph's key prefetches all the graph's signatures,
+        measurements and timings in one scan. Writes are visible to
+        later reads, but only committed on sync points: when the
+        outermost batch exits, on :func:`flush`, or when `flush_size`
+        writes or `flush_interval` seconds are pending. Nested batches
+        join the outermost one.
+
+        Args:
+
+            flush_size (int): Maximum number of pending writes.
+
+            flush_interval (float): Maximum seconds between commits.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+
+        with ArgumentSignatureDB.__g_batch_lock:
+            batch = ArgumentSignatureDB.__g_batch.get(self.database_path)
+            if batch is None:
+                batch = _Batch(flush_size, flush_interval)
+                ArgumentSignatureDB.__g_batch[self.database_path] = batch
+            batch.depth += 1
+
+        try:
+            yield self
+        finally:
+            with ArgumentSignatureDB.__g_batch_lock:
+                batch.depth -= 1
+                if batch.depth == 0:
+                    del ArgumentSignatureDB.__g_batch[self.database_path]
+            if batch.depth == 0:
+                self._commit(batch)
+
+    def flush(self):
+        """Commits the pending writes of the current batch, if any.
+        """
+        batch = self._get_batch()
+        if batch is not None:
+            self._commit(batch)
+
+    def refresh(self, graph_id, node_id):
+        """Reads again a node's records that the current batch has
+        already read, as other processes may have written them. The
+        node's pending writes are kept.
+
+        Args:
+
+            graph_id (str): The source graph's name.
+
+            node_id (str): The source node's name.
+        """
+        batch = self._get_batch()
+        if batch is None:
+            return
+
+        keys = [db_id.encode() for db_id in (
+            self._get_db_id(graph_id, node_id),
+            self._get_db_meas_id(graph_id, node_id),
+            self._get_db_timing_id(graph_id, node_id),
+            self._get_db_metrics_index_id(graph_id, node_id))]
+        with batch.lock, self._begin() as txn:
+            for key in keys:
+                if key not in batch.pending:
+                    batch.values[key] = txn.get(key)
+
+    def get_lock_path(self, graph_id, node_id):
+        """Returns the file that processes lock while evaluating a
+        node, see :func:`rflow._util.file_lock`.
+        """
+        return os.path.join(
+            _get_locks_dir(self.database_path), "{}.lock".format(
+                self._get_db_id(graph_id, node_id).replace(os.sep, '_')))
+
+    def _get_batch(self):
+        return ArgumentSignatureDB.__g_batch.get(self.database_path)
+
+    def _commit(self, batch):
+        def _write_pending(txn):
+            for key, value in batch.pending.items():
+                if value is None:
+                    txn.delete(key)
+                else:
+                    txn.put(key, value)
+
+        with batch.lock:
+            if batch.pending:
+                self._write(_write_pending)
+                batch.pending = {}
+            batch.last_flush = time.monotonic()
+
+    def _prefetch(self, batch, prefix):
+        with self._begin(write=False) as txn:
+            cursor = txn.cursor()
+            if cursor.set_range(prefix):
+                for key, value in cursor:
+                    if not key.startswith(prefix):
+                        break
+                    batch.values.setdefault(key, value)
+        batch.prefixes.add(prefix)
+
+    def _get(self, db_id, graph_id=None):
+        key = db_id.encode()
+        batch = self._get_batch()
+        if batch is None:
+            with self._begin(write=False) as txn:
+                return txn.get(key)
+
+        with batch.lock:
+            if key in batch.values:
+                return batch.values[key]
+
+            if graph_id is not None:
+                prefix = self._get_db_id(graph_id, '').encode()
+                if prefix not in batch.prefixes:
+                    self._prefetch(batch, prefix)
+                return batch.values.get(key)
+
+            with self._begin(write=False) as txn:
+                value = batch.values[key] = txn.get(key)
+            return value
+
+    def _put(self, db_id, value):
+        key = db_id.encode()
+        batch = self._get_batch()
+        if batch is None:
+            self._write(lambda txn: (txn.delete(key) if value is None
+                                     else txn.put(key, value)))
+            return
+
+        with batch.lock:
+            batch.values[key] = value
+            batch.pending[key] = value
+            if (len(batch.pending) >= batch.flush_size
+                    or time.monotonic() - batch.last_flush
+                    >= batch.flush_interval):
+                self._commit(batch)
+
+    def _delete(self, db_id):
+        self._put(db_id, None)
 
     def get_argsignature(self, graph_id, node_id):
         """Retrieves a node's arguments signature.
@@ -170,16 +562,15 @@ class ArgumentSignatureDB:
         if self.dbenv is None:
             raise WorkflowError('Database is not opened')
         sig_id = self._get_db_id(graph_id, node_id)
-        with self.dbenv.begin(write=False) as txn:
-            value = txn.get(sig_id.encode())
-            if value is not None:
-                try:
-                    return pickle.loads(value)
-                except AttributeError:
-                    return {}  # ignore attribute errors and return as
-                    # empty dict.
-                except ModuleNotFoundError:
-                    return {}
+        value = self._get(sig_id, graph_id)
+        if value is not None:
+            try:
+                return _decode_record(value)
+            except AttributeError:
+                return {}  # ignore attribute errors and return as
+                # empty dict.
+            except ModuleNotFoundError:
+                return {}
         return {}
 
     def update_argsignature(self, graph_id, node_id, arg_sig):
@@ -197,9 +588,7 @@ class ArgumentSignatureDB:
         if self.dbenv is None:
             raise WorkflowError('Database is not opened')
         sig_id = self._get_db_id(graph_id, node_id)
-        with self.dbenv.begin(write=True) as txn:
-            txn.put(sig_id.encode(), pickle.dumps(
-                arg_sig, pickle.HIGHEST_PROTOCOL))
+        self._put(sig_id, encode(arg_sig))
 
     def clean_node(self, graph_id, node_id):
         """Deletes the node's previous signature.
@@ -213,8 +602,7 @@ class ArgumentSignatureDB:
         """
 
         sig_id = self._get_db_id(graph_id, node_id)
-        with self.dbenv.begin(write=True) as txn:
-            txn.delete(sig_id.encode())
+        self._delete(sig_id)
 
     def get_measurement(self, graph_id, node_id):
         """Retrieve from the workflow database a node's measurement
@@ -234,10 +622,9 @@ class ArgumentSignatureDB:
         if self.dbenv is None:
             raise WorkflowError('Database is not opened')
         meas_id = self._get_db_meas_id(graph_id, node_id)
-        with self.dbenv.begin(write=False) as txn:
-            value = txn.get(meas_id.encode())
-            if value is not None:
-                return pickle.loads(value)
+        value = self._get(meas_id, graph_id)
+        if value is not None:
+            return _decode_record(value)
         return {}
 
     def set_measurement(self, graph_id, node_id, meas_dict):
@@ -256,9 +643,415 @@ class ArgumentSignatureDB:
             raise WorkflowError('Database is not opened')
 
         meas_id = self._get_db_meas_id(graph_id, node_id)
-        with self.dbenv.begin(write=True) as txn:
-            txn.put(meas_id.encode(), pickle.dumps(
-                meas_dict, pickle.HIGHEST_PROTOCOL))
+        self._put(meas_id, encode(meas_dict))
+
+    def get_timing(self, graph_id, node_id):
+        """Retrieve from the workflow database a node's call durations.
+
+        Args:
+
+            graph_id (str): The source graph's name.
+
+            node_id (str): The source node's name.
+
+        Returns:
+
+            dict: The timing dict, see :func:`rflow.node.Node.get_timing`.
+
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+        timing_id = self._get_db_timing_id(graph_id, node_id)
+        value = self._get(timing_id, graph_id)
+        if value is not None:
+            return _decode_record(value)
+        return {}
+
+    def set_timing(self, graph_id, node_id, timing):
+        """Save to the workflow database a node's call durations.
+
+        Args:
+
+            graph_id (str): The source graph's name.
+
+            node_id (str): The source node's name.
+
+            timing (dict): The timing dict, see
+             :func:`rflow.node.Node.get_timing`.
+        """
+
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+
+        timing_id = self._get_db_timing_id(graph_id, node_id)
+        self._put(timing_id, encode(timing))
+
+    def append_metrics(self, graph_id, node_id, points):
+        """Appends points to a node's metric streams, see
+        :func:`rflow.node.Node.log_metric`. Points are stored under
+        keys sorted by step, all written on the same transaction.
+
+        Args:
+
+            graph_id (str): The source graph's name.
+
+            node_id (str): The source node's name.
+
+            points (List[Tuple[str, int, float, object]]): The metric
+             name, step, time in seconds since the epoch and value of
+             each point.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+
+        index_id = self._get_db_metrics_index_id(graph_id, node_id)
+        with self.batch():
+            value = self._get(index_id, graph_id)
+            index = _decode_record(value) if value is not None else {}
+            for name, step, point_time, point_value in points:
+                if not isinstance(step, int) or step < 0:
+                    raise WorkflowError(
+                        '{}: Metric `{}` step must be a non-negative integer, got {!r}'.format(
+                            node_id, name, step))
+                self._put(self._get_db_metric_id(graph_id, node_id, name)
+                          + self._get_metric_step_key(step),
+                          encode((point_time, point_value)))
+                count, last_step, last_value = index.get(name, (0, -1, None))
+                if step >= last_step:
+                    last_step, last_value = step, point_value
+                index[name] = (count + 1, last_step, last_value)
+            self._put(index_id, encode(index))
+
+    def get_metric_index(self, graph_id, node_id):
+        """Retrieves a summary of a node's metric streams, without
+        reading their points.
+
+        Args:
+
+            graph_id (str): The source graph's name.
+
+            node_id (str): The source node's name.
+
+        Returns:
+            Dict[str: Tuple[int, int, object]]: The number of points,
+            the last step and its value of each metric name.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+        value = self._get(self._get_db_metrics_index_id(graph_id, node_id),
+                          graph_id)
+        if value is not None:
+            return _decode_record(value)
+        return {}
+
+    def get_metrics(self, graph_id, node_id, name=None, start=None,
+                    stop=None):
+        """Reads a node's metric streams. Only the keys in the
+        requested step range are read.
+
+        Args:
+
+            graph_id (str): The source graph's name.
+
+            node_id (str): The source node's name.
+
+            name (str, optional): Only this metric, defaults to all.
+
+            start (int, optional): First step to read.
+
+            stop (int, optional): Step where to stop reading, not
+             included.
+
+        Returns:
+            Dict[str: List[Tuple[int, float, object]]]: The step, time
+            and value of each point of each metric, ordered by step.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+
+        names = ([name] if name is not None
+                 else sorted(self.get_metric_index(graph_id, node_id)))
+        self.flush()
+        metrics = {}
+        with self._begin(write=False) as txn:
+            cursor = txn.cursor()
+            for metric_name in names:
+                prefix = self._get_db_metric_id(
+                    graph_id, node_id, metric_name).encode()
+                start_key = prefix
+                if start is not None:
+                    start_key += self._get_metric_step_key(start).encode()
+                stop_key = (prefix + self._get_metric_step_key(stop).encode()
+                            if stop is not None else None)
+
+                points = []
+                if cursor.set_range(start_key):
+                    for key, value in cursor:
+                        step_key = key[len(prefix):]
+                        if (not key.startswith(prefix)
+                                or not step_key.isdigit()
+                                or stop_key is not None and key >= stop_key):
+                            break
+                        point_time, point_value = _decode_record(value)
+                        points.append((int(step_key), point_time,
+                                       point_value))
+                metrics[metric_name] = points
+        return metrics
+
+    def clear_metrics(self, graph_id, node_id):
+        """Deletes all the node's metric streams.
+
+        Args:
+
+            graph_id (str): The source graph's name.
+
+            node_id (str): The source node's name.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+
+        index = self.get_metric_index(graph_id, node_id)
+        if not index:
+            return
+
+        self.flush()
+        keys = []
+        with self._begin(write=False) as txn:
+            cursor = txn.cursor()
+            for name in index:
+                prefix = self._get_db_metric_id(graph_id, node_id,
+                                                name).encode()
+                if cursor.set_range(prefix):
+                    for key in cursor.iternext(values=False):
+                        if not key.startswith(prefix):
+                            break
+                        keys.append(key.decode())
+        with self.batch():
+            for key in keys:
+                self._delete(key)
+            self._delete(self._get_db_metrics_index_id(graph_id, node_id))
+
+    def get_file_digest(self, filepath, stat_key):
+        """Retrieves a file's cached content digest.
+
+        Args:
+
+            filepath (str): The file's absolute path.
+
+            stat_key (tuple): The file's size, modification time and
+             inode. The cached digest is only returned if they're the
+             same as when it was stored.
+
+        Returns:
+            str: The digest or `None` if not cached.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+        value = self._get(self._get_db_digest_id(filepath))
+        if value is not None:
+            cached_key, digest = _decode_record(value)
+            if cached_key == stat_key:
+                return digest
+        return None
+
+    def set_file_digest(self, filepath, stat_key, digest):
+        """Caches a file's content digest. Overwrites the previous
+        value of the same file.
+
+        Args:
+
+            filepath (str): The file's absolute path.
+
+            stat_key (tuple): The file's size, modification time and
+             inode.
+
+            digest (str): The content digest.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+        self._put(self._get_db_digest_id(filepath), encode((stat_key, digest)))
+
+    def get_tree_entries(self, dirpath):
+        """Retrieves the cached file digests of a directory, see
+        :func:`rflow._digest.tree_digest`.
+
+        Args:
+
+            dirpath (str): The directory's absolute path.
+
+        Returns:
+            Dict[str: Tuple[tuple, str]]: The stat key and digest of
+            each file name. An empty dictionary if not cached.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+        value = self._get(self._get_db_tree_id(dirpath))
+        if value is not None:
+            return _decode_record(value)
+        return {}
+
+    def set_tree_entries(self, dirpath, entries):
+        """Caches the file digests of a directory. Overwrites the
+        previous value.
+
+        Args:
+
+            dirpath (str): The directory's absolute path.
+
+            entries (Dict[str: Tuple[tuple, str]]): The stat key and
+             digest of each file name.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+        self._put(self._get_db_tree_id(dirpath), encode(entries))
+
+    def touch_access(self, graph_id, paths, access_time=None):
+        """Records that files produced by the graph's nodes, or
+        artifact cache entries, were used, see
+        :func:`rflow.garbage.collect`.
+
+        Args:
+
+            graph_id (str): The graph's name.
+
+            paths (List[str]): The absolute paths.
+
+            access_time (float, optional): The access time in seconds
+             since the epoch, defaults to now.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+        if access_time is None:
+            access_time = time.time()
+        with self.batch():
+            for path in paths:
+                access_id = self._get_db_access_id(graph_id, path)
+                value = self._get(access_id)
+                created = (_decode_record(value)[0] if value is not None
+                           else access_time)
+                # The flag tells apart the records of older versions,
+                # which could be user input files.
+                self._put(access_id, encode((created, access_time, True)))
+
+    def get_access_times(self, graph_id):
+        """Retrieves the node produced files and artifact entries used
+        by a graph.
+
+        Args:
+
+            graph_id (str): The graph's name.
+
+        Returns:
+            Dict[str: Tuple[float, float]]: The time when each path
+            was first and last used.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+        prefix = self._get_db_access_id(graph_id, '').encode()
+        access_times = {}
+        self.flush()
+        with self._begin(write=False) as txn:
+            cursor = txn.cursor()
+            if cursor.set_range(prefix):
+                for key, value in cursor:
+                    if not key.startswith(prefix):
+                        break
+                    record = _decode_record(value)
+                    if len(record) == 3:
+                        access_times[key[len(prefix):].decode()] = record[:2]
+        return access_times
+
+    def delete_access(self, graph_id, paths):
+        """Forgets the access times of files.
+
+        Args:
+
+            graph_id (str): The graph's name.
+
+            paths (List[str]): The absolute paths.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+        with self.batch():
+            for path in paths:
+                self._delete(self._get_db_access_id(graph_id, path))
+
+    def append_history(self, graph_id, record):
+        """Appends a node call to the graph's run history. Records are
+        kept ordered by their start time, and by node and start time.
+
+        Args:
+
+            graph_id (str): The graph's name.
+
+            record (dict): The call, see :func:`get_history`.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+        time_key = self._get_history_time_key(record["start"])
+        value = encode(record)
+        self._put(self._get_db_history_id(graph_id) + time_key + ':'
+                  + record["node"], value)
+        self._put(self._get_db_node_history_id(graph_id, record["node"])
+                  + time_key, value)
+
+    def get_history(self, graph_id, node_id=None, since=None, until=None):
+        """Retrieves the graph's run history. Only the keys in the
+        requested time range are read.
+
+        Args:
+
+            graph_id (str): The graph's name.
+
+            node_id (str, optional): Only the calls of this node.
+
+            since (float, optional): Only calls started from it, in
+             seconds since the epoch.
+
+            until (float, optional): Only calls started before it, in
+             seconds since the epoch.
+
+        Returns:
+            List[dict]: The calls ordered by start time. Each has the
+            `node` name, the `run` start time, the `action`
+            (`"evaluate"`, `"restore"`, `"load"` or `"skip"`), the
+            `status` (`"ok"`, `"failed"` or `"blocked"`), the `start`
+            and `end` times, the `duration` in seconds, the
+            `signature` digest and the process' `peak_rss` in bytes.
+        """
+        if self.dbenv is None:
+            raise WorkflowError('Database is not opened')
+        if node_id is None:
+            prefix = self._get_db_history_id(graph_id).encode()
+        else:
+            prefix = self._get_db_node_history_id(graph_id, node_id).encode()
+        start_key = prefix
+        if since is not None:
+            start_key += self._get_history_time_key(since).encode()
+        until_key = (self._get_history_time_key(until).encode()
+                     if until is not None else None)
+
+        records = []
+        self.flush()
+        with self._begin(write=False) as txn:
+            cursor = txn.cursor()
+            if cursor.set_range(start_key):
+                for key, value in cursor:
+                    if not key.startswith(prefix):
+                        break
+                    if (until_key is not None and key[
+                            len(prefix):len(prefix) + len(until_key)]
+                            >= until_key):
+                        break
+                    record = _decode_record(value)
+                    if node_id is None or record["node"] == node_id:
+                        records.append(record)
+        return records
+
+    @staticmethod
+    def _get_history_time_key(timestamp):
+        # Fixed width microseconds, so keys sort by time.
+        return "{:017d}".format(int(timestamp * 1000000))
 
     @staticmethod
     def _get_db_id(graph_id, node_id):
@@ -267,3 +1060,40 @@ class ArgumentSignatureDB:
     @staticmethod
     def _get_db_meas_id(graph_id, node_id):
         return ArgumentSignatureDB._get_db_id(graph_id, node_id) + ':' + "__meas__"
+
+    @staticmethod
+    def _get_db_timing_id(graph_id, node_id):
+        return ArgumentSignatureDB._get_db_id(graph_id, node_id) + ':' + "__timing__"
+
+    @staticmethod
+    def _get_db_metrics_index_id(graph_id, node_id):
+        return ArgumentSignatureDB._get_db_id(graph_id, node_id) + ':' + "__metrics__"
+
+    @staticmethod
+    def _get_db_metric_id(graph_id, node_id, name):
+        return "__metric__:" + graph_id + ':' + node_id + ':' + name + ':'
+
+    @staticmethod
+    def _get_metric_step_key(step):
+        # Fixed width, so keys sort by step.
+        return "{:020d}".format(step)
+
+    @staticmethod
+    def _get_db_digest_id(filepath):
+        return "__digest__:" + filepath
+
+    @staticmethod
+    def _get_db_tree_id(dirpath):
+        return "__tree__:" + dirpath
+
+    @staticmethod
+    def _get_db_access_id(graph_id, path):
+        return "__access__:" + graph_id + ':' + path
+
+    @staticmethod
+    def _get_db_history_id(graph_id):
+        return "__history__:" + graph_id + ':'
+
+    @staticmethod
+    def _get_db_node_history_id(graph_id, node_id):
+        return "__nodehistory__:" + graph_id + ':' + node_id + ':'
@@ -0,0 +1,182 @@
+"""Content digests of filesystem resources. Digests are cached by
+the file's path and stat, in memory and in the workflow database of
+the active run, so unchanged files are never read again.
+"""
+
+import os
+import fnmatch
+import hashlib
+import threading
+
+from ._run import get_current_run
+
+CHUNK_SIZE = 1 << 20
+
+_CACHE = {}
+_TREE_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _new_hasher():
+    return hashlib.blake2b(digest_size=20)
+
+
+def _get_digest_db():
+    run = get_current_run()
+    if run is None:
+        return None
+    return run.digest_db
+
+
+def _get_stat_key(stat):
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+def _hash_file(filepath, chunk_size):
+    hasher = _new_hasher()
+    chunk_size = chunk_size or CHUNK_SIZE
+    with open(filepath, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def file_digest(filepath, chunk_size=None):
+    """Computes the digest of a file's content.
+
+    Args:
+
+        filepath (str): The file path.
+
+        chunk_size (int, optional): How many bytes are read at once,
+         defaults to :data:`CHUNK_SIZE`.
+
+    Returns:
+        str: Hexadecimal digest or `None` if the file doesn't exist.
+    """
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+
+    filepath = os.path.abspath(filepath)
+    stat_key = _get_stat_key(stat)
+    with _CACHE_LOCK:
+        digest = _CACHE.get((filepath, stat_key))
+    if digest is not None:
+        return digest
+
+    digest_db = _get_digest_db()
+    if digest_db is not None:
+        digest = digest_db.get_file_digest(filepath, stat_key)
+
+    if digest is None:
+        digest = _hash_file(filepath, chunk_size)
+        if digest_db is not None:
+            digest_db.set_file_digest(filepath, stat_key, digest)
+
+    with _CACHE_LOCK:
+        _CACHE[(filepath, stat_key)] = digest
+    return digest
+
+
+def _match_any(relpath, patterns):
+    return any(fnmatch.fnmatchcase(relpath, pattern) for pattern in patterns)
+
+
+def _get_tree_entries(dirpath, digest_db):
+    with _CACHE_LOCK:
+        entries = _TREE_CACHE.get(dirpath)
+    if entries is None and digest_db is not None:
+        entries = digest_db.get_tree_entries(dirpath)
+    return entries if entries is not None else {}
+
+
+def _set_tree_entries(dirpath, entries, digest_db):
+    with _CACHE_LOCK:
+        _TREE_CACHE[dirpath] = entries
+    if digest_db is not None:
+        digest_db.set_tree_entries(dirpath, entries)
+
+
+def _dir_digest(root, relpath, include, exclude, chunk_size, digest_db):
+    dirpath = os.path.join(root, relpath) if relpath else root
+    cached = _get_tree_entries(dirpath, digest_db)
+    entries = {}
+    items = []
+    with os.scandir(dirpath) as dir_iter:
+        for entry in sorted(dir_iter, key=lambda entry: entry.name):
+            entry_relpath = (relpath + '/' + entry.name if relpath
+                             else entry.name)
+            if exclude and _match_any(entry_relpath, exclude):
+                continue
+
+            if entry.is_dir():
+                items.append("d:{}:{}".format(entry.name, _dir_digest(
+                    root, entry_relpath, include, exclude, chunk_size,
+                    digest_db)))
+                continue
+
+            if include and not _match_any(entry_relpath, include):
+                continue
+
+            stat_key = _get_stat_key(entry.stat())
+            cached_entry = cached.get(entry.name)
+            if cached_entry is not None and cached_entry[0] == stat_key:
+                digest = cached_entry[1]
+            else:
+                digest = _hash_file(entry.path, chunk_size)
+            entries[entry.name] = (stat_key, digest)
+            items.append("f:{}:{}".format(entry.name, digest))
+
+    if entries != cached:
+        _set_tree_entries(dirpath, entries, digest_db)
+    return combine_digests(items)
+
+
+def tree_digest(dirpath, include=None, exclude=None, chunk_size=None):
+    """Computes a Merkle digest of a directory tree: each directory
+    digest combines its files' content digests and its
+    subdirectories' digests. The file digests of each directory are
+    cached by their stat, so only new or changed files are read.
+
+    Args:
+
+        dirpath (str): The directory path.
+
+        include (List[str], optional): Glob patterns of the file paths,
+         relative to `dirpath`, to hash. `None` includes all files.
+
+        exclude (List[str], optional): Glob patterns of the file or
+         directory paths, relative to `dirpath`, to skip.
+
+        chunk_size (int, optional): How many bytes are read at once,
+         defaults to :data:`CHUNK_SIZE`.
+
+    Returns:
+        str: Hexadecimal digest or `None` if the directory doesn't
+        exist.
+    """
+    if not os.path.isdir(dirpath):
+        return None
+    return _dir_digest(os.path.abspath(dirpath), '', include, exclude,
+                       chunk_size, _get_digest_db())
+
+
+def combine_digests(digests):
+    """Combines an ordered sequence of digests into one.
+
+    Args:
+
+        digests (List[str]): The digests.
+
+    Returns:
+        str: Hexadecimal digest or `None` if any digest is `None`.
+    """
+    hasher = _new_hasher()
+    for digest in digests:
+        if digest is None:
+            return None
+        hasher.update(str(digest).encode())
+        hasher.update(b'\0')
+    return hasher.hexdigest()
@@ -0,0 +1,309 @@
+"""Versioned binary encoding of workflow database records. Values are
+written with explicit type tags, so records decode without importing
+user modules: classes, enums and objects are looked up only in the
+modules already imported, and stay as :class:`Unresolved` otherwise.
+Objects that can't be encoded by their attributes are embedded as
+pickles, which are also unpickled only from the imported modules.
+
+A record is :data:`MAGIC`, the format version byte and one value.
+"""
+
+import io
+import sys
+import pickle
+import struct
+from enum import Enum
+
+from .signature import ArgDigest
+
+MAGIC = b"\xc1RF"
+FORMAT_VERSION = 1
+
+_NONE, _TRUE, _FALSE = b"N", b"T", b"F"
+_INT, _FLOAT, _STR, _BYTES = b"i", b"f", b"s", b"b"
+_LIST, _TUPLE, _SET, _FROZENSET, _DICT = b"l", b"t", b"S", b"z", b"d"
+_DIGEST, _ENUM, _TYPE, _OBJECT, _PICKLE = b"D", b"e", b"y", b"o", b"p"
+
+_FLOAT_STRUCT = struct.Struct("<d")
+
+_SEQUENCE_TAGS = {list: _LIST, tuple: _TUPLE, set: _SET,
+                  frozenset: _FROZENSET}
+_SEQUENCE_TYPES = {tag: type_ for type_, tag in _SEQUENCE_TAGS.items()}
+
+
+class Unresolved:
+    """A stored value whose class isn't available. It's different from
+    any other value, so the argument that holds it is dirty.
+
+    Attributes:
+
+        name (str): Qualified name of the missing class or member.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, other):
+        return False
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __repr__(self):
+        return "<unresolved {}>".format(self.name)
+
+
+class FormatError(ValueError):
+    """Raised for records of unknown versions or broken records."""
+
+
+def is_encoded(data):
+    """Returns whatever a record uses this encoding, instead of the
+    legacy pickle format.
+    """
+    return data[:len(MAGIC)] == MAGIC
+
+
+def _write_uint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_str(out, value):
+    data = value.encode()
+    _write_uint(out, len(data))
+    out += data
+
+
+def _write_ref(out, type_):
+    _write_str(out, type_.__module__)
+    _write_str(out, type_.__qualname__)
+
+
+def _has_plain_state(value):
+    type_ = type(value)
+    return (hasattr(value, '__dict__')
+            and type_.__new__ is object.__new__
+            and getattr(type_, '__setstate__', None) is None
+            and getattr(type_, '__getstate__', None)
+            is getattr(object, '__getstate__', None)
+            and type_.__reduce_ex__ is object.__reduce_ex__
+            and '<locals>' not in type_.__qualname__)
+
+
+def _write(out, value):
+    # pylint: disable=too-many-branches,unidiomatic-typecheck
+    type_ = type(value)
+    if value is None:
+        out += _NONE
+    elif value is True:
+        out += _TRUE
+    elif value is False:
+        out += _FALSE
+    elif isinstance(value, Enum):
+        out += _ENUM
+        _write_ref(out, type_)
+        _write_str(out, value.name)
+    elif type_ is int:
+        out += _INT
+        _write_uint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+    elif type_ is float:
+        out += _FLOAT + _FLOAT_STRUCT.pack(value)
+    elif type_ is str:
+        out += _STR
+        _write_str(out, value)
+    elif type_ is bytes:
+        out += _BYTES
+        _write_uint(out, len(value))
+        out += value
+    elif type_ in _SEQUENCE_TAGS:
+        out += _SEQUENCE_TAGS[type_]
+        _write_uint(out, len(value))
+        for item in value:
+            _write(out, item)
+    elif type_ is dict:
+        out += _DICT
+        _write_uint(out, len(value))
+        for key, item in value.items():
+            _write(out, key)
+            _write(out, item)
+    elif type_ is ArgDigest:
+        out += _DIGEST
+        _write_str(out, value.digest)
+        _write_str(out, value.preview)
+    elif isinstance(value, type):
+        out += _TYPE
+        _write_ref(out, value)
+    elif _has_plain_state(value):
+        state = bytearray()
+        try:
+            _write(state, dict(vars(value)))
+        except TypeError:
+            _write_pickle(out, value)
+            return
+        out += _OBJECT
+        _write_ref(out, type_)
+        out += state
+    else:
+        _write_pickle(out, value)
+
+
+def _write_pickle(out, value):
+    try:
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    except Exception as exp:
+        raise TypeError("Can't encode {}: {}".format(
+            type(value).__name__, exp))
+    out += _PICKLE
+    _write_uint(out, len(data))
+    out += data
+
+
+def encode(value):
+    """Encodes a value as a record.
+
+    Args:
+
+        value (object): Scalars, strings, bytes, containers,
+         :class:`rflow.signature.ArgDigest`, enums, types and objects.
+
+    Returns:
+        bytes: The record.
+
+    Raises:
+        TypeError: If the value can't be encoded.
+    """
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    _write(out, value)
+    return bytes(out)
+
+
+def _resolve(module_name, qualname):
+    obj = sys.modules.get(module_name)
+    for attr in qualname.split('.'):
+        if obj is None:
+            break
+        obj = getattr(obj, attr, None)
+    return obj
+
+
+class _Unpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        obj = _resolve(module, name)
+        if obj is None:
+            raise pickle.UnpicklingError(
+                "{}.{} isn't imported".format(module, name))
+        return obj
+
+
+class _Reader:
+    def __init__(self, data, pos):
+        self.data = data
+        self.pos = pos
+
+    def take(self, size):
+        if self.pos + size > len(self.data):
+            raise FormatError("Truncated record")
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def uint(self):
+        value = shift = 0
+        while True:
+            byte = self.take(1)[0]
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def str(self):
+        return bytes(self.take(self.uint())).decode()
+
+    def ref(self):
+        module_name, qualname = self.str(), self.str()
+        return (_resolve(module_name, qualname),
+                "{}.{}".format(module_name, qualname))
+
+    def value(self):
+        # pylint: disable=too-many-return-statements,too-many-branches
+        tag = bytes(self.take(1))
+        if tag == _NONE:
+            return None
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _INT:
+            value = self.uint()
+            return value >> 1 if not value & 1 else -((value + 1) >> 1)
+        if tag == _FLOAT:
+            return _FLOAT_STRUCT.unpack(self.take(8))[0]
+        if tag == _STR:
+            return self.str()
+        if tag == _BYTES:
+            return bytes(self.take(self.uint()))
+        if tag in _SEQUENCE_TYPES:
+            items = [self.value() for _ in range(self.uint())]
+            return _SEQUENCE_TYPES[tag](items)
+        if tag == _DICT:
+            count = self.uint()
+            return dict((self.value(), self.value()) for _ in range(count))
+        if tag == _DIGEST:
+            return ArgDigest(self.str(), self.str())
+        if tag == _ENUM:
+            enum_type, name = self.ref()
+            member = self.str()
+            if isinstance(enum_type, type) and member in getattr(
+                    enum_type, '__members__', {}):
+                return enum_type[member]
+            return Unresolved(name + "." + member)
+        if tag == _TYPE:
+            type_, name = self.ref()
+            return type_ if isinstance(type_, type) else Unresolved(name)
+        if tag == _OBJECT:
+            type_, name = self.ref()
+            state = self.value()
+            if not isinstance(type_, type):
+                return Unresolved(name)
+            obj = type_.__new__(type_)
+            obj.__dict__.update(state)
+            return obj
+        if tag == _PICKLE:
+            data = bytes(self.take(self.uint()))
+            try:
+                return _Unpickler(io.BytesIO(data)).load()
+            except Exception:  # pylint: disable=broad-except
+                return Unresolved("pickled value")
+        raise FormatError("Unknown tag {!r}".format(tag))
+
+
+def decode(data):
+    """Decodes a record.
+
+    Args:
+
+        data (bytes): A record created by :func:`encode`.
+
+    Returns:
+        object: The value.
+
+    Raises:
+        FormatError: If the record isn't on this encoding, is from a
+        newer format version or is broken.
+    """
+    if not is_encoded(data):
+        raise FormatError("Not an encoded record")
+    version = data[len(MAGIC)]
+    if version > FORMAT_VERSION:
+        raise FormatError(
+            "Record format version {} is newer than the supported {}".format(
+                version, FORMAT_VERSION))
+    reader = _Reader(memoryview(data), len(MAGIC) + 1)
+    value = reader.value()
+    if reader.pos != len(data):
+        raise FormatError("Trailing data on record")
+    return value
@@ -0,0 +1,84 @@
+"""Resource usage of node calls. CPU times and I/O bytes are counted
+for the calling thread where the system supports it, so parallel
+nodes don't count each other's work. The peak resident memory is only
+known for the whole process.
+"""
+
+import os
+import time
+
+from ._util import get_peak_rss
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+if resource is not None:
+    _RUSAGE_WHO = getattr(resource, 'RUSAGE_THREAD', resource.RUSAGE_SELF)
+
+_IO_PATH = next((path for path in ("/proc/thread-self/io", "/proc/self/io")
+                 if os.path.exists(path)), None)
+
+
+def _read_io():
+    if _IO_PATH is None:
+        return None, None
+    counters = {}
+    try:
+        with open(_IO_PATH, 'rb') as stream:
+            for line in stream:
+                name, _, value = line.partition(b':')
+                counters[name] = int(value)
+    except OSError:
+        return None, None
+    return counters.get(b'rchar'), counters.get(b'wchar')
+
+
+def _get_cpu_times():
+    if resource is None:
+        return time.thread_time(), 0.0
+    usage = resource.getrusage(_RUSAGE_WHO)
+    return usage.ru_utime, usage.ru_stime
+
+
+def start():
+    """Takes the counters before a call.
+
+    Returns:
+        tuple: Pass it to :func:`measure`.
+    """
+    return ((time.perf_counter(), ) + _get_cpu_times() + (get_peak_rss(), )
+            + _read_io())
+
+
+def measure(started):
+    """Computes the resources used since :func:`start`.
+
+    Args:
+
+        started (tuple): What :func:`start` returned.
+
+    Returns:
+        Dict[str: float]: The `"wall"`, `"user"` and `"sys"` time in
+        seconds, with `"cpu"` being their sum, how many bytes the
+        process' peak resident memory grew (`"peak_rss_delta"`) and
+        how many bytes were read and written (`"read_bytes"` and
+        `"write_bytes"`), including the page cache. Counters not
+        available on the system are `None`.
+    """
+    wall, user, sys_time, peak_rss, read_bytes, write_bytes = started
+    end_user, end_sys = _get_cpu_times()
+    end_peak_rss = get_peak_rss()
+    end_read, end_write = _read_io()
+
+    def _delta(end, begin):
+        return end - begin if end is not None and begin is not None else None
+
+    return {"wall": time.perf_counter() - wall,
+            "cpu": (end_user - user) + (end_sys - sys_time),
+            "user": end_user - user,
+            "sys": end_sys - sys_time,
+            "peak_rss_delta": _delta(end_peak_rss, peak_rss),
+            "read_bytes": _delta(end_read, read_bytes),
+            "write_bytes": _delta(end_write, write_bytes)}
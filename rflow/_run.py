@@ -0,0 +1,148 @@
+"""State shared by all node calls of one execution.
+"""
+
+import time
+import threading
+from contextlib import contextmanager, ExitStack
+
+from ._util import get_resource_paths
+
+
+class Run:
+    """One execution of the graph. Nodes use its identity to know if
+    their cached dirty state was computed in the current execution.
+
+    Resource queries, like `exists` and `get_hash`, are memoized for
+    the rest of the run by :func:`cached`. Nodes call
+    :func:`invalidate` when they write their resource.
+
+    Workflow databases used on the run are batched, see
+    :func:`batch`, so the run commits them a few times instead of
+    once per node.
+
+    Attributes:
+
+        start_time (float): When the run started, in seconds since the
+         epoch. Identifies the run on the run history, see
+         :func:`rflow._argument.ArgumentSignatureDB.get_history`.
+
+        digest_db (:obj:`rflow._argument.ArgumentSignatureDB`): Where
+         file content digests are cached, the database of the first
+         graph updated on the run.
+
+        profiler (:obj:`rflow.profiler.Profiler`): Profiles the node
+         calls, `None` by default.
+    """
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.digest_db = None
+        self.profiler = None
+        self._resource_cache = {}
+        self._cache_lock = threading.Lock()
+        self._batches = ExitStack()
+        self._batched_dbs = set()
+
+    def cached(self, resource, query, func):
+        """Returns the memoized result of a resource query, calling
+        `func` on the first time.
+
+        Args:
+
+            resource (:obj:`rflow.resource.Resource`): The queried
+             resource.
+
+            query (str): Query name, like `"exists"`.
+
+            func (Callable[[], object]): Computes the query result.
+
+        Returns:
+            object: The query result.
+        """
+        key = (id(resource), query)
+        with self._cache_lock:
+            entry = self._resource_cache.get(key)
+        if entry is not None:
+            return entry[1]
+
+        value = func()
+        with self._cache_lock:
+            # Keeps the resource alive, so its id isn't reused.
+            self._resource_cache[key] = (resource, value)
+        return value
+
+    def batch(self, database):
+        """Groups a database's reads and writes until the run ends.
+
+        Args:
+
+            database (:obj:`rflow._argument.ArgumentSignatureDB`): The
+             workflow database.
+        """
+        with self._cache_lock:
+            if database.database_path in self._batched_dbs:
+                return
+            self._batched_dbs.add(database.database_path)
+            self._batches.enter_context(database.batch())
+
+    def close(self):
+        """Commits the batched databases.
+        """
+        self._batches.close()
+
+    def invalidate(self, resource):
+        """Forgets the queries of a resource, its members and any
+        other resource with the same file paths.
+
+        Args:
+
+            resource (:obj:`rflow.resource.Resource`): The written
+             resource.
+        """
+        filepaths = get_resource_paths(resource)
+        with self._cache_lock:
+            for key, (cached_resource, _) in list(self._resource_cache.items()):
+                if (cached_resource is resource
+                        or not filepaths.isdisjoint(
+                            get_resource_paths(cached_resource))):
+                    del self._resource_cache[key]
+
+
+_CURRENT_RUN = None
+_RUN_LOCK = threading.Lock()
+
+
+def get_current_run():
+    """Returns the active run.
+
+    Returns:
+        :obj:`Run`: The active run or `None` when nothing is running.
+    """
+    return _CURRENT_RUN
+
+
+@contextmanager
+def begin_run():
+    """Starts a run or joins the active one. The run ends when the
+    context that started it exits. Worker threads spawned inside the
+    context join the same run.
+
+    Yields:
+        :obj:`Run`: The active run.
+    """
+    # pylint: disable=global-statement
+    global _CURRENT_RUN
+
+    with _RUN_LOCK:
+        owner = _CURRENT_RUN is None
+        if owner:
+            _CURRENT_RUN = Run()
+        run = _CURRENT_RUN
+
+    try:
+        yield run
+    finally:
+        if owner:
+            with _RUN_LOCK:
+                _CURRENT_RUN = None
+            run.close()
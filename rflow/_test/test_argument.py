@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""Tests the workflow database.
+"""
+
+import shutil
+import unittest
+from pathlib import Path
+
+import rflow
+from rflow import _argument
+from rflow._argument import ArgumentSignatureDB
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name
+
+HERE = Path(__file__).parent
+
+
+class CountingEnv:
+    def __init__(self, dbenv):
+        self.dbenv = dbenv
+        self.transactions = {True: 0, False: 0}
+
+    def begin(self, write=False, **kwargs):
+        self.transactions[write] += 1
+        return self.dbenv.begin(write=write, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.dbenv, name)
+
+
+class Add(rflow.Interface):
+    def evaluate(self, a, b):
+        return a + b
+
+
+class ArgumentTest(unittest.TestCase):
+    SMALL_DB = HERE / "small.lmdb"
+    COMPACT_DB = HERE / "compact.lmdb"
+
+    def _clean(self):
+        for db_path in [HERE / rflow.common.DOT_DATABASE_FILENAME,
+                        ArgumentTest.SMALL_DB, ArgumentTest.COMPACT_DB]:
+            if db_path.exists():
+                shutil.rmtree(str(db_path))
+
+    def setUp(self):
+        self._clean()
+
+    def tearDown(self):
+        self._clean()
+
+    def test_batch(self):
+        db = ArgumentSignatureDB()
+        db.open(str(HERE / rflow.common.DOT_DATABASE_FILENAME))
+        db.update_argsignature("g", "stored", {"a": 1})
+        other = ArgumentSignatureDB()
+        other.open(str(HERE / rflow.common.DOT_DATABASE_FILENAME))
+        db.dbenv = CountingEnv(db.dbenv)
+
+        with db.batch(flush_size=3):
+            self.assertEqual({"a": 1}, db.get_argsignature("g", "stored"))
+            self.assertEqual({}, db.get_argsignature("g", "missing"))
+            self.assertEqual({}, db.get_measurement("g", "stored"))
+            self.assertEqual(1, db.dbenv.transactions[False])
+
+            db.update_argsignature("g", "n1", {"a": 2})
+            db.set_measurement("g", "n1", {"acc": 0.5})
+            self.assertEqual({"a": 2}, db.get_argsignature("g", "n1"))
+            self.assertEqual({"a": 2}, other.get_argsignature("g", "n1"))
+            with db.dbenv.begin() as txn:
+                self.assertIsNone(txn.get(b"g:n1"))
+
+            db.clean_node("g", "stored")
+            self.assertEqual({}, db.get_argsignature("g", "stored"))
+            self.assertEqual(1, db.dbenv.transactions[True])
+
+            db.update_argsignature("g", "n2", {"a": 3})
+            db.flush()
+            self.assertEqual(2, db.dbenv.transactions[True])
+
+        self.assertEqual(2, db.dbenv.transactions[True])
+        other = ArgumentSignatureDB()
+        other.open(str(HERE / rflow.common.DOT_DATABASE_FILENAME))
+        self.assertEqual({}, other.get_argsignature("g", "stored"))
+        self.assertEqual({"a": 3}, other.get_argsignature("g", "n2"))
+        self.assertEqual({"acc": 0.5}, other.get_measurement("g", "n1"))
+
+    def test_run(self):
+        with rflow.begin_graph("batched_run", HERE) as g:
+            for i in range(50):
+                g["add{}".format(i)] = node = Add()
+                node.args.a = i
+                node.args.b = 1
+        dbenv = g.args_context.dbenv
+        g.args_context.dbenv = CountingEnv(dbenv)
+        try:
+            targets = ["add{}".format(i) for i in range(50)]
+            self.assertEqual(list(range(1, 51)), g.run(targets, jobs=4))
+            self.assertEqual({True: 1, False: 1},
+                             g.args_context.dbenv.transactions)
+        finally:
+            g.args_context.dbenv = dbenv
+
+        g.add3.update()
+        self.assertFalse(g.add3.is_dirty())
+
+    def test_map_size(self):
+        db = ArgumentSignatureDB()
+        db.open(str(ArgumentTest.SMALL_DB), map_size=1 << 16)
+        signature = {"data": "x" * 4096}
+        for i in range(50):
+            db.update_argsignature("g", "n{}".format(i), signature)
+        with db.batch():
+            for i in range(50, 100):
+                db.update_argsignature("g", "n{}".format(i), signature)
+            db.set_file_digest("file.txt", (1, 2, 3), "digest")
+        self.assertGreater(db.dbenv.info()['map_size'], 1 << 16)
+
+        stats = db.get_stats()
+        self.assertEqual(101, stats["entries"])
+        self.assertEqual(100, stats["groups"]["g"]["entries"])
+        self.assertEqual(1, stats["groups"]["__digest__"]["entries"])
+        self.assertGreater(stats["groups"]["g"]["pages"], 100)
+
+        for i in range(90):
+            db.clean_node("g", "n{}".format(i))
+        other = ArgumentSignatureDB()
+        other.open(str(ArgumentTest.SMALL_DB))
+        before, after = db.compact()
+        self.assertLess(after, before)
+        self.assertEqual(11, db.get_stats()["entries"])
+        self.assertEqual(signature, other.get_argsignature("g", "n95"))
+        self.assertEqual({}, other.get_argsignature("g", "n5"))
+
+    @unittest.skipIf(_argument.fcntl is None, "needs fcntl")
+    def test_compact_opened(self):
+        db = ArgumentSignatureDB()
+        db.open(str(ArgumentTest.COMPACT_DB))
+        db.update_argsignature("g", "n", {"a": 1})
+        lock_path = Path(db.get_lock_path("g", "n"))
+        with rflow._util.file_lock(str(lock_path)):
+            pass
+
+        # Another process with the database opened.
+        with open(str(ArgumentTest.COMPACT_DB / "locks" / "env.lock"),
+                  'a') as stream:
+            _argument.fcntl.flock(stream.fileno(), _argument.fcntl.LOCK_SH)
+            with self.assertRaises(rflow.WorkflowError):
+                db.compact()
+
+        db.compact()
+        self.assertTrue(lock_path.exists())
+        self.assertEqual({"a": 1}, db.get_argsignature("g", "n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
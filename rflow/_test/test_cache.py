@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""Tests the artifact cache.
+"""
+
+import shutil
+import threading
+import unittest
+from pathlib import Path
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import rflow
+from rflow.cache import (ArtifactCache, FSCacheBackend, HTTPCacheBackend,
+                         get_backend)
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name
+
+HERE = Path(__file__).parent
+
+
+class Write(rflow.Interface):
+    evaluations = 0
+
+    def evaluate(self, resource, text):
+        Write.evaluations += 1
+        with open(resource.filepath, "w") as stream:
+            stream.write(text)
+        return text
+
+    def load(self, resource):
+        with open(resource.filepath, "r") as stream:
+            return stream.read()
+
+
+class WriteItems(Write):
+    def evaluate(self, resource, items):
+        return super().evaluate(resource, ",".join(map(str, items)))
+
+
+class Value(rflow.Interface):
+    def evaluate(self, x):
+        return x
+
+
+class Uncached(Write):
+    cacheable = False
+
+
+class PutHandler(SimpleHTTPRequestHandler):
+    def do_PUT(self):
+        path = Path(self.translate_path(self.path))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(self.rfile.read(int(self.headers["Content-Length"])))
+        self.send_response(201)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class CacheTest(unittest.TestCase):
+    CACHE_DIR = HERE / "artifact-cache"
+    OTHER_CACHE_DIR = HERE / "other-artifact-cache"
+    REMOTE_DIR = HERE / "remote-artifact-cache"
+    FILENAME = HERE / "cached.txt"
+
+    def _clean(self):
+        for path in [HERE / rflow.common.DOT_DATABASE_FILENAME,
+                     CacheTest.CACHE_DIR, CacheTest.OTHER_CACHE_DIR,
+                     CacheTest.REMOTE_DIR]:
+            if path.exists():
+                shutil.rmtree(str(path))
+        if CacheTest.FILENAME.exists():
+            CacheTest.FILENAME.unlink()
+
+    def setUp(self):
+        self._clean()
+        Write.evaluations = 0
+
+    def tearDown(self):
+        self._clean()
+
+    def _graph(self, name, node_class):
+        with rflow.begin_graph(name, HERE) as g:
+            g.artifact_cache = ArtifactCache(CacheTest.CACHE_DIR)
+            g.write = node_class(
+                rflow.FSResource(CacheTest.FILENAME, rewritable=True))
+        return g
+
+    def test_container_argument(self):
+        g = self._graph("cache_container", WriteItems)
+        for items in [[1, 2], [3, 4], [1, 2]]:
+            g.write.args.items = items
+            self.assertEqual(",".join(map(str, items)), g.write.call())
+        self.assertEqual(2, Write.evaluations)
+
+    def test_value_upstream(self):
+        g = self._graph("cache_value_upstream", Write)
+        g.value = Value()
+        g.write.args.text = g.value
+        for text in ["a", "b"]:
+            g.value.args.x = text
+            self.assertEqual(text, g.write.call())
+        self.assertEqual(2, Write.evaluations)
+
+        g.value.args.x = "a"
+        self.assertEqual("a", g.write.call())
+        self.assertEqual(2, Write.evaluations)
+
+    def test_redo(self):
+        g = self._graph("cache_redo", Write)
+        g.write.args.text = "a"
+        self.assertEqual("a", g.write.call())
+        self.assertEqual("a", g.write.call(redo=True))
+        self.assertEqual(2, Write.evaluations)
+
+    def test_restore(self):
+        g = self._graph("cache", Write)
+        for text in ["a", "b"]:
+            g.write.args.text = text
+            self.assertEqual(text, g.write.call())
+        self.assertEqual(2, Write.evaluations)
+        self.assertNotIn("load", g.write.get_timing())
+
+        g.write.args.text = "a"
+        self.assertEqual("a", g.write.call())
+        self.assertEqual(2, Write.evaluations)
+        self.assertIn("load", g.write.get_timing())
+        self.assertEqual("a", CacheTest.FILENAME.read_text())
+        g.write.update()
+        self.assertFalse(g.write.is_dirty())
+
+        # Writing the restored file must not change the cached copy.
+        g.write.args.text = "c"
+        self.assertEqual("c", g.write.call())
+        g.write.args.text = "a"
+        self.assertEqual("a", g.write.call())
+        self.assertEqual("a", CacheTest.FILENAME.read_text())
+        self.assertEqual(3, Write.evaluations)
+
+    def test_not_cacheable(self):
+        g = self._graph("uncached", Uncached)
+        for text in ["a", "b", "a"]:
+            g.write.args.text = text
+            self.assertEqual(text, g.write.call())
+        self.assertEqual(3, Write.evaluations)
+        self.assertFalse(CacheTest.CACHE_DIR.exists())
+
+    def _test_remote(self, graph_name, remote):
+        g = self._graph(graph_name, Write)
+        g.artifact_cache = ArtifactCache(CacheTest.CACHE_DIR, remote=remote)
+        g.write.args.text = "a"
+        self.assertEqual("a", g.write.call())
+        self.assertEqual(1, Write.evaluations)
+
+        # Another machine, with an empty local cache.
+        g.artifact_cache = ArtifactCache(CacheTest.OTHER_CACHE_DIR,
+                                         remote=remote, max_workers=2)
+        CacheTest.FILENAME.unlink()
+        self.assertEqual("a", g.write.call())
+        self.assertEqual(1, Write.evaluations)
+        self.assertEqual("a", CacheTest.FILENAME.read_text())
+
+    def test_fs_remote(self):
+        remote = get_backend(str(CacheTest.REMOTE_DIR))
+        self.assertIsInstance(remote, FSCacheBackend)
+        self._test_remote("fs_remote", remote)
+
+    def test_http_remote(self):
+        CacheTest.REMOTE_DIR.mkdir()
+
+        def _handler(*args, **kwargs):
+            return PutHandler(*args, directory=str(CacheTest.REMOTE_DIR),
+                              **kwargs)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _handler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            remote = get_backend(
+                "http://127.0.0.1:{}/cache".format(server.server_port))
+            self.assertIsInstance(remote, HTTPCacheBackend)
+            self.assertFalse(remote.exists("entries/missing.json"))
+            self._test_remote("http_remote", remote)
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,12 +4,21 @@
 
 from pathlib import Path
 import unittest
+import io
+import json
+from unittest.mock import patch
+from contextlib import redirect_stdout
 
 import rflow
 
 from rflow._util import work_directory
 
-# pylint: disable=missing-docstring
+# pylint: disable=missing-docstring,protected-access
+
+
+class Scale(rflow.Interface):
+    def evaluate(self, value):
+        return value * 2
 
 
 class TestCommand(unittest.TestCase):
@@ -66,3 +75,48 @@ class TestCommand(unittest.TestCase):
             rflow.command.main(['', 'workflow1', 'viz-dag', '--output',
                                 'workflow'])
         self.assertTrue(viz_path.exists())
+
+    def test_print_run(self):
+        rflow.open_graph(TestCommand.WORKFLOW1_PATH,
+                         'workflow1').clear_cache()
+
+        output = io.StringIO()
+        with work_directory(TestCommand.WORKFLOW1_PATH):
+            with redirect_stdout(output):
+                rflow.command.main(['', 'workflow1', 'print-run', 'sub',
+                                    '--json'])
+
+        plan = json.loads(output.getvalue())["plan"]
+        self.assertEqual(["add", "sub"], [entry["node"] for entry in plan])
+        self.assertEqual(["evaluate", "evaluate"],
+                         [entry["action"] for entry in plan])
+        self.assertFalse((Path(TestCommand.WORKFLOW1_PATH) / 'sub.pkl').exists())
+
+        output = io.StringIO()
+        with work_directory(TestCommand.WORKFLOW1_PATH):
+            with redirect_stdout(output):
+                rflow.command.main(['', 'workflow1', 'print-run', 'sub', 'a*',
+                                    '--json'])
+        plan = json.loads(output.getvalue())["plan"]
+        self.assertEqual(["add", "sub"], [entry["node"] for entry in plan])
+
+    def test_shutdown(self):
+        with work_directory(TestCommand.WORKFLOW1_PATH):
+            with redirect_stdout(io.StringIO()), patch.object(
+                    rflow.executor, "shutdown") as shutdown:
+                rflow.command.main(['', 'workflow1', 'print-run', 'sub'])
+        shutdown.assert_called_once_with()
+
+    def test_print_run_user_argument(self):
+        with rflow.begin_graph("print_run_user_argument",
+                               TestCommand.WORKFLOW1_PATH) as g:
+            g.scale = Scale()
+            g.scale.args.value = rflow.UserArgument(
+                "--print-run-value", type=int)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            rflow.command._print_run_main(
+                g, ['scale', '--print-run-value', '3', '--json'])
+        plan = json.loads(output.getvalue())["plan"]
+        self.assertEqual(["scale"], [entry["node"] for entry in plan])
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""Tests the database record encoding.
+"""
+
+import sys
+import types
+import pickle
+import shutil
+import tempfile
+import unittest
+from enum import Enum
+from pathlib import Path
+
+import rflow
+from rflow import _encoding
+from rflow._argument import ArgumentSignatureDB
+from rflow._encoding import Unresolved, encode, decode
+from rflow.signature import ArgDigest
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name
+
+HERE = Path(__file__).parent
+
+
+class Color(Enum):
+    RED = 1
+    BLUE = 2
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __eq__(self, other):
+        return (self.x, self.y) == (other.x, other.y)
+
+
+class Big(int):
+    pass
+
+
+class EncodingTest(unittest.TestCase):
+    def _clean(self):
+        db_path = HERE / rflow.common.DOT_DATABASE_FILENAME
+        if db_path.exists():
+            shutil.rmtree(str(db_path))
+
+    def setUp(self):
+        self._clean()
+
+    def tearDown(self):
+        self._clean()
+
+    def test_roundtrip(self):
+        values = [
+            None, True, False, 0, -1, 2**70, -(2**70), 1.5, "text", b"\0",
+            [1, "a"], (1, (2, )), {3, 4}, frozenset([5]),
+            {"a": [1.0], 2: None}, ArgDigest("abcd", "[1, 2]"),
+            Color.BLUE, Color, Point(1, [2]), Big(7),
+            rflow.FSResource("file.txt", hash_content=True),
+            rflow.MultiResource(rflow.FSResource("a"), rflow.FSResource("b"))]
+        for value in values:
+            decoded = decode(encode(value))
+            self.assertEqual(type(value), type(decoded))
+            if isinstance(value, rflow.resource.Resource):
+                self.assertEqual(vars(value).keys(), vars(decoded).keys())
+            else:
+                self.assertEqual(value, decoded)
+
+        self.assertIsNot(int, type(decode(encode(Big(7)))))
+        self.assertLess(len(encode({"a": 1, "b": "c"})),
+                        len(pickle.dumps({"a": 1, "b": "c"},
+                                         pickle.HIGHEST_PROTOCOL)))
+
+    def test_unresolved(self):
+        module = types.ModuleType("rflow_gone")
+        exec("from enum import Enum\n"
+             "class Gone: pass\n"
+             "class Kind(Enum):\n"
+             "    A = 1\n", module.__dict__)
+        Gone, Kind = module.Gone, module.Kind
+        Gone.__module__ = Kind.__module__ = "rflow_gone"
+        sys.modules["rflow_gone"] = module
+        try:
+            gone = Gone()
+            gone.value = 1
+            record = encode({"obj": gone, "kind": Kind.A, "type": Gone})
+            self.assertIs(Kind.A, decode(record)["kind"])
+        finally:
+            del sys.modules["rflow_gone"]
+
+        decoded = decode(record)
+        for value in decoded.values():
+            self.assertIsInstance(value, Unresolved)
+            self.assertNotEqual(value, value)
+        self.assertEqual("<unresolved rflow_gone.Kind.A>", repr(decoded["kind"]))
+
+        newer = bytearray(record)
+        newer[len(_encoding.MAGIC)] = _encoding.FORMAT_VERSION + 1
+        with self.assertRaises(_encoding.FormatError):
+            decode(bytes(newer))
+        with self.assertRaises(_encoding.FormatError):
+            decode(record[:-1])
+
+    def test_pickle_not_imported(self):
+        with tempfile.TemporaryDirectory() as module_dir:
+            module_path = Path(module_dir) / "rflow_pickled.py"
+            with open(str(module_path), 'w') as stream:
+                stream.write("class Slotted:\n"
+                             "    __slots__ = ('value', )\n")
+            sys.path.insert(0, module_dir)
+            try:
+                module = __import__("rflow_pickled")
+                slotted = module.Slotted()
+                slotted.value = 1
+                record = encode(slotted)
+                self.assertEqual(1, decode(record).value)
+            finally:
+                del sys.modules["rflow_pickled"]
+
+            try:
+                self.assertIsInstance(decode(record), Unresolved)
+                self.assertNotIn("rflow_pickled", sys.modules)
+            finally:
+                sys.path.remove(module_dir)
+                sys.modules.pop("rflow_pickled", None)
+
+    def test_migrate(self):
+        db = ArgumentSignatureDB()
+        db.open(str(HERE / rflow.common.DOT_DATABASE_FILENAME))
+        signature = {"color": Color.RED, "points": [Point(1, 2)]}
+        with db.dbenv.begin(write=True) as txn:
+            txn.put(b"g:n", pickle.dumps(signature))
+            txn.put(b"g:n:__meas__", pickle.dumps({"acc": 0.9}))
+            txn.put(b"g:broken", b"\x80\x04broken")
+
+        self.assertEqual(signature, db.get_argsignature("g", "n"))
+        self.assertEqual((2, 1), db.migrate())
+        with db.dbenv.begin() as txn:
+            self.assertTrue(_encoding.is_encoded(txn.get(b"g:n")))
+        self.assertEqual(signature, db.get_argsignature("g", "n"))
+        self.assertEqual({"acc": 0.9}, db.get_measurement("g", "n"))
+        self.assertEqual((0, 1), db.migrate())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""Tests the node execution backends.
+"""
+
+import os
+import shutil
+import unittest
+from pathlib import Path
+
+import rflow
+from rflow import _ui
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name
+
+HERE = Path(__file__).parent
+
+
+class CountWords(rflow.Interface):
+    executor = "process"
+
+    def evaluate(self, resource, text):
+        count = len(text.split())
+        resource.pickle_dump((count, os.getpid(), os.path.abspath('.')))
+        return count, os.getpid()
+
+    def load(self, resource):
+        count, pid, _ = resource.pickle_load()
+        return count, pid
+
+
+class Double(rflow.Interface):
+    def evaluate(self, count):
+        return count * 2, os.getpid()
+
+
+class Unknown(rflow.Interface):
+    executor = "gpu"
+
+    def evaluate(self, value):
+        return value
+
+
+class ExecutorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _ui.ui.set_traceback_policy('raise-exp')
+
+    @classmethod
+    def tearDownClass(cls):
+        rflow.executor.shutdown()
+
+    def _clean(self):
+        db_path = HERE / rflow.common.DOT_DATABASE_FILENAME
+        if db_path.exists():
+            shutil.rmtree(str(db_path))
+        if (HERE / "count.pkl").exists():
+            os.remove(str(HERE / "count.pkl"))
+
+    def setUp(self):
+        self._clean()
+
+    def tearDown(self):
+        self._clean()
+
+    def test_process(self):
+        with rflow.begin_graph("process", HERE) as g:
+            g.count = CountWords(rflow.FSResource("count.pkl"))
+            g.count.args.text = "one two three"
+
+            g.double = Double()
+            g.double.args.count = g.count[0]
+
+        value, pid = g.run("double", jobs=2)
+        self.assertEqual(6, value)
+        self.assertEqual(os.getpid(), pid)
+
+        count, worker_pid, work_dir = g.count.resource.call().pickle_load()
+        self.assertEqual(3, count)
+        self.assertNotEqual(os.getpid(), worker_pid)
+        self.assertEqual(str(HERE.absolute()), work_dir)
+        # Measured on the worker.
+        self.assertGreater(
+            g.count.get_timing()["evaluate"]["write_bytes"], 0)
+
+        g.count.update()
+        self.assertFalse(g.count.is_dirty())
+
+    def test_unknown(self):
+        with rflow.begin_graph("unknown_executor", HERE) as g:
+            g.unknown = Unknown()
+            g.unknown.args.value = 1
+
+        with self.assertRaises(rflow.WorkflowError):
+            g.unknown.call()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""Tests garbage collection of resources and artifacts.
+"""
+
+import shutil
+import unittest
+from pathlib import Path
+
+import rflow
+from rflow.cache import ArtifactCache
+from rflow._encoding import encode
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name,protected-access
+
+HERE = Path(__file__).parent
+
+
+class Write(rflow.Interface):
+    def evaluate(self, resource, text):
+        with open(resource.filepath, "w") as stream:
+            stream.write(text)
+        return text
+
+    def load(self, resource):
+        with open(resource.filepath, "r") as stream:
+            return stream.read()
+
+
+class Read(rflow.Interface):
+    def evaluate(self, resource, source):
+        text = Path(source.filepath).read_text()
+        with open(resource.filepath, "w") as stream:
+            stream.write(text)
+        return text
+
+
+class GarbageTest(unittest.TestCase):
+    GARBAGE_DIR = HERE / "garbage"
+    CACHE_DIR = HERE / "garbage-cache"
+
+    def _clean(self):
+        for path in [HERE / rflow.common.DOT_DATABASE_FILENAME,
+                     GarbageTest.GARBAGE_DIR, GarbageTest.CACHE_DIR]:
+            if path.exists():
+                shutil.rmtree(str(path))
+
+    def setUp(self):
+        self._clean()
+        GarbageTest.GARBAGE_DIR.mkdir()
+
+    def tearDown(self):
+        self._clean()
+
+    def _graph(self, name):
+        with rflow.begin_graph(name, HERE) as g:
+            g.write = Write(rflow.FSResource(
+                GarbageTest.GARBAGE_DIR / "current.txt"))
+            g.write.args.text = "a"
+        return g
+
+    def _old_file(self, g, name, created, accessed):
+        path = GarbageTest.GARBAGE_DIR / name
+        path.write_text("x" * 100)
+        g.args_context.touch_access(g.name, [str(path)], created)
+        g.args_context.touch_access(g.name, [str(path)], accessed)
+        return str(path)
+
+    def test_resources(self):
+        g = self._graph("garbage_resources")
+        g.write.call()
+        current = str(GarbageTest.GARBAGE_DIR / "current.txt")
+        self.assertIn(current, g.args_context.get_access_times(g.name))
+
+        old1 = self._old_file(g, "old1.txt", 1000, 1000)
+        old2 = self._old_file(g, "old2.txt", 500, 3000)
+
+        removed = g.collect_garbage(max_size=101, dry_run=True)
+        self.assertEqual([old1], [garbage.path for garbage in removed])
+        self.assertEqual(100, removed[0].size)
+        self.assertTrue(Path(old1).exists())
+
+        removed = g.collect_garbage(max_size=101, policy="age", dry_run=True)
+        self.assertEqual([old2], [garbage.path for garbage in removed])
+
+        removed = g.collect_garbage(max_size=0)
+        self.assertEqual([old1, old2], [garbage.path for garbage in removed])
+        self.assertFalse(Path(old1).exists())
+        self.assertFalse(Path(old2).exists())
+        self.assertTrue(Path(current).exists())
+        self.assertEqual([current],
+                         list(g.args_context.get_access_times(g.name)))
+
+        removed = g.collect_garbage(max_age=0, include_referenced=True)
+        self.assertEqual([current], [garbage.path for garbage in removed])
+        self.assertFalse(Path(current).exists())
+
+    def test_referenced_inside(self):
+        g = self._graph("garbage_referenced_inside")
+        g.write.call()
+        # A stale directory resource holding the current file.
+        g.args_context.touch_access(
+            g.name, [str(GarbageTest.GARBAGE_DIR)], 1000)
+
+        self.assertEqual([], g.collect_garbage(max_size=0))
+        self.assertTrue((GarbageTest.GARBAGE_DIR / "current.txt").exists())
+
+    def test_inputs(self):
+        with rflow.begin_graph("garbage_inputs", HERE) as g:
+            g.read = Read(rflow.FSResource(
+                GarbageTest.GARBAGE_DIR / "copy.txt"))
+        inputs = []
+        for name in ["v1.csv", "v2.csv"]:
+            path = GarbageTest.GARBAGE_DIR / name
+            path.write_text(name)
+            inputs.append(path)
+            g.read.args.source = rflow.FSResource(path)
+            self.assertEqual(name, g.read.call())
+
+        # Records of older versions may be of user inputs.
+        db = g.args_context
+        db._put(db._get_db_access_id(g.name, str(inputs[0])),
+                encode((1.0, 1.0)))
+
+        self.assertEqual([], g.collect_garbage(max_size=1))
+        for path in inputs:
+            self.assertTrue(path.exists())
+
+    def test_artifacts(self):
+        g = self._graph("garbage_artifacts")
+        g.artifact_cache = cache = ArtifactCache(GarbageTest.CACHE_DIR)
+        for text in ["a", "b", "a"]:
+            g.write.args.text = text
+            self.assertEqual(text, g.write.call())
+        self.assertEqual(2, len(cache.get_entries()))
+
+        # current.txt, plus one byte for each cached object.
+        removed = g.collect_garbage(max_size=2)
+        self.assertEqual(1, len(removed))
+        self.assertEqual("artifact", removed[0].kind)
+        self.assertEqual(1, removed[0].size)
+        self.assertEqual(1, len(cache.get_entries()))
+        self.assertEqual(1, len(list(
+            (GarbageTest.CACHE_DIR / "objects").glob("*/*"))))
+
+        g.write.args.text = "b"
+        self.assertEqual("b", g.write.call())
+        g.write.args.text = "a"
+        self.assertEqual("a", g.write.call())
+        self.assertEqual(2, len(cache.get_entries()))
+
+
+if __name__ == "__main__":
+    unittest.main()
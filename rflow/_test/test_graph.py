@@ -61,6 +61,22 @@ class TestUtil(unittest.TestCase):
         self.assertEqual(["p1_hello", "p2_hello"],
                          [n.name for n in g.node_list])
 
+    def test_match_node_names(self):
+        with rflow.begin_graph("test_match", HERE) as g:
+            for prefix in ["cos_", "l2_"]:
+                with g.prefix(prefix) as sub:
+                    sub.features = _HelloNode()
+                    sub.features.args.message = prefix
+                    sub.mAP_eval = _HelloNode()
+                    sub.mAP_eval.args.message = prefix
+
+        self.assertEqual(["cos_features", "cos_mAP_eval"],
+                         g.match_node_names(["cos_*"]))
+        self.assertEqual(["cos_mAP_eval", "l2_mAP_eval", "l2_features"],
+                         g.match_node_names(["*_mAP_eval", "l2_*"]))
+        with self.assertRaises(rflow.WorkflowError):
+            g.match_node_names(["dot_*"])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""Tests the run history.
+"""
+
+import io
+import json
+import shutil
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from contextlib import redirect_stdout
+
+import rflow
+from rflow import command, _ui
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name
+
+HERE = Path(__file__).parent
+
+
+class Write(rflow.Interface):
+    def evaluate(self, resource, text):
+        with open(resource.filepath, "w") as stream:
+            stream.write(text)
+        return text
+
+    def load(self, resource):
+        with open(resource.filepath, "r") as stream:
+            return stream.read()
+
+
+class Upper(rflow.Interface):
+    def evaluate(self, text):
+        return text.upper()
+
+
+class HistoryTest(unittest.TestCase):
+    HISTORY_DIR = HERE / "history"
+
+    def _clean(self):
+        for path in [HERE / rflow.common.DOT_DATABASE_FILENAME,
+                     HistoryTest.HISTORY_DIR]:
+            if path.exists():
+                shutil.rmtree(str(path))
+
+    def setUp(self):
+        self._clean()
+        HistoryTest.HISTORY_DIR.mkdir()
+
+    def tearDown(self):
+        self._clean()
+
+    def _graph(self, name):
+        with rflow.begin_graph(name, HERE) as g:
+            g.write = Write(rflow.FSResource(
+                HistoryTest.HISTORY_DIR / "write.txt"))
+            g.write.args.text = "a"
+
+            g.upper = Upper()
+            g.upper.args.text = g.write
+        return g
+
+    def test_records(self):
+        g = self._graph("history_records")
+        g.upper.call()
+        g.clear_cache()
+        g.upper.call()
+        g.write.call()
+
+        records = g.get_history()
+        self.assertEqual(
+            [("write", "evaluate"), ("upper", "evaluate"),
+             ("write", "load"), ("upper", "evaluate"),
+             ("write", "skip")],
+            [(record["node"], record["action"]) for record in records])
+        for record in records:
+            self.assertEqual("ok", record["status"])
+            self.assertLessEqual(record["start"], record["end"])
+            self.assertGreater(record["peak_rss"], 0)
+
+        first_run = records[0]["run"]
+        self.assertEqual(first_run, records[1]["run"])
+        self.assertNotEqual(first_run, records[2]["run"])
+        self.assertEqual(records[0]["signature"], records[2]["signature"])
+
+        g.write.args.text = "b"
+        g.write.call()
+        self.assertNotEqual(records[0]["signature"],
+                            g.get_history("write")[-1]["signature"])
+
+        self.assertEqual(["write"] * 4, [
+            record["node"] for record in g.get_history("write")])
+        self.assertEqual(
+            records[2:4], g.get_history(since=records[2]["start"],
+                                        until=records[4]["start"]))
+        self.assertEqual([records[2]], g.get_history(
+            "write", since=records[1]["start"], until=records[4]["start"]))
+
+    def test_failure(self):
+        g = self._graph("history_failure")
+        g.write.args.text = None
+        with _ui.ui.traceback_policy("raise-exp"):
+            with self.assertRaises(TypeError):
+                g.write.call()
+
+        record = g.get_history("write")[-1]
+        self.assertEqual(("evaluate", "failed"),
+                         (record["action"], record["status"]))
+
+    def test_command(self):
+        g = self._graph("history_command")
+        g.upper.call()
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(0, command._history_main(
+                g, ["--slowest", "1", "--json"]))
+        self.assertEqual(1, len(json.loads(output.getvalue())))
+
+        output = io.StringIO()
+        with patch.object(_ui.ui, "_out", output):
+            self.assertEqual(0, command._history_main(
+                g, ["up*", "--since", "1h"]))
+        lines = output.getvalue().splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertIn("upper", lines[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
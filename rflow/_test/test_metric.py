@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""Tests the metric streams of nodes.
+"""
+
+import io
+import csv
+import shutil
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from contextlib import redirect_stdout
+
+import rflow
+from rflow import command, node
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name
+
+HERE = Path(__file__).parent
+
+
+class Train(rflow.Interface):
+    def evaluate(self, steps):
+        for step in range(steps):
+            self.log_metric("loss", 1.0 / (step + 1))
+            if step % 2 == 0:
+                self.log_metric("accuracy", step / steps, step=step)
+        return steps
+
+
+class MetricTest(unittest.TestCase):
+    def _clean(self):
+        path = HERE / rflow.common.DOT_DATABASE_FILENAME
+        if path.exists():
+            shutil.rmtree(str(path))
+
+    def setUp(self):
+        self._clean()
+
+    def tearDown(self):
+        self._clean()
+
+    def _graph(self, name, steps):
+        with rflow.begin_graph(name, HERE) as g:
+            g.train = Train()
+            g.train.args.steps = steps
+        return g
+
+    def test_log(self):
+        g = self._graph("metric_log", 10)
+        with patch.object(node, "METRIC_BUFFER_SIZE", 4):
+            g.train.call()
+
+        metrics = g.train.get_metrics()
+        self.assertEqual(["accuracy", "loss"], sorted(metrics))
+        self.assertEqual(list(range(10)),
+                         [step for step, _, _ in metrics["loss"]])
+        self.assertEqual(0.1, metrics["loss"][-1][2])
+        self.assertEqual([0, 2, 4, 6, 8],
+                         [step for step, _, _ in metrics["accuracy"]])
+
+        self.assertEqual({"loss": metrics["loss"][3:6]},
+                         g.train.get_metrics("loss", start=3, stop=6))
+        self.assertEqual({"loss": (10, 9, 0.1), "accuracy": (5, 8, 0.8)},
+                         g.train.get_metric_index())
+
+        g.train.args.steps = 3
+        g.train.call()
+        self.assertEqual([0, 1, 2], [
+            step for step, _, _ in g.train.get_metrics("loss")["loss"]])
+        self.assertEqual(3, g.train.get_metric_index()["loss"][0])
+
+    def test_invalid_step(self):
+        g = self._graph("metric_invalid_step", 1)
+        g.train.log_metric("loss", 1.0, step=-1)
+        with self.assertRaises(rflow.WorkflowError):
+            g.train.flush_metrics()
+
+    def test_command(self):
+        g = self._graph("metric_command", 4)
+        g.train.call()
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(0, command._metrics_main(
+                g, ["train", "--name", "loss", "--start", "2"]))
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual(["node", "name", "step", "time", "value"], rows[0])
+        self.assertEqual([("2", "0.3333333333333333"), ("3", "0.25")],
+                         [(row[2], row[4]) for row in rows[1:]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -75,6 +75,39 @@ class DependsOnFile(rflow.Interface):
             return [line.strip() for line in stream.readlines()]
 
 
+class WriteText(rflow.Interface):
+    early_cutoff = True
+
+    def evaluate(self, resource, text, verbose):
+        # verbose only changes the signature.
+        del verbose
+        with open(resource.filepath, "w") as stream:
+            stream.write(text)
+
+    def load(self, resource):
+        return resource
+
+
+class CountChars(rflow.Interface):
+    eval_count = 0
+
+    def evaluate(self, text_res):
+        CountChars.eval_count += 1
+        with open(text_res.filepath, "r") as stream:
+            return len(stream.read())
+
+
+class Identity(rflow.Interface):
+    def evaluate(self, value):
+        return value
+
+
+class CountCharsPlus(rflow.Interface):
+    def evaluate(self, text_res, offset):
+        with open(text_res.filepath, "r") as stream:
+            return len(stream.read()) + offset
+
+
 class NodeTest(unittest.TestCase):
     def _clean(self):
         db_path = HERE / rflow.core.DOT_DATABASE_FILENAME
@@ -84,6 +117,8 @@ class NodeTest(unittest.TestCase):
         with suppress(FileNotFoundError):
             os.remove(str(HERE / "T1.pickle"))
             os.remove(str(HERE / "T2.pickle"))
+        with suppress(FileNotFoundError):
+            os.remove(str(HERE / "cutoff.txt"))
 
     def tearDown(self):
         self._clean()
@@ -182,6 +217,48 @@ class NodeTest(unittest.TestCase):
         with self.assertRaises(rflow.WorkflowError):
             t1.call()
 
+    def test_early_cutoff(self):
+        with rflow.begin_graph("early_cutoff", HERE) as g:
+            g.write = WriteText(rflow.FSResource("cutoff.txt"))
+            g.write.args.text = "abc"
+            g.write.args.verbose = False
+
+            g.count = CountChars()
+            g.count.args.text_res = g.write.resource
+
+        CountChars.eval_count = 0
+        self.assertEqual(3, g.count.call())
+
+        g.write.args.verbose = True
+        self.assertEqual(3, g.count.call())
+        self.assertEqual(1, CountChars.eval_count)
+        self.assertFalse(g.write.is_dirty())
+
+        g.write.args.text = "abcd"
+        self.assertEqual(4, g.count.call())
+        self.assertEqual(2, CountChars.eval_count)
+
+    def test_early_cutoff_other_dirty(self):
+        with rflow.begin_graph("early_cutoff_other_dirty", HERE) as g:
+            g.write = WriteText(rflow.FSResource("cutoff.txt"))
+            g.write.args.text = "abc"
+            g.write.args.verbose = False
+
+            g.offset = Identity()
+            g.offset.args.value = 1
+
+            g.count = CountCharsPlus()
+            g.count.args.text_res = g.write.resource
+            g.count.args.offset = g.offset
+
+        self.assertEqual(4, g.count.call())
+
+        # The rewritten file is the same, but the offset node has no
+        # resource to compare.
+        g.write.args.verbose = True
+        g.offset.args.value = 2
+        self.assertEqual(5, g.count.call())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""Tests concurrent runs by several processes on the same work
+directory.
+"""
+
+import time
+import shutil
+import unittest
+import multiprocessing
+from pathlib import Path
+
+import rflow
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name
+
+HERE = Path(__file__).parent
+OUTPUT = HERE / "process-output.txt"
+EVALUATIONS = HERE / "process-evaluations.txt"
+
+
+class Slow(rflow.Interface):
+    def evaluate(self, resource, text):
+        with open(str(EVALUATIONS), "a") as stream:
+            stream.write("evaluate\n")
+        time.sleep(1)
+        with open(resource.filepath, "w") as stream:
+            stream.write(text)
+        return text
+
+    def load(self, resource):
+        with open(resource.filepath, "r") as stream:
+            return stream.read()
+
+
+class Value(rflow.Interface):
+    def evaluate(self, x):
+        return x
+
+
+class Save(rflow.Interface):
+    def evaluate(self, resource, value):
+        with open(resource.filepath, "w") as stream:
+            stream.write(str(value * 10))
+        return value * 10
+
+    def load(self, resource):
+        with open(resource.filepath, "r") as stream:
+            return int(stream.read())
+
+
+def _call_slow(text):
+    with rflow.begin_graph("process", HERE) as g:
+        g.slow = Slow(rflow.FSResource(OUTPUT))
+        g.slow.args.text = text
+    return g.slow.call()
+
+
+class ProcessTest(unittest.TestCase):
+    def _clean(self):
+        db_path = HERE / rflow.common.DOT_DATABASE_FILENAME
+        if db_path.exists():
+            shutil.rmtree(str(db_path))
+        for path in [OUTPUT, EVALUATIONS]:
+            if path.exists():
+                path.unlink()
+
+    def setUp(self):
+        self._clean()
+
+    def tearDown(self):
+        self._clean()
+
+    def test_same_node(self):
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(2) as pool:
+            values = pool.map(_call_slow, ["text", "text"], chunksize=1)
+
+        self.assertEqual(["text", "text"], values)
+        self.assertEqual(1, len(EVALUATIONS.read_text().splitlines()))
+
+    def test_value_upstream(self):
+        with rflow.begin_graph("process_value_upstream", HERE) as g:
+            g.b = Value()
+            g.b.args.x = 1
+            g.c = Save(rflow.FSResource(OUTPUT))
+            g.c.args.value = g.b
+
+        self.assertEqual(10, g.c.call())
+        g.b.args.x = 2
+        self.assertEqual(20, g.c.call())
+
+
+if __name__ == "__main__":
+    unittest.main()
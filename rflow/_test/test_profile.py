@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""Tests the resource usage recorded for node calls.
+"""
+
+import io
+import json
+import shutil
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from contextlib import redirect_stdout
+
+import rflow
+from rflow import command, viz, _ui
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name
+
+HERE = Path(__file__).parent
+
+SIZE = 1 << 20
+
+
+class Write(rflow.Interface):
+    def evaluate(self, resource):
+        with open(resource.filepath, "wb") as stream:
+            stream.write(b"x" * SIZE)
+        return sum(range(100000))
+
+    def load(self, resource):
+        with open(resource.filepath, "rb") as stream:
+            return len(stream.read())
+
+
+class ProfileTest(unittest.TestCase):
+    def _clean(self):
+        for path in [HERE / rflow.common.DOT_DATABASE_FILENAME,
+                     HERE / "profile.bin"]:
+            if path.is_dir():
+                shutil.rmtree(str(path))
+            elif path.exists():
+                path.unlink()
+
+    def setUp(self):
+        self._clean()
+
+    def tearDown(self):
+        self._clean()
+
+    def test_usage(self):
+        with rflow.begin_graph("profile_usage", HERE) as g:
+            g.write = Write(rflow.FSResource(HERE / "profile.bin"))
+
+        g.write.call()
+        g.clear_cache()
+        self.assertEqual(SIZE, g.write.call())
+
+        timing = g.write.get_timing()
+        evaluate, load = timing["evaluate"], timing["load"]
+        self.assertGreaterEqual(evaluate["write_bytes"], SIZE)
+        self.assertGreaterEqual(load["read_bytes"], SIZE)
+        for usage in (evaluate, load):
+            self.assertGreater(usage["wall"], 0.0)
+            self.assertAlmostEqual(usage["cpu"], usage["user"] + usage["sys"])
+            self.assertGreaterEqual(usage["peak_rss_delta"], 0)
+
+        output = io.StringIO()
+        with patch.object(_ui.ui, "_out", output):
+            self.assertEqual(0, command._usage_main(g, []))
+        lines = output.getvalue().splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertIn("written", lines[0])
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(0, command._usage_main(g, ["wr*", "--json"]))
+        self.assertEqual({"evaluate", "load"}, {
+            call["action"] for call in json.loads(output.getvalue())})
+
+    def test_viz(self):
+        with rflow.begin_graph("profile_viz", HERE) as g:
+            g.write = Write(rflow.FSResource(HERE / "profile.bin"))
+
+        g.write.call()
+        g.write.save_measurement({"evaluate": "user value",
+                                  "usage": "user usage"})
+        source = viz.dag2dot(g).source
+        self.assertIn("user value", source)
+        self.assertIn("user usage", source)
+        self.assertIn("wall", source)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""Tests profiling of node calls.
+"""
+
+import io
+import os
+import time
+import pstats
+import shutil
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import rflow
+from rflow import command, profiler, _ui
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name
+
+HERE = Path(__file__).parent
+
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    count = 0
+    while time.perf_counter() < end:
+        count += 1
+    return count
+
+
+class Busy(rflow.Interface):
+    def evaluate(self, seconds):
+        return busy_loop(seconds) > 0
+
+
+class ProcessBusy(rflow.Interface):
+    executor = "process"
+
+    def evaluate(self, seconds):
+        return busy_loop(seconds) > 0
+
+
+class ProfilerTest(unittest.TestCase):
+    PROFILE_DIR = HERE / "profile"
+
+    @classmethod
+    def tearDownClass(cls):
+        rflow.executor.shutdown()
+
+    def _clean(self):
+        for path in [HERE / rflow.common.DOT_DATABASE_FILENAME,
+                     ProfilerTest.PROFILE_DIR]:
+            if path.exists():
+                shutil.rmtree(str(path))
+
+    def setUp(self):
+        self._clean()
+
+    def tearDown(self):
+        self._clean()
+
+    def _graph(self, name):
+        with rflow.begin_graph(name, HERE) as g:
+            g.busy = Busy()
+            g.busy.args.seconds = 0.2
+            g.other = Busy()
+            g.other.args.seconds = 0.01
+            g.process = ProcessBusy()
+            g.process.args.seconds = 0.2
+        return g
+
+    def _hot_names(self, run_profiler):
+        return [location.rsplit('(', 1)[-1].rstrip(')')
+                for location, _, _, _ in run_profiler.get_hot_functions(5)]
+
+    def test_deterministic(self):
+        g = self._graph("profiler_deterministic")
+        run_profiler = profiler.Profiler(ProfilerTest.PROFILE_DIR, ["bu*"])
+        g.run(["busy", "other"], profiler=run_profiler)
+
+        self.assertEqual(1, len(run_profiler.dumps))
+        dump = run_profiler.dumps[0]
+        self.assertEqual(str(ProfilerTest.PROFILE_DIR),
+                         os.path.dirname(run_profiler.run_directory))
+        self.assertTrue(os.path.basename(dump).startswith(
+            "profiler_deterministic.busy.evaluate."))
+
+        stats = pstats.Stats(dump)
+        self.assertIn("busy_loop", [
+            func[2] for func in stats.stats])  # pylint: disable=no-member
+        self.assertIn("busy_loop", self._hot_names(run_profiler))
+
+    def test_sampling(self):
+        g = self._graph("profiler_sampling")
+        run_profiler = profiler.Profiler(
+            ProfilerTest.PROFILE_DIR, mode=profiler.SAMPLING, interval=0.01)
+        g.run(["busy", "process"], profiler=run_profiler)
+
+        self.assertEqual(2, len(run_profiler.dumps))
+        for dump in run_profiler.dumps:
+            self.assertTrue(os.path.exists(dump))
+        busy_loop_stats = [
+            stat for func, stat in pstats.Stats(
+                *run_profiler.dumps).stats.items()  # pylint: disable=no-member
+            if func[2] == "busy_loop"][0]
+        # Both calls, in this process and in a worker, were sampled.
+        self.assertGreater(busy_loop_stats[3], 0.2)
+        self.assertEqual("busy_loop", self._hot_names(run_profiler)[0])
+
+    def test_command(self):
+        g = self._graph("profiler_command")
+        output = io.StringIO()
+        with patch.object(_ui.ui, "_out", output):
+            self.assertEqual(0, command._run_main(g, [
+                "--profile", "busy", "--profile-dir",
+                str(ProfilerTest.PROFILE_DIR), "--profile-top", "3"]))
+        lines = output.getvalue().splitlines()
+        self.assertIn("Profiles written to " + str(ProfilerTest.PROFILE_DIR),
+                      output.getvalue())
+        self.assertTrue(any("busy_loop" in line for line in lines))
+
+        output = io.StringIO()
+        with patch.object(_ui.ui, "_out", output):
+            self.assertEqual(0, command._run_main(g, [
+                "--profile-nodes", "bu*", "busy", "--redo", "--profile-dir",
+                str(ProfilerTest.PROFILE_DIR)]))
+        self.assertIn("busy_loop", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
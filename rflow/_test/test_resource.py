@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+"""Tests resource hashing.
+"""
+
+import os
+import shutil
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from contextlib import suppress
+
+import rflow
+from rflow import _digest
+from rflow._argument import ArgumentSignatureDB
+from rflow._run import begin_run
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name
+
+HERE = Path(__file__).parent
+
+
+class ShardedNode(rflow.Interface):
+    def evaluate(self, resource, count):
+        for i in range(count):
+            with open(resource[i].filepath, "w") as stream:
+                stream.write(str(i))
+
+    def load(self, resource):
+        return resource
+
+
+class ReadShard(rflow.Interface):
+    def evaluate(self, shard):
+        with open(shard.filepath, "r") as stream:
+            return stream.read()
+
+
+class CountingResource(rflow.FSResource):
+    calls = {"exists": 0, "get_hash": 0}
+
+    def exists(self):
+        CountingResource.calls["exists"] += 1
+        return super(CountingResource, self).exists()
+
+    def get_hash(self):
+        CountingResource.calls["get_hash"] += 1
+        return super(CountingResource, self).get_hash()
+
+
+class Produce(rflow.Interface):
+    def evaluate(self, resource):
+        return resource.pickle_dump(1)
+
+    def load(self, resource):
+        return resource.pickle_load()
+
+
+class Consume(rflow.Interface):
+    def evaluate(self, resource, index):
+        return resource.pickle_load() + index
+
+
+class ResourceTest(unittest.TestCase):
+    FILENAME = str(HERE / "content.txt")
+    DIRNAME = HERE / "content-dir"
+
+    def _clean(self):
+        db_path = HERE / rflow.common.DOT_DATABASE_FILENAME
+        if db_path.exists():
+            shutil.rmtree(str(db_path))
+        with suppress(FileNotFoundError):
+            os.remove(ResourceTest.FILENAME)
+        if ResourceTest.DIRNAME.exists():
+            shutil.rmtree(str(ResourceTest.DIRNAME))
+
+    def setUp(self):
+        self._clean()
+        # pylint: disable=protected-access
+        _digest._CACHE.clear()
+        _digest._TREE_CACHE.clear()
+
+    def tearDown(self):
+        self._clean()
+
+    def _write(self, content, mtime):
+        with open(ResourceTest.FILENAME, "w") as stream:
+            stream.write(content)
+        os.utime(ResourceTest.FILENAME, (mtime, mtime))
+
+    def test_hash_content(self):
+        mtime_res = rflow.FSResource(ResourceTest.FILENAME)
+        content_res = rflow.FSResource(ResourceTest.FILENAME,
+                                       hash_content=True, chunk_size=2)
+        self.assertIsNone(content_res.get_hash())
+
+        self._write("some content", 1000)
+        mtime_hash = mtime_res.get_hash()
+        content_hash = content_res.get_hash()
+        self.assertEqual(content_hash, mtime_res.get_digest())
+
+        self._write("some content", 2000)
+        self.assertNotEqual(mtime_hash, mtime_res.get_hash())
+        self.assertEqual(content_hash, content_res.get_hash())
+
+        self._write("other content", 2000)
+        self.assertNotEqual(content_hash, content_res.get_hash())
+
+    def test_persistent_cache(self):
+        self._write("some content", 1000)
+        stat = os.stat(ResourceTest.FILENAME)
+        stat_key = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+        db = ArgumentSignatureDB()
+        db.open(str(HERE / rflow.common.DOT_DATABASE_FILENAME))
+        db.set_file_digest(ResourceTest.FILENAME, stat_key, "cached")
+
+        resource = rflow.FSResource(ResourceTest.FILENAME)
+        with begin_run() as run:
+            run.digest_db = db
+            self.assertEqual("cached", resource.get_digest())
+
+        self._write("some content", 2000)
+        with begin_run() as run:
+            run.digest_db = db
+            digest = resource.get_digest()
+        self.assertNotEqual("cached", digest)
+
+        stat = os.stat(ResourceTest.FILENAME)
+        self.assertEqual(digest, db.get_file_digest(
+            ResourceTest.FILENAME,
+            (stat.st_size, stat.st_mtime_ns, stat.st_ino)))
+        self.assertIsNone(db.get_file_digest(ResourceTest.FILENAME, stat_key))
+
+    def test_dir(self):
+        (ResourceTest.DIRNAME / "sub").mkdir(parents=True)
+        for name in ["a.txt", "b.txt", "sub/c.txt"]:
+            (ResourceTest.DIRNAME / name).write_text(name)
+
+        resource = rflow.DirResource(ResourceTest.DIRNAME, exclude=["*.tmp"])
+        txt_resource = rflow.DirResource(ResourceTest.DIRNAME,
+                                         include=["sub/*.txt"])
+
+        # pylint: disable=protected-access
+        with patch.object(_digest, "_hash_file",
+                          side_effect=_digest._hash_file) as hash_file:
+            digest = resource.get_hash()
+            self.assertEqual(3, hash_file.call_count)
+
+            self.assertEqual(digest, resource.get_hash())
+            self.assertEqual(3, hash_file.call_count)
+
+            os.utime(str(ResourceTest.DIRNAME / "sub" / "c.txt"), (1000, 1000))
+            (ResourceTest.DIRNAME / "x.tmp").write_text("temporary")
+            self.assertEqual(digest, resource.get_hash())
+            self.assertEqual(4, hash_file.call_count)
+
+        sub_digest = txt_resource.get_hash()
+        (ResourceTest.DIRNAME / "a.txt").write_text("changed")
+        self.assertEqual(sub_digest, txt_resource.get_hash())
+
+        (ResourceTest.DIRNAME / "sub" / "c.txt").write_text("changed")
+        self.assertNotEqual(digest, resource.get_hash())
+        self.assertNotEqual(sub_digest, txt_resource.get_hash())
+
+        self.assertIsNone(rflow.DirResource(HERE / "no-dir").get_hash())
+
+        self.assertEqual(resource, rflow.DirResource(ResourceTest.DIRNAME,
+                                                     exclude=["*.tmp"]))
+        self.assertNotEqual(resource, rflow.DirResource(ResourceTest.DIRNAME))
+        self.assertNotEqual(txt_resource, rflow.DirResource(
+            ResourceTest.DIRNAME, include=["*.txt"]))
+
+    def test_multi(self):
+        ResourceTest.DIRNAME.mkdir()
+        paths = [ResourceTest.DIRNAME / "shard{}.txt".format(i)
+                 for i in range(20)]
+        resource = rflow.MultiResource(
+            *[rflow.FSResource(path, hash_content=True) for path in paths],
+            max_workers=4)
+        self.assertFalse(resource.exists())
+        self.assertIsNone(resource.get_hash())
+
+        for i, path in enumerate(paths):
+            path.write_text(str(i))
+        self.assertTrue(resource.exists())
+        digest = resource.get_hash()
+
+        reversed_res = rflow.MultiResource(*reversed(resource.fsresource_list))
+        self.assertNotEqual(digest, reversed_res.get_hash())
+        self.assertEqual(20, len(reversed_res))
+
+        paths[3].write_text("changed")
+        self.assertNotEqual(digest, resource.get_hash())
+
+        with rflow.begin_graph("multi_resource", HERE) as g:
+            g.shards = ShardedNode(resource)
+            g.shards.args.count = 20
+
+            g.shard = ReadShard()
+            g.shard.args.shard = g.shards.resource[5]
+
+        self.assertEqual("5", g.shard.call())
+
+    def test_run_cache(self):
+        with rflow.begin_graph("run_cache", HERE) as g:
+            g.produce = Produce(CountingResource(ResourceTest.FILENAME))
+            for i in range(10):
+                g["consume{}".format(i)] = node = Consume()
+                node.args.resource = g.produce.resource
+                node.args.index = i
+
+        targets = ["consume{}".format(i) for i in range(10)]
+        self.assertEqual(list(range(1, 11)), g.run(targets))
+        self.assertEqual(1, CountingResource.calls["get_hash"])
+
+        g.clear_cache()
+        CountingResource.calls.update(exists=0, get_hash=0)
+        self.assertEqual(list(range(1, 11)), g.run(targets))
+        self.assertEqual({"exists": 1, "get_hash": 1}, CountingResource.calls)
+
+        # The consumers must sign the rewritten resource, not the
+        # hash cached before the producer evaluated.
+        os.utime(ResourceTest.FILENAME, (1000, 1000))
+        with begin_run():
+            g.consume0.update()
+            g.run(["produce"] + targets, redo=True)
+        g.consume0.update()
+        self.assertFalse(g.consume0.is_dirty())
+
+    def test_combine(self):
+        self.assertNotEqual(_digest.combine_digests(["ab", "c"]),
+                            _digest.combine_digests(["a", "bc"]))
+        self.assertIsNone(_digest.combine_digests(["a", None]))
+
+
+if __name__ == "__main__":
+    unittest.main()
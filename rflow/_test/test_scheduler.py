@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+"""Tests the graph scheduler.
+"""
+
+import io
+import os
+import shutil
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import rflow
+from rflow import _ui
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name
+
+HERE = Path(__file__).parent
+
+
+class Branch(rflow.Interface):
+    """Waits until all branches are running at the same time.
+    """
+    barrier = None
+    eval_count = 0
+
+    def evaluate(self, resource, value):
+        Branch.barrier.wait(timeout=5)
+        Branch.eval_count += 1
+        return resource.pickle_dump(value)
+
+    def load(self, resource):
+        return resource.pickle_load()
+
+
+class Join(rflow.Interface):
+    def evaluate(self, a, b, c):
+        return a + b + c
+
+
+class Sum(rflow.Interface):
+    def evaluate(self, a, b):
+        return a + b
+
+
+class Value(rflow.Interface):
+    def evaluate(self, value):
+        return value
+
+
+class Heavy(rflow.Interface):
+    """Records how many heavy nodes run at the same time.
+    """
+    requires = {"mem_gb": 20}
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def evaluate(self, value):
+        with Heavy.lock:
+            Heavy.running += 1
+            Heavy.max_running = max(Heavy.max_running, Heavy.running)
+        time.sleep(0.05)
+        with Heavy.lock:
+            Heavy.running -= 1
+        return value
+
+
+class Fail(rflow.Interface):
+    def evaluate(self, value):
+        raise RuntimeError("failed on {}".format(value))
+
+
+class FailCall(rflow.Interface):
+    def evaluate(self, value):
+        self.fail("failed on {}".format(value))
+
+
+class FailWrite(rflow.Interface):
+    def evaluate(self, resource):
+        with open(resource.filepath, "w") as stream:
+            stream.write("partial")
+        self.fail("failed after writing")
+
+
+class SchedulerTest(unittest.TestCase):
+    RESOURCES = ["branch-a.pkl", "branch-b.pkl", "branch-c.pkl",
+                 "partial.txt"]
+
+    @classmethod
+    def setUpClass(cls):
+        _ui.ui.set_traceback_policy('raise-exp')
+
+    def _clean(self):
+        db_path = HERE / rflow.common.DOT_DATABASE_FILENAME
+        if db_path.exists():
+            shutil.rmtree(str(db_path))
+        for filename in SchedulerTest.RESOURCES:
+            if (HERE / filename).exists():
+                os.remove(str(HERE / filename))
+
+    def setUp(self):
+        self._clean()
+        Branch.eval_count = 0
+
+    def tearDown(self):
+        self._clean()
+
+    def _create_graph(self, name):
+        with rflow.begin_graph(name, HERE) as g:
+            for i, filename in enumerate(SchedulerTest.RESOURCES):
+                node = Branch(rflow.FSResource(filename))
+                node.args.value = i + 1
+                g["branch{}".format(i)] = node
+
+            g.join = Join()
+            g.join.args.a = g.branch0
+            g.join.args.b = g.branch1
+            g.join.args.c = g.branch2
+        return g
+
+    def test_parallel(self):
+        g = self._create_graph("parallel")
+
+        Branch.barrier = threading.Barrier(3)
+        self.assertEqual(6, g.run("join", jobs=3))
+        self.assertEqual(3, Branch.eval_count)
+
+        g.clear_cache()
+        self.assertEqual([6, 2], g.run(["join", g.branch1], jobs=3))
+        self.assertEqual(3, Branch.eval_count)
+
+    def test_collect(self):
+        g = self._create_graph("collect")
+
+        scheduler = rflow.scheduler.Scheduler()
+        self.assertEqual(
+            ["branch0", "branch1", "branch2", "join"],
+            [job.node.name for job in scheduler.collect([g.join])])
+
+        Branch.barrier = threading.Barrier(1)
+        g.run(g.branch1)
+        g.clear_cache()
+        self.assertEqual(
+            ["branch0", "branch1", "branch2", "join"],
+            [job.node.name for job in scheduler.collect([g.join])])
+
+        g.run(g.join)
+        self.assertEqual(
+            [], [job.node.name for job in scheduler.collect([g.join])])
+
+    def test_plan(self):
+        g = self._create_graph("plan")
+
+        plan = g.plan("join")
+        self.assertEqual(
+            [("branch0", "evaluate"), ("branch1", "evaluate"),
+             ("branch2", "evaluate"), ("join", "evaluate")],
+            [(entry.node.name, entry.action) for entry in plan])
+        self.assertEqual(["resource branch-a.pkl doesn't exist"],
+                         plan[0].reasons)
+        self.assertEqual(["upstream `a` is dirty"], plan[3].reasons)
+
+        Branch.barrier = threading.Barrier(1)
+        g.run("join")
+        g.clear_cache()
+        g.branch2.args.value = 5
+
+        self.assertEqual(
+            [("branch0", "load"), ("branch1", "load"),
+             ("branch2", "evaluate"), ("join", "evaluate")],
+            [(entry.node.name, entry.action)
+             for entry in g.plan(["join", "branch1"])])
+        self.assertEqual(["`value` changed: 3 -> 5"],
+                         g.plan("branch2")[0].reasons)
+
+        g.run("join")
+        self.assertEqual(
+            [("branch0", "skip"), ("branch1", "skip"),
+             ("branch2", "skip"), ("join", "skip")],
+            [(entry.node.name, entry.action)
+             for entry in g.plan("join")])
+        self.assertEqual(4, Branch.eval_count)
+
+    def test_critical_path(self):
+        with rflow.begin_graph("critical_path", HERE) as g:
+            for name in ["short1", "short2", "long"]:
+                g[name] = Value()
+                g[name].args.value = name
+
+            g.after = Value()
+            g.after.args.value = g.long
+
+            g.join = Join()
+            g.join.args.a = g.short1
+            g.join.args.b = g.short2
+            g.join.args.c = g.after
+
+        durations = {"short1": 1.0, "short2": 1.0, "long": 3.0,
+                     "after": 3.0, "join": 0.0}
+        for name, duration in durations.items():
+            g.args_context.set_timing(
+                g.name, name, {"evaluate": {"wall": duration, "cpu": 0.0}})
+
+        self.assertEqual(8.0, g.estimate("join"))
+        self.assertEqual(6.0, g.estimate("join", jobs=2))
+        self.assertEqual(3.0, g.plan("join")[2].duration)
+
+        self.assertEqual("short1short2long", g.run("join", jobs=2))
+        timing = g.join.get_timing()["evaluate"]
+        self.assertLess(timing["wall"], 1.0)
+        self.assertGreaterEqual(timing["cpu"], 0.0)
+
+    def test_budget(self):
+        with rflow.begin_graph("budget", HERE) as g:
+            for i in range(4):
+                g["heavy{}".format(i)] = Heavy()
+                g["heavy{}".format(i)].args.value = i
+
+            g.light = Value()
+            g.light.args.value = 10
+
+        for name in ["heavy0", "heavy1", "heavy2", "heavy3", "light"]:
+            g.args_context.set_timing(
+                g.name, name, {"evaluate": {"wall": 1.0, "cpu": 0.0}})
+
+        targets = ["heavy0", "heavy1", "heavy2", "heavy3", "light"]
+        self.assertEqual(2.0, g.estimate(targets, jobs=4))
+        self.assertEqual(2.0, g.estimate(targets, jobs=4,
+                                         budget={"mem_gb": 40}))
+        self.assertEqual(4.0, g.estimate(targets, jobs=4,
+                                         budget={"mem_gb": 20}))
+
+        self.assertEqual([0, 1, 2, 3, 10],
+                         g.run(targets, jobs=4, budget={"mem_gb": 40}))
+        self.assertEqual(2, Heavy.max_running)
+
+        with self.assertRaises(rflow.WorkflowError):
+            g.run(targets, jobs=4, redo=True, budget={"mem_gb": 10})
+
+    def test_keep_going_fail_call(self):
+        with rflow.begin_graph("keep_going_fail_call", HERE) as g:
+            g.fail = FailCall()
+            g.fail.args.value = 1
+
+            g.after_fail = Value()
+            g.after_fail.args.value = g.fail
+
+            g.ok = Value()
+            g.ok.args.value = 2
+
+        for jobs in [1, 2]:
+            g.clear_cache()
+            output = io.StringIO()
+            with redirect_stdout(output), patch.object(_ui.ui, "_out", output):
+                with self.assertRaises(rflow.common.NodeFailuresError) as context:
+                    g.run(["after_fail", "ok"], jobs=jobs, keep_going=True)
+
+            self.assertEqual([g.fail],
+                             [node for node, _ in context.exception.failures])
+            self.assertEqual([g.after_fail], context.exception.blocked)
+            self.assertEqual(2, g.ok.value)
+
+    def test_fail_erase_resource(self):
+        with rflow.begin_graph("fail_erase_resource", HERE) as g:
+            g.write = FailWrite(rflow.FSResource(HERE / "partial.txt"))
+            g.write.erase_resource_on_fail = True
+
+        output = io.StringIO()
+        with redirect_stdout(output), patch.object(_ui.ui, "_out", output):
+            with self.assertRaises(rflow.WorkflowError):
+                g.write.call()
+            self.assertFalse((HERE / "partial.txt").exists())
+
+            with self.assertRaises(rflow.common.NodeFailuresError):
+                g.run(["write"], keep_going=True)
+            self.assertFalse((HERE / "partial.txt").exists())
+
+    def test_keep_going(self):
+        with rflow.begin_graph("keep_going", HERE) as g:
+            g.fail = Fail()
+            g.fail.args.value = 1
+
+            g.after_fail = Value()
+            g.after_fail.args.value = g.fail
+
+            g.ok = Value()
+            g.ok.args.value = 2
+
+            g.join = Sum()
+            g.join.args.a = g.after_fail
+            g.join.args.b = g.ok
+
+            g.ok_after = Value()
+            g.ok_after.args.value = g.ok
+
+        with self.assertRaises(RuntimeError):
+            g.run(["join", "ok_after"])
+
+        for jobs in [1, 2]:
+            g.clear_cache()
+            output = io.StringIO()
+            with redirect_stdout(output), patch.object(_ui.ui, "_out", output):
+                with self.assertRaises(rflow.common.NodeFailuresError) as context:
+                    g.run(["join", "ok_after"], jobs=jobs, keep_going=True)
+
+            self.assertEqual([g.fail],
+                             [node for node, _ in context.exception.failures])
+            self.assertIsInstance(context.exception.failures[0][1],
+                                  RuntimeError)
+            self.assertEqual([g.after_fail, g.join], context.exception.blocked)
+            self.assertEqual(2, g.ok_after.value)
+            self.assertIn("1 failed, 2 blocked", output.getvalue())
+            self.assertEqual(("evaluate", "blocked"), tuple(
+                g.get_history("join")[-1][field]
+                for field in ("action", "status")))
+
+            g.ok_after.update()
+            self.assertFalse(g.ok_after.is_dirty())
+
+    def test_update_once(self):
+        with rflow.begin_graph("update_once", HERE) as g:
+            left = right = 1
+            for i in range(30):
+                g["left{}".format(i)] = node_l = Sum()
+                node_l.args.a = left
+                node_l.args.b = right
+
+                g["right{}".format(i)] = node_r = Sum()
+                node_r.args.a = left
+                node_r.args.b = right
+                left, right = node_l, node_r
+
+        self.assertEqual(2**30, g.run(g.left29))
+
+        # pylint: disable=protected-access
+        with patch.object(rflow.node.Node, "_update_dirty", autospec=True,
+                          side_effect=rflow.node.Node._update_dirty) as update_dirty:
+            g.clear_cache()
+            g.run(g.left29)
+            self.assertEqual(59, update_dirty.call_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
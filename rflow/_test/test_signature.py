@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""Tests argument signatures.
+"""
+
+import pickle
+import shutil
+import unittest
+from pathlib import Path
+
+import rflow
+from rflow.signature import ArgDigest, get_signature, register_fingerprint
+
+# pylint: disable=missing-docstring,no-self-use,invalid-name,protected-access
+
+HERE = Path(__file__).parent
+
+
+class FakeArray:
+    def __init__(self, data, shape):
+        self.data = bytes(data)
+        self.shape = shape
+        self.dtype = "uint8"
+
+    def tobytes(self):
+        return self.data
+
+    def __eq__(self, other):
+        raise ValueError("The truth value of an array is ambiguous")
+
+
+class Dataset:
+    def __init__(self, name, version):
+        self.name = name
+        self.version = version
+
+    def __eq__(self, other):
+        return self.name == other.name
+
+
+class Versioned:
+    def __init__(self, version):
+        self.version = version
+
+    def get_signature(self):
+        return self.version
+
+
+class Count(rflow.Interface):
+    def evaluate(self, items):
+        return len(items)
+
+
+class SignatureTest(unittest.TestCase):
+    def _clean(self):
+        db_path = HERE / rflow.common.DOT_DATABASE_FILENAME
+        if db_path.exists():
+            shutil.rmtree(str(db_path))
+
+    def setUp(self):
+        self._clean()
+
+    def tearDown(self):
+        self._clean()
+
+    def test_get_signature(self):
+        self.assertEqual(5, get_signature(5))
+        self.assertEqual("name", get_signature("name"))
+        self.assertIsInstance(get_signature("x" * 1000), ArgDigest)
+
+        files = ["file{}.png".format(i) for i in range(1000)]
+        signature = get_signature(files)
+        self.assertIsInstance(signature, ArgDigest)
+        self.assertEqual(signature, get_signature(list(files)))
+        self.assertNotEqual(signature, get_signature(files[:-1]))
+        self.assertNotEqual(get_signature([1, 2]), get_signature([2, 1]))
+        self.assertNotEqual(get_signature([1]), get_signature(["1"]))
+        self.assertEqual(get_signature({"a": 1, "b": [2]}),
+                         get_signature({"b": [2], "a": 1}))
+        self.assertEqual(get_signature({3, 1, 2}), get_signature({1, 2, 3}))
+
+        self.assertEqual(get_signature(FakeArray([1, 2, 3], (3, ))),
+                         get_signature(FakeArray([1, 2, 3], (3, ))))
+        self.assertNotEqual(get_signature(FakeArray([1, 2, 3], (3, ))),
+                            get_signature(FakeArray([1, 2, 3], (1, 3))))
+
+        self.assertEqual(2, get_signature(Versioned(2)))
+        self.assertEqual(get_signature([Versioned(2)]),
+                         get_signature([Versioned(2)]))
+
+        resource = rflow.FSResource("file.txt")
+        self.assertIs(resource, get_signature(resource))
+
+    def test_register(self):
+        dataset = Dataset("coco", 1)
+        self.assertIs(dataset, get_signature(dataset))
+
+        register_fingerprint(Dataset, lambda dataset: dataset.version)
+        self.assertEqual(get_signature(dataset), get_signature(Dataset("voc", 1)))
+        self.assertNotEqual(get_signature(dataset),
+                            get_signature(Dataset("coco", 2)))
+
+    def test_node(self):
+        with rflow.begin_graph("signature", HERE) as g:
+            g.count = Count()
+            g.count.args.items = ["file{}.png".format(i) for i in range(1000)]
+
+        self.assertEqual(1000, g.count.call())
+
+        g.count.args.items = ["file{}.png".format(i) for i in range(1000)]
+        g.count.update()
+        self.assertFalse(g.count.is_dirty())
+
+        saved = g.args_context.get_argsignature(g.name, "count")
+        self.assertIsInstance(saved["items"], ArgDigest)
+
+        g.clear_cache()
+        g.count.args.items = ["file{}.png".format(i) for i in range(999)]
+        reasons = g.plan("count")[0].reasons
+        self.assertEqual(1, len(reasons))
+        self.assertTrue(reasons[0].startswith(
+            "`items` changed: ['file0.png', 'file1.png', 'file2.png', ...]#"))
+        self.assertEqual(999, g.count.call())
+
+    def test_legacy(self):
+        with rflow.begin_graph("signature_legacy", HERE) as g:
+            g.count = Count()
+            g.count.args.items = ["file{}.png".format(i) for i in range(1000)]
+
+        # Older versions pickled the raw arguments.
+        db = g.args_context
+        db._put(db._get_db_id(g.name, "count"), pickle.dumps(
+            {"items": ["file{}.png".format(i) for i in range(1000)]}))
+        g.count.update()
+        self.assertFalse(g.count.is_dirty())
+
+        g.clear_cache()
+        g.count.args.items = ["file{}.png".format(i) for i in range(999)]
+        g.count.update()
+        self.assertTrue(g.count.is_dirty())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,11 @@
 """
 
 import sys
+import time
 import traceback
+import threading
+from contextlib import contextmanager
+from functools import wraps
 
 from termcolor import colored
 
@@ -17,6 +21,59 @@ def _raise_exception(exp):
     raise exp
 
 
+def _synchronized(method):
+    @wraps(method)
+    def _wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return _wrapper
+
+
+def _format_duration(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    if hours > 0:
+        return "{}h{:02d}m{:02.0f}s".format(hours, minutes, seconds)
+    if minutes > 0:
+        return "{}m{:02.0f}s".format(minutes, seconds)
+    return "{:.2f}s".format(seconds)
+
+
+def _format_size(size):
+    if size < 1024:
+        return "{}B".format(size)
+    for unit in ("KiB", "MiB", "GiB", "TiB"):
+        size /= 1024
+        if size < 1024 or unit == "TiB":
+            break
+    return "{:.1f}{}".format(size, unit)
+
+
+def format_usage(usage):
+    """Formats a node call's resource usage, see
+    :func:`rflow.node.Node.get_timing`.
+
+    Args:
+
+        usage (dict): The usage of a call.
+
+    Returns:
+        str: Like `"1.20s wall, 0.90s user, 0.10s sys, +120.0MiB rss,
+        10.0MiB read, 2.0MiB written"`.
+    """
+    parts = ["{} wall".format(_format_duration(usage["wall"]))]
+    for name in ("user", "sys"):
+        if usage.get(name) is not None:
+            parts.append("{} {}".format(_format_duration(usage[name]), name))
+    for name, label, prefix in (("peak_rss_delta", "rss", "+"),
+                                ("read_bytes", "read", ""),
+                                ("write_bytes", "written", "")):
+        if usage.get(name) is not None:
+            parts.append("{}{} {}".format(prefix, _format_size(usage[name]),
+                                          label))
+    return ", ".join(parts)
+
+
 BAR_SYMBOL = "."
 END_SYMBOL = "^"
 
@@ -39,6 +96,7 @@ class ShellIO:
                               "blue", "magenta", "cyan", "white", "grey"]
         self._color_count = 0
         self._traceback_policy = None
+        self._lock = threading.RLock()
         self.complete_traceback = False
         self.set_traceback_policy()
 
@@ -63,6 +121,23 @@ class ShellIO:
         except KeyError:
             raise Exception("Unknown policy {}".format(policy))
 
+    @contextmanager
+    def traceback_policy(self, policy):
+        """Temporarily changes the traceback policy, see
+        :func:`set_traceback_policy`.
+
+        Args:
+
+            policy (str): Policy type.
+
+        """
+        previous = self._traceback_policy
+        self.set_traceback_policy(policy)
+        try:
+            yield
+        finally:
+            self._traceback_policy = previous
+
     def _get_new_color(self):
         idx = self._color_count % len(self._avail_colors)
         color = self._avail_colors[idx]
@@ -79,6 +154,7 @@ class ShellIO:
     def _curr_color(self):
         return self._color_stack[-1]
     
+    @_synchronized
     def executing_evaluate(self, node):
         """Shows evaluation execution info.
         """
@@ -90,6 +166,7 @@ class ShellIO:
         self._out.flush()
         self.call_depth += 1
 
+    @_synchronized
     def done_evaluate(self, node):
         """Shows evaluation done info.
         """
@@ -104,6 +181,7 @@ class ShellIO:
             color))
         self._out.flush()
 
+    @_synchronized
     def executing_run(self, node):
         """Shows evaluation execution info.
         """
@@ -115,6 +193,20 @@ class ShellIO:
             colored("RUN  {}:{}\n".format(node.graph.name, node.name), color))
         self._out.flush()
 
+    @_synchronized
+    def executing_restore(self, node):
+        """Shows that an evaluation was restored from the artifact
+        cache.
+        """
+        self.call_depth -= 1
+        color = self._curr_color()
+        self._out.write(BAR_SYMBOL * self.call_depth)
+        self._out.write(
+            colored("RESTORE  {}:{}\n".format(node.graph.name, node.name),
+                    color))
+        self._out.flush()
+
+    @_synchronized
     def executing_load(self, node):
         """Shows load execution info.
         """
@@ -126,6 +218,7 @@ class ShellIO:
         self._out.flush()
         self.call_depth += 1
 
+    @_synchronized
     def done_load(self, node):
         """Shows load done info.
         """
@@ -138,6 +231,7 @@ class ShellIO:
             self._pop_color()))
         self._out.flush()
 
+    @_synchronized
     def error_ocurred(self, node, error_message):
         # pylint: disable=no-self-use
         """Shows an error. Does not call the :func:`print_traceback`.
@@ -147,6 +241,7 @@ class ShellIO:
             node.graph.name,
             node.name, error_message), "red"))
 
+    @_synchronized
     def executing_touch(self, node):
         """Shows touch execution info."""
         self._out.write(BAR_SYMBOL*self.call_depth)
@@ -157,6 +252,7 @@ class ShellIO:
         self._out.flush()
         self.call_depth += 1
 
+    @_synchronized
     def done_touch(self, node):
         """Shows touch done info."""
         self.call_depth -= 1
@@ -166,6 +262,156 @@ class ShellIO:
             node.name), "magenta"))
         self._out.flush()
 
+    @_synchronized
+    def print_plan(self, plan, wall_time=None):
+        """Shows an execution plan, see :func:`rflow.core.Graph.plan`.
+        """
+        colors = {"evaluate": "yellow", "load": "green", "skip": "grey"}
+        for entry in plan:
+            self._out.write(colored("{:8} {}:{}".format(
+                entry.action.upper(), entry.node.graph.name,
+                entry.node.name), colors[entry.action]))
+            if entry.duration is not None:
+                self._out.write(" [{}]".format(
+                    _format_duration(entry.duration)))
+            if entry.reasons:
+                self._out.write(" ({})".format("; ".join(entry.reasons)))
+            self._out.write("\n")
+
+        actions = [entry.action for entry in plan]
+        self._out.write("{} to evaluate, {} to load, {} skipped\n".format(
+            actions.count("evaluate"), actions.count("load"),
+            actions.count("skip")))
+        if wall_time is not None:
+            self._out.write("Estimated wall time: {}\n".format(
+                _format_duration(wall_time)))
+        self._out.flush()
+
+    @_synchronized
+    def print_garbage(self, garbage_list, dry_run=False):
+        """Shows what a garbage collection removed, see
+        :func:`rflow.core.Graph.collect_garbage`.
+        """
+        action = "WOULD REMOVE" if dry_run else "REMOVED"
+        for garbage in garbage_list:
+            self._out.write("{} {} {} [{}]\n".format(
+                action, garbage.kind, garbage.path,
+                _format_size(garbage.size)))
+        self._out.write("{} {}, {} freed\n".format(
+            len(garbage_list), "to remove" if dry_run else "removed",
+            _format_size(sum(garbage.size for garbage in garbage_list))))
+        self._out.flush()
+
+    @_synchronized
+    def print_history(self, records):
+        """Shows run history records, see
+        :func:`rflow._argument.ArgumentSignatureDB.get_history`.
+        """
+        self._out.write("{:19} {:24} {:8} {:7} {:>10} {:>10}\n".format(
+            "START", "NODE", "ACTION", "STATUS", "DURATION", "PEAK RSS"))
+        for record in records:
+            peak_rss = record["peak_rss"]
+            self._out.write("{:19} {:24} {:8} {:7} {:>10} {:>10}\n".format(
+                time.strftime("%Y-%m-%d %H:%M:%S",
+                              time.localtime(record["start"])),
+                record["node"], record["action"], record["status"],
+                _format_duration(record["duration"]),
+                _format_size(peak_rss) if peak_rss is not None else "-"))
+        self._out.flush()
+
+    @_synchronized
+    def print_usage(self, calls):
+        """Shows the resource usage of node calls.
+
+        Args:
+
+            calls (List[Tuple[str, str, dict]]): The node name, action
+             and usage of each call, see
+             :func:`rflow.node.Node.get_timing`.
+        """
+        for node_name, action, usage in calls:
+            self._out.write("{:24} {:8} {}\n".format(
+                node_name, action, format_usage(usage)))
+        self._out.flush()
+
+    @_synchronized
+    def print_hot_functions(self, functions, directory):
+        """Shows the functions that took the most time on the profiled
+        node calls, see :func:`rflow.profiler.Profiler.get_hot_functions`.
+        """
+        self._out.write("Profiles written to {}\n".format(directory))
+        self._out.write("{:>8} {:>10} {:>10}  {}\n".format(
+            "CALLS", "TOTTIME", "CUMTIME", "FUNCTION"))
+        for location, calls, tottime, cumtime in functions:
+            self._out.write("{:>8} {:>10.3f} {:>10.3f}  {}\n".format(
+                calls, tottime, cumtime, location))
+        self._out.flush()
+
+    @_synchronized
+    def print_db_stats(self, stats):
+        """Shows the workflow database usage, see
+        :func:`rflow._argument.ArgumentSignatureDB.get_stats`.
+        """
+        self._out.write("{:24} {:>10} {:>10} {:>8}\n".format(
+            "GROUP", "ENTRIES", "SIZE", "PAGES"))
+        for name, group in sorted(stats["groups"].items(),
+                                  key=lambda item: -item[1]["bytes"]):
+            self._out.write("{:24} {:>10} {:>10} {:>8}\n".format(
+                name, group["entries"], _format_size(group["bytes"]),
+                group["pages"]))
+        self._out.write(
+            "{} entries, {} of {} pages used, file {}, map {}\n".format(
+                stats["entries"], stats["used_pages"],
+                stats["file_size"] // stats["page_size"],
+                _format_size(stats["file_size"]),
+                _format_size(stats["map_size"])))
+        self._out.flush()
+
+    @_synchronized
+    def print_compaction(self, before, after):
+        """Shows the database file size change of a compaction.
+        """
+        self._out.write("Compacted {} to {}\n".format(
+            _format_size(before), _format_size(after)))
+        self._out.flush()
+
+    @_synchronized
+    def print_migration(self, migrated, failed):
+        """Shows the result of a database migration.
+        """
+        self._out.write("{} records migrated\n".format(migrated))
+        if failed:
+            self._out.write(colored(
+                "{} records can't be read anymore and were kept\n".format(
+                    failed), "red"))
+        self._out.flush()
+
+    @_synchronized
+    def print_failures(self, failures, blocked):
+        """Shows the nodes that failed on a run and the ones that
+        weren't executed because of them.
+
+        Args:
+
+            failures (List[Tuple[:obj:`rflow.node.Node`, Exception]]):
+             Failed nodes and their errors.
+
+            blocked (List[:obj:`rflow.node.Node`]): Nodes downstream
+             of the failed ones.
+
+        """
+        for node, exp in failures:
+            self._out.write(colored("FAILED  {}:{}, {}: {}\n".format(
+                node.graph.name, node.name, exp.__class__.__name__,
+                str(exp)), "red"))
+        for node in blocked:
+            self._out.write(colored("BLOCKED {}:{}\n".format(
+                node.graph.name, node.name), "red"))
+        self._out.write("{} failed, {} blocked\n".format(
+            len(failures), len(blocked)))
+        self._out.flush()
+
+    @_synchronized
     def print_traceback(self, exec_info, exp, cnt=1):
         """Prints an error traceback. It will call the traceback policy. See
         :func:`set_traceback_policy`
@@ -13,10 +13,18 @@ def work_directory(path):
     """Change the current directory while in the scope of this context
     manager.
 
+    If the current directory is already the target one, then nothing
+    is changed. This keeps the context safe for threads running inside
+    the same directory.
+
     Args:
         path (str): Target directory path.
     """
     cur_dir = os.path.abspath(os.curdir)
+    if cur_dir == os.path.abspath(path):
+        yield
+        return
+
     os.chdir(path)
 
     try:
@@ -25,6 +33,77 @@ def work_directory(path):
         os.chdir(cur_dir)
 
 
+@contextmanager
+def file_lock(path):
+    """Holds an exclusive advisory lock on a file, shared by processes.
+    The lock is released if the process dies. Does nothing on systems
+    without `fcntl`.
+
+    Args:
+        path (str): The lock file path, created if needed.
+
+    Yields:
+        bool: Whatever another process held the lock, so the caller
+        had to wait.
+    """
+    try:
+        import fcntl  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        yield False
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as stream:
+        waited = False
+        try:
+            fcntl.flock(stream.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            waited = True
+            fcntl.flock(stream.fileno(), fcntl.LOCK_EX)
+        try:
+            yield waited
+        finally:
+            fcntl.flock(stream.fileno(), fcntl.LOCK_UN)
+
+
+def get_peak_rss():
+    """Returns the peak resident memory of the process, or of its
+    finished child processes if larger.
+
+    Returns:
+        int: Bytes or `None` on systems without `resource`.
+    """
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def get_resource_paths(resource):
+    """Returns the file paths declared by a resource, including the
+    members of multi resources.
+
+    Args:
+        resource (:obj:`rflow.resource.Resource`): The resource.
+
+    Returns:
+        Set[str]: The absolute paths.
+    """
+    filepaths = set()
+    stack = [resource]
+    while stack:
+        resource = stack.pop()
+        if hasattr(resource, 'filepath'):
+            filepaths.add(resource.filepath)
+        stack.extend(getattr(resource, 'fsresource_list', []))
+    return filepaths
+
+
 def here():
     """Returns the file directory of the calling .py file.
 
@@ -0,0 +1,512 @@
+"""Content-addressed artifact cache. Node resources are stored by
+the node's identity and full input signature, so evaluating a node
+with arguments that were used before restores its resource instead of
+calling `evaluate`.
+
+The cache is disabled by default. Enable it by setting the
+`RFLOW_CACHE_DIR` environment variable, like `~/.cache/rflow/cas`, or
+by assigning an :class:`ArtifactCache` to
+:attr:`rflow.core.Graph.artifact_cache`. A cache directory can be
+shared by several checkouts of the same workflow. Signatures of
+upstream resources should use content hashes, see
+:attr:`rflow.resource.FSResource.hash_content`, to match across
+checkouts.
+
+Only nodes with a resource and a `load` method are cached, set the
+`cacheable` class attribute to `False` for skipping nodes with other
+side effects.
+
+Caches can be shared by several machines through a remote
+:class:`CacheBackend`, set by the `RFLOW_REMOTE_CACHE` environment
+variable to a directory, like an NFS mount, or to an HTTP URL. Entries
+missing locally are downloaded from the remote, and stored entries are
+uploaded to it.
+
+The cache layout, locally and on remotes, is::
+
+    objects/ab/abcdef...  # File contents by digest, read-only.
+    entries/<key>.json    # Resource file paths and their digests.
+"""
+
+import os
+import json
+import stat
+import shutil
+import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import suppress
+from concurrent.futures import ThreadPoolExecutor
+
+from ._digest import file_digest, CHUNK_SIZE
+from .resource import MAX_WORKERS
+
+CACHE_DIR_ENV = "RFLOW_CACHE_DIR"
+REMOTE_CACHE_ENV = "RFLOW_REMOTE_CACHE"
+DEFAULT_CACHE_DIR = "~/.cache/rflow"
+
+# Linux ioctl for cloning a file's extents, see ioctl_ficlone(2).
+_FICLONE = 0x40049409
+
+
+def get_default_cache():
+    """Returns the cache set by the `RFLOW_CACHE_DIR` and
+    `RFLOW_REMOTE_CACHE` environment variables. If only the remote is
+    set, the local cache is in :data:`DEFAULT_CACHE_DIR`.
+
+    Returns:
+        :obj:`ArtifactCache`: The cache or `None` if neither variable
+        is set.
+    """
+    directory = os.environ.get(CACHE_DIR_ENV)
+    remote = os.environ.get(REMOTE_CACHE_ENV)
+    if not directory and not remote:
+        return None
+    return ArtifactCache(directory or DEFAULT_CACHE_DIR,
+                         remote=get_backend(remote) if remote else None)
+
+
+def get_backend(location):
+    """Creates a cache backend from its location.
+
+    Args:
+
+        location (str): An `http://` or `https://` URL, or a directory.
+
+    Returns:
+        :obj:`CacheBackend`: The backend.
+    """
+    if urllib.parse.urlparse(location).scheme in ('http', 'https'):
+        return HTTPCacheBackend(location)
+    return FSCacheBackend(location)
+
+
+def get_resource_files(resource):
+    """Lists the files of a resource.
+
+    Args:
+
+        resource (:obj:`rflow.resource.Resource`): A filesystem
+         resource, directories are walked and multi resources are
+         expanded.
+
+    Returns:
+        List[str]: Absolute file paths, `None` if the resource isn't
+        stored on files or some file is missing.
+    """
+    if hasattr(resource, 'fsresource_list'):
+        filepaths = []
+        for member in resource.fsresource_list:
+            member_files = get_resource_files(member)
+            if member_files is None:
+                return None
+            filepaths.extend(member_files)
+        return filepaths
+
+    filepath = getattr(resource, 'filepath', None)
+    if filepath is None:
+        return None
+    if os.path.isdir(filepath):
+        return sorted(os.path.join(dirpath, filename)
+                      for dirpath, _, filenames in os.walk(filepath)
+                      for filename in filenames)
+    if os.path.isfile(filepath):
+        return [filepath]
+    return None
+
+
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+_READ_WRITE = _READ_ONLY | stat.S_IWUSR
+
+
+def _entry_key(key):
+    return "entries/{}.json".format(key)
+
+
+def _object_key(digest):
+    return "objects/{}/{}".format(digest[:2], digest)
+
+
+def _reflink(src, dst):
+    # pylint: disable=import-outside-toplevel
+    import fcntl
+
+    with open(src, 'rb') as src_stream, open(dst, 'wb') as dst_stream:
+        fcntl.ioctl(dst_stream.fileno(), _FICLONE, src_stream.fileno())
+
+
+def _clone(src, dst, allow_hardlink):
+    try:
+        _reflink(src, dst)
+        return
+    except (OSError, ImportError):
+        if os.path.exists(dst):
+            os.remove(dst)
+
+    if allow_hardlink:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+
+
+def detach_hardlinks(resource):
+    """Replaces resource files that are hardlinked to the cache by
+    copies, so writing them in place doesn't change the cache.
+
+    Args:
+
+        resource (:obj:`rflow.resource.Resource`): The resource.
+    """
+    for filepath in get_resource_files(resource) or []:
+        if os.stat(filepath).st_nlink < 2:
+            continue
+        tmp_path = filepath + ".rflow-detach"
+        shutil.copy2(filepath, tmp_path)
+        os.chmod(tmp_path, os.stat(tmp_path).st_mode | stat.S_IWUSR)
+        os.replace(tmp_path, filepath)
+
+
+def _write_atomic(path, write_func):
+    # Writes to a temporary file that replaces `path` unless
+    # `write_func` returns `False`.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    prefix=".tmp-")
+    os.close(fd)
+    try:
+        if write_func(tmp_path) is False:
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def _get_stream_size(stream):
+    position = stream.tell()
+    size = stream.seek(0, os.SEEK_END) - position
+    stream.seek(position)
+    return size
+
+
+class CacheBackend:
+    """Storage shared by artifact caches of several machines. Keys are
+    relative slash separated paths, like `objects/ab/abcdef...`, and
+    values are written once and never change.
+    """
+
+    def exists(self, key):
+        """Returns whatever a key is stored.
+        """
+        raise NotImplementedError()
+
+    def get(self, key, stream):
+        """Downloads a value.
+
+        Args:
+
+            key (str): The key.
+
+            stream (BinaryIO): Where the value is written.
+
+        Returns:
+            bool: `False` if the key isn't stored.
+        """
+        raise NotImplementedError()
+
+    def put(self, key, stream):
+        """Uploads a value.
+
+        Args:
+
+            key (str): The key.
+
+            stream (BinaryIO): A seekable stream with the value.
+        """
+        raise NotImplementedError()
+
+
+class FSCacheBackend(CacheBackend):
+    """Backend on a directory, like a NFS mount.
+
+    Attributes:
+
+        directory (str): The directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(os.path.expanduser(str(directory)))
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, *key.split('/'))
+
+    def exists(self, key):
+        return os.path.exists(self._get_path(key))
+
+    def get(self, key, stream):
+        try:
+            with open(self._get_path(key), 'rb') as src_stream:
+                shutil.copyfileobj(src_stream, stream, CHUNK_SIZE)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, key, stream):
+        def _write(tmp_path):
+            with open(tmp_path, 'wb') as dst_stream:
+                shutil.copyfileobj(stream, dst_stream, CHUNK_SIZE)
+        _write_atomic(self._get_path(key), _write)
+
+
+class HTTPCacheBackend(CacheBackend):
+    """Backend on an HTTP server that answers `HEAD`, `GET` and `PUT`
+    requests on `<url>/<key>`, like nginx with WebDAV enabled.
+
+    Attributes:
+
+        url (str): The base URL.
+
+        timeout (float): Seconds to wait for the server.
+    """
+
+    def __init__(self, url, timeout=60):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _open(self, method, key, data=None, headers=None):
+        request = urllib.request.Request(
+            self.url + '/' + urllib.parse.quote(key), data=data,
+            headers=headers or {}, method=method)
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def exists(self, key):
+        try:
+            with self._open('HEAD', key):
+                return True
+        except urllib.error.HTTPError as exp:
+            if exp.code == 404:
+                return False
+            raise
+
+    def get(self, key, stream):
+        try:
+            with self._open('GET', key) as response:
+                shutil.copyfileobj(response, stream, CHUNK_SIZE)
+        except urllib.error.HTTPError as exp:
+            if exp.code == 404:
+                return False
+            raise
+        return True
+
+    def put(self, key, stream):
+        headers = {'Content-Length': str(_get_stream_size(stream)),
+                   'Content-Type': 'application/octet-stream'}
+        with self._open('PUT', key, data=stream, headers=headers):
+            pass
+
+
+class ArtifactCache:
+    """Directory storing node resources by signature key.
+
+    Attributes:
+
+        directory (str): The cache directory.
+
+        remote (:obj:`CacheBackend`): Shared cache, `None` to use only
+         the local directory.
+
+        max_workers (int): How many files are transferred to or from
+         the remote at once, defaults to
+         :data:`rflow.resource.MAX_WORKERS`.
+    """
+
+    def __init__(self, directory, remote=None, max_workers=None):
+        self.directory = os.path.abspath(os.path.expanduser(str(directory)))
+        self.remote = remote
+        self.max_workers = max_workers
+
+    def _get_local_path(self, cache_key):
+        return os.path.join(self.directory, *cache_key.split('/'))
+
+    def get_entry_path(self, key):
+        """Returns the local file path of a key's entry.
+        """
+        return self._get_local_path(_entry_key(key))
+
+    def _get_object_path(self, digest):
+        return self._get_local_path(_object_key(digest))
+
+    def _map(self, func, items):
+        if len(items) < 2:
+            return [func(item) for item in items]
+
+        max_workers = min(self.max_workers or MAX_WORKERS, len(items))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(func, items))
+
+    def _download(self, cache_key, mode):
+        def _write(tmp_path):
+            with open(tmp_path, 'wb') as stream:
+                if not self.remote.get(cache_key, stream):
+                    return False
+            os.chmod(tmp_path, mode)
+            return True
+
+        return _write_atomic(self._get_local_path(cache_key), _write)
+
+    def _upload(self, cache_key):
+        if self.remote.exists(cache_key):
+            return
+        with open(self._get_local_path(cache_key), 'rb') as stream:
+            self.remote.put(cache_key, stream)
+
+    def exists(self, key):
+        """Returns whatever there's an entry for a key, locally or on
+        the remote.
+        """
+        return (os.path.exists(self.get_entry_path(key))
+                or self.remote is not None
+                and self.remote.exists(_entry_key(key)))
+
+    def store(self, key, work_directory, resource):
+        """Stores a resource's files.
+
+        Args:
+
+            key (str): The node's signature key.
+
+            work_directory (str): Base directory of the resource's
+             relative paths.
+
+            resource (:obj:`rflow.resource.Resource`): The resource.
+
+        Returns:
+            bool: `False` if the resource has no files to store.
+        """
+        filepaths = get_resource_files(resource)
+        if not filepaths:
+            return False
+
+        files = {}
+        for filepath in filepaths:
+            digest = file_digest(filepath)
+            object_path = self._get_object_path(digest)
+            if not os.path.exists(object_path):
+                def _copy(tmp_path, filepath=filepath):
+                    _clone(filepath, tmp_path, allow_hardlink=False)
+                    os.chmod(tmp_path, _READ_ONLY)
+                _write_atomic(object_path, _copy)
+            files[os.path.relpath(filepath, work_directory)] = digest
+
+        def _write_entry(tmp_path):
+            with open(tmp_path, 'w') as stream:
+                json.dump({"files": files}, stream)
+        _write_atomic(self.get_entry_path(key), _write_entry)
+
+        if self.remote is not None:
+            # The entry goes last, so remote entries never refer to
+            # missing objects.
+            self._map(self._upload,
+                      [_object_key(digest) for digest in set(files.values())])
+            self._upload(_entry_key(key))
+        return True
+
+    def restore(self, key, work_directory, resource):
+        """Restores a resource's files. Files are reflinked or
+        hardlinked when possible, and copied otherwise.
+
+        Args:
+
+            key (str): The node's signature key.
+
+            work_directory (str): Base directory of the entry's
+             relative paths.
+
+            resource (:obj:`rflow.resource.Resource`): The resource,
+             erased before restoring.
+
+        Returns:
+            bool: `False` if there's no complete entry for the key.
+        """
+        entry_path = self.get_entry_path(key)
+        if (not os.path.exists(entry_path) and self.remote is not None
+                and not self._download(_entry_key(key), _READ_WRITE)):
+            return False
+
+        try:
+            with open(entry_path, 'r') as stream:
+                files = json.load(stream)["files"]
+        except (OSError, ValueError, KeyError):
+            return False
+
+        missing = sorted(digest for digest in set(files.values())
+                         if not os.path.exists(self._get_object_path(digest)))
+        if missing:
+            if self.remote is None:
+                return False
+            downloaded = self._map(
+                lambda digest: self._download(_object_key(digest),
+                                              _READ_ONLY), missing)
+            if not all(downloaded):
+                return False
+
+        # The modification time tells when the entry was last used.
+        os.utime(entry_path)
+        resource.erase()
+        for relpath, digest in files.items():
+            filepath = os.path.join(work_directory, relpath)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            _clone(self._get_object_path(digest), filepath,
+                   allow_hardlink=True)
+        return True
+
+    def get_entries(self):
+        """Lists the local entries.
+
+        Returns:
+            Dict[str: Dict[str: str]]: The file paths and digests of
+            each key.
+        """
+        entries = {}
+        entries_dir = os.path.join(self.directory, "entries")
+        if not os.path.isdir(entries_dir):
+            return entries
+        for filename in os.listdir(entries_dir):
+            key, ext = os.path.splitext(filename)
+            if ext != ".json":
+                continue
+            try:
+                with open(os.path.join(entries_dir, filename), 'r') as stream:
+                    entries[key] = json.load(stream)["files"]
+            except (OSError, ValueError, KeyError):
+                continue
+        return entries
+
+    def get_object_size(self, digest):
+        """Returns the size in bytes of a stored file, 0 if it isn't
+        stored.
+        """
+        try:
+            return os.stat(self._get_object_path(digest)).st_size
+        except FileNotFoundError:
+            return 0
+
+    def remove_entry(self, key):
+        """Removes a local entry. Its objects are kept, see
+        :func:`remove_object`.
+        """
+        with suppress(FileNotFoundError):
+            os.remove(self.get_entry_path(key))
+
+    def remove_object(self, digest):
+        """Removes a local stored file.
+        """
+        with suppress(FileNotFoundError):
+            os.remove(self._get_object_path(digest))
@@ -4,14 +4,23 @@
 import argparse
 import os
 import sys
+import csv
+import json
+import time
+import datetime
 import imp
 import inspect
 
 import argcomplete
 
 from . import core
-from . common import WorkflowError, WORKFLOW_DEFAULT_FILENAME
+from . common import (WorkflowError, NodeFailuresError,
+                      WORKFLOW_DEFAULT_FILENAME)
 from . import decorators
+from . import executor
+from . import garbage
+from . import profiler
+from . scheduler import plan_to_dict
 from . userargument import USER_ARGS_CONTEXT
 from . _ui import ui
 from . import _util as util
@@ -117,19 +126,40 @@ def open_graph(directory, graph_name, wf_filename=WORKFLOW_DEFAULT_FILENAME):
     return core.get_graph(graph_name, directory, existing=True)
 
 
-def _run_main(graph, argv):
-    arg_parser = argparse.ArgumentParser(
-        description="Executes the workflow to a node.",
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-    node_names = graph.get_node_names(filter_show=True)
+def _budget_entry(text):
+    name, _, amount = text.partition('=')
+    try:
+        return name, float(amount)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "Budget must be in the form NAME=AMOUNT, got {}".format(text))
+
+
+def _add_budget_argument(arg_parser):
     arg_parser.add_argument(
-        'node', choices=node_names,
-        metavar='node', help=', '.join(node_names))
+        '--budget', '-b', type=_budget_entry, action='append', default=[],
+        metavar='NAME=AMOUNT',
+        help="Machine resource shared by parallel nodes, like cpu=32 or mem_gb=64")
+
+
+def _add_targets_argument(arg_parser, graph):
+    node_names = graph.get_node_names(filter_show=True)
     arg_parser.add_argument(
-        '--redo', '-r',
-        help="Redo the last node, whatever even if it's updated",
-        action='store_true')
+        'node', nargs='+', metavar='node',
+        help="Node names or globs like cos_*. Choices: " + ', '.join(node_names)
+    ).completer = argcomplete.completers.ChoicesCompleter(node_names)
+
 
+def _match_targets(arg_parser, graph, patterns):
+    try:
+        return graph.match_node_names(patterns, filter_show=True)
+    except WorkflowError as err:
+        arg_parser.error(str(err))
+
+
+def _parse_user_arguments(arg_parser, argv):
+    # Adds the options of the graph's UserArgument nodes and registers
+    # their values.
     name_set = set()
     for name, kwargs in (
             USER_ARGS_CONTEXT.user_arguments):
@@ -143,9 +173,96 @@ def _run_main(graph, argv):
     args = arg_parser.parse_args(argv)
 
     USER_ARGS_CONTEXT.register_argparse_args(args)
+    return args
 
-    goal_node = graph[args.node]
-    goal_node.call(redo=args.redo)
+
+def _run_main(graph, argv):
+    arg_parser = argparse.ArgumentParser(
+        description="Executes the workflow to one or more nodes.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    _add_targets_argument(arg_parser, graph)
+    arg_parser.add_argument(
+        '--redo', '-r',
+        help="Redo the target nodes, even if they're updated",
+        action='store_true')
+    arg_parser.add_argument(
+        '--jobs', '-j', type=int, default=1,
+        help="Number of nodes to run at the same time")
+    _add_budget_argument(arg_parser)
+    arg_parser.add_argument(
+        '--keep-going', '-k',
+        help="Continue the nodes that don't depend on a failed one",
+        action='store_true')
+    arg_parser.add_argument(
+        '--profile', action='store_true',
+        help="Profile the nodes, all of them unless --profile-nodes is given")
+    arg_parser.add_argument(
+        '--profile-nodes', action='append', metavar='node',
+        help="Profile only this node, or glob like cos_*. Can be repeated, implies --profile")
+    arg_parser.add_argument(
+        '--profile-dir',
+        help="Where the .pstats files are written, defaults to profile/ in the work directory")
+    arg_parser.add_argument(
+        '--profile-mode', choices=profiler.MODES, default=profiler.DETERMINISTIC,
+        help="Use sampling for lower overhead on long nodes")
+    arg_parser.add_argument(
+        '--profile-interval', type=float, default=profiler.DEFAULT_INTERVAL,
+        help="Seconds between samples on the sampling mode")
+    arg_parser.add_argument(
+        '--profile-top', type=int, default=20,
+        help="Number of hot functions shown at the end")
+
+    args = _parse_user_arguments(arg_parser, argv)
+
+    targets = _match_targets(arg_parser, graph, args.node)
+    run_profiler = None
+    if args.profile or args.profile_nodes:
+        run_profiler = profiler.Profiler(
+            args.profile_dir or os.path.join(graph.work_directory, "profile"),
+            args.profile_nodes, args.profile_mode, args.profile_interval)
+    try:
+        graph.run(targets, jobs=args.jobs, redo=args.redo,
+                  budget=dict(args.budget), keep_going=args.keep_going,
+                  profiler=run_profiler)
+    except NodeFailuresError:
+        return 1
+    finally:
+        if run_profiler is not None and run_profiler.dumps:
+            ui.print_hot_functions(
+                run_profiler.get_hot_functions(args.profile_top),
+                run_profiler.run_directory)
+    return 0
+
+
+def _print_run_main(graph, argv):
+    arg_parser = argparse.ArgumentParser(
+        description="Shows which nodes would be evaluated, loaded or skipped.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    _add_targets_argument(arg_parser, graph)
+    arg_parser.add_argument(
+        '--redo', '-r',
+        help="Plan as the target nodes would be redone",
+        action='store_true')
+    arg_parser.add_argument(
+        '--jobs', '-j', type=int, default=1,
+        help="Number of nodes to run at the same time, for estimating the wall time")
+    _add_budget_argument(arg_parser)
+    arg_parser.add_argument(
+        '--json', help="Output the plan as JSON", action='store_true')
+
+    args = _parse_user_arguments(arg_parser, argv)
+
+    targets = _match_targets(arg_parser, graph, args.node)
+    plan = graph.plan(targets, redo=args.redo)
+    wall_time = graph.estimate(targets, jobs=args.jobs, redo=args.redo,
+                               budget=dict(args.budget))
+    if args.json:
+        sys.stdout.write(json.dumps({"plan": plan_to_dict(plan),
+                                     "estimated_wall_time": wall_time},
+                                    indent=2))
+        sys.stdout.write('\n')
+    else:
+        ui.print_plan(plan, wall_time)
 
 
 def _clean_main(graph, argv):
@@ -163,6 +280,233 @@ def _clean_main(graph, argv):
     goal_node.clear()
 
 
+_SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+_AGE_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def _unit_amount(text, units, kind):
+    number, unit = text, ''
+    if text and text[-1] in units:
+        number, unit = text[:-1], text[-1]
+    try:
+        return float(number) * units[unit]
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "Invalid {} {}, use a number with one of the units {}".format(
+                kind, text, ', '.join(unit for unit in units if unit)))
+
+
+def _size_arg(text):
+    return int(_unit_amount(text.upper().rstrip('B'), _SIZE_UNITS, "size"))
+
+
+def _age_arg(text):
+    return _unit_amount(text, _AGE_UNITS, "age")
+
+
+def _gc_main(graph, argv):
+    arg_parser = argparse.ArgumentParser(
+        description="Removes the least recently used resources and artifact cache entries.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.add_argument(
+        '--max-size', '-s', type=_size_arg,
+        help="Disk budget for resources and cached artifacts, like 500G or 2T")
+    arg_parser.add_argument(
+        '--max-age', '-a', type=_age_arg,
+        help="Remove what is older than it, like 12h or 30d")
+    arg_parser.add_argument(
+        '--policy', '-p', choices=garbage.POLICIES, default="lru",
+        help="Remove the least recently used (lru) or the oldest (age) first")
+    arg_parser.add_argument(
+        '--include-referenced',
+        help="Also remove resources referenced by the current graph",
+        action='store_true')
+    arg_parser.add_argument(
+        '--dry-run', '-n', help="Only show what would be removed",
+        action='store_true')
+    arg_parser.add_argument(
+        '--jobs', '-j', type=int, default=None,
+        help="Number of files to remove at the same time")
+
+    args = arg_parser.parse_args(argv)
+    if args.max_size is None and args.max_age is None:
+        arg_parser.error("Pass --max-size and/or --max-age")
+
+    garbage_list = graph.collect_garbage(
+        max_size=args.max_size, max_age=args.max_age, policy=args.policy,
+        include_referenced=args.include_referenced, dry_run=args.dry_run,
+        jobs=args.jobs)
+    ui.print_garbage(garbage_list, args.dry_run)
+    return 0
+
+
+def _time_arg(text):
+    try:
+        return time.time() - _age_arg(text)
+    except argparse.ArgumentTypeError:
+        pass
+    try:
+        return datetime.datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "Invalid time {}, use an age like 7d or a date like 2020-01-31".format(
+                text))
+
+
+def _history_main(graph, argv):
+    arg_parser = argparse.ArgumentParser(
+        description="Shows the node calls of previous runs.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.add_argument(
+        'node', nargs='*', metavar='node',
+        help="Node names or globs like cos_*, defaults to all nodes")
+    arg_parser.add_argument(
+        '--since', '-s', type=_time_arg,
+        help="Only calls started after it, an age like 7d or a date like 2020-01-31")
+    arg_parser.add_argument(
+        '--until', '-u', type=_time_arg,
+        help="Only calls started before it, an age or a date")
+    arg_parser.add_argument(
+        '--slowest', '-n', type=int,
+        help="Only the N longest calls, slowest first")
+    arg_parser.add_argument(
+        '--json', help="Output the records as JSON", action='store_true')
+    args = arg_parser.parse_args(argv)
+
+    if args.node:
+        try:
+            node_names = graph.match_node_names(args.node)
+        except WorkflowError as err:
+            arg_parser.error(str(err))
+        records = []
+        for node_name in node_names:
+            records.extend(graph.get_history(node_name, args.since,
+                                             args.until))
+        records.sort(key=lambda record: record["start"])
+    else:
+        records = graph.get_history(since=args.since, until=args.until)
+
+    if args.slowest is not None:
+        records = sorted(records, key=lambda record: -record["duration"])[
+            :args.slowest]
+
+    if args.json:
+        sys.stdout.write(json.dumps(records, indent=2))
+        sys.stdout.write('\n')
+    else:
+        ui.print_history(records)
+    return 0
+
+
+def _metrics_main(graph, argv):
+    arg_parser = argparse.ArgumentParser(
+        description="Exports the metric streams logged by nodes as CSV.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.add_argument(
+        'node', nargs='+', metavar='node',
+        help="Node names or globs like cos_*")
+    arg_parser.add_argument('--name', help="Only this metric")
+    arg_parser.add_argument(
+        '--start', type=int, help="First step to export")
+    arg_parser.add_argument(
+        '--stop', type=int, help="Step where to stop, not included")
+    arg_parser.add_argument(
+        '--json', help="Output the metrics as JSON", action='store_true')
+    args = arg_parser.parse_args(argv)
+
+    try:
+        node_names = graph.match_node_names(args.node)
+    except WorkflowError as err:
+        arg_parser.error(str(err))
+
+    metrics = {node_name: graph[node_name].get_metrics(
+        args.name, args.start, args.stop) for node_name in node_names}
+    if args.json:
+        sys.stdout.write(json.dumps(metrics, indent=2))
+        sys.stdout.write('\n')
+        return 0
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["node", "name", "step", "time", "value"])
+    for node_name, node_metrics in metrics.items():
+        for name, points in node_metrics.items():
+            for step, point_time, value in points:
+                writer.writerow([node_name, name, step, point_time, value])
+    return 0
+
+
+def _usage_main(graph, argv):
+    arg_parser = argparse.ArgumentParser(
+        description="Shows the time, memory and I/O of the nodes' last evaluate and load calls, slowest first.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.add_argument(
+        'node', nargs='*', metavar='node',
+        help="Node names or globs like cos_*, defaults to all nodes")
+    arg_parser.add_argument(
+        '--json', help="Output the usage as JSON", action='store_true')
+    args = arg_parser.parse_args(argv)
+
+    try:
+        node_names = graph.match_node_names(args.node or ['*'])
+    except WorkflowError as err:
+        arg_parser.error(str(err))
+
+    calls = []
+    for node_name in node_names:
+        for action, usage in graph[node_name].get_timing().items():
+            calls.append((node_name, action, usage))
+    calls.sort(key=lambda call: -call[2]["wall"])
+
+    if args.json:
+        sys.stdout.write(json.dumps(
+            [{"node": node_name, "action": action, "usage": usage}
+             for node_name, action, usage in calls], indent=2))
+        sys.stdout.write('\n')
+    else:
+        ui.print_usage(calls)
+    return 0
+
+
+def _db_stats_main(graph, argv):
+    arg_parser = argparse.ArgumentParser(
+        description="Shows the workflow database usage by graph.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.add_argument(
+        '--json', help="Output the stats as JSON", action='store_true')
+    args = arg_parser.parse_args(argv)
+
+    stats = graph.args_context.get_stats()
+    if args.json:
+        sys.stdout.write(json.dumps(stats, indent=2))
+        sys.stdout.write('\n')
+    else:
+        ui.print_db_stats(stats)
+    return 0
+
+
+def _db_compact_main(graph, argv):
+    arg_parser = argparse.ArgumentParser(
+        description="Rewrites the workflow database without its free pages.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.parse_args(argv)
+
+    before, after = graph.args_context.compact()
+    ui.print_db_stats(graph.args_context.get_stats())
+    ui.print_compaction(before, after)
+    return 0
+
+
+def _db_migrate_main(graph, argv):
+    arg_parser = argparse.ArgumentParser(
+        description="Rewrites the workflow database records of older rflow versions.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.parse_args(argv)
+
+    migrated, failed = graph.args_context.migrate()
+    ui.print_migration(migrated, failed)
+    return 0 if failed == 0 else 1
+
+
 def _touch_main(graph, argv):
     arg_parser = argparse.ArgumentParser(
         description="Set the node's last parameters to the current ones without executing it.",
@@ -208,7 +552,41 @@ def _viz_main(graph, argv):
         dot.view(cleanup=True)
 
 
-ACTIONS = ['run', 'touch', 'print-run', 'viz-dag', 'help', 'clean']
+ACTIONS = ['run', 'touch', 'print-run', 'viz-dag', 'help', 'clean', 'gc',
+           'db-stats', 'db-compact', 'db-migrate', 'history', 'metrics',
+           'usage']
+
+
+def _action_main(graph, action, argv):
+    # pylint: disable=too-many-return-statements
+    if action == 'print-run':
+        return _print_run_main(graph, argv)
+    elif action == 'run':
+        return _run_main(graph, argv)
+    elif action == 'touch':
+        return _touch_main(graph, argv)
+    elif action == 'clean':
+        return _clean_main(graph, argv)
+    elif action == 'gc':
+        return _gc_main(graph, argv)
+    elif action == 'db-stats':
+        return _db_stats_main(graph, argv)
+    elif action == 'db-compact':
+        return _db_compact_main(graph, argv)
+    elif action == 'db-migrate':
+        return _db_migrate_main(graph, argv)
+    elif action == 'history':
+        return _history_main(graph, argv)
+    elif action == 'metrics':
+        return _metrics_main(graph, argv)
+    elif action == 'usage':
+        return _usage_main(graph, argv)
+    elif action == 'help':
+        return _help_main(graph, argv)
+    elif action == 'viz-dag':
+        return _viz_main(graph, argv)
+
+    return 1
 
 
 def main(argv=None):
@@ -253,7 +631,6 @@ def main(argv=None):
         int: exit code.
 
     """
-    # pylint: disable=too-many-return-statements
     try:
         all_graphs = _get_all_graph_def(os.path.abspath(os.path.curdir),
                                         WORKFLOW_DEFAULT_FILENAME)
@@ -279,18 +656,8 @@ def main(argv=None):
     abs_path = os.path.abspath('.')
     graph = open_graph(abs_path, args.graph)
 
-    argv = argv[3:]
-    if args.action == 'print-run':
-        raise NotImplementedError()
-    elif args.action == 'run':
-        return _run_main(graph, argv)
-    elif args.action == 'touch':
-        return _touch_main(graph, argv)
-    elif args.action == 'clean':
-        return _clean_main(graph, argv)
-    elif args.action == 'help':
-        return _help_main(graph, argv)
-    elif args.action == 'viz-dag':
-        return _viz_main(graph, argv)
-
-    return 1
+    try:
+        return _action_main(graph, args.action, argv[3:])
+    finally:
+        # Workers of `process` executor nodes are kept between runs.
+        executor.shutdown()
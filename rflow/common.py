@@ -35,6 +35,28 @@ class WorkflowError(Exception):
         super(WorkflowError, self).__init__(message)
 
 
+class NodeFailuresError(WorkflowError):
+    """Raised at the end of a run that kept going after node
+    failures.
+
+    Args:
+
+        failures (List[Tuple[:obj:`rflow.node.Node`, Exception]]):
+         Failed nodes and their errors.
+
+        blocked (List[:obj:`rflow.node.Node`]): Nodes that weren't
+         executed because an upstream node failed.
+
+    """
+
+    def __init__(self, failures, blocked):
+        super(NodeFailuresError, self).__init__(
+            '{} node(s) failed: {}'.format(
+                len(failures), ', '.join(node.name for node, _ in failures)))
+        self.failures = failures
+        self.blocked = blocked
+
+
 class BaseNode:
     """Base methods for nodes. Should be used to create new node types.
 
@@ -3,11 +3,17 @@
 """
 
 import os
+import fnmatch
 from contextlib import contextmanager
 
 from . _argument import ArgumentSignatureDB
 from . common import WorkflowError, DOT_DATABASE_FILENAME, BaseNode
+from . node import Node
+from . scheduler import Scheduler, get_node
+from .cache import get_default_cache
+from . import garbage
 from . import _util as util
+from ._run import begin_run
 from ._reflection import get_caller_lineinfo
 
 
@@ -97,6 +103,10 @@ class Graph:
 
         node_list (List[BaseNode]): All graph nodes.
 
+        artifact_cache (:obj:`rflow.cache.ArtifactCache`): Cache for
+         restoring node resources, `None` disables it. Defaults to the
+         one set by `RFLOW_CACHE_DIR`.
+
     """
 
     def __init__(self, work_directory, name=None):
@@ -109,6 +119,8 @@ class Graph:
         self.node_list = []
         self._node_set = set()
 
+        self.artifact_cache = get_default_cache()
+
         self.args_context = ArgumentSignatureDB()
         self.args_context.open(os.path.join(
             self.work_directory, DOT_DATABASE_FILENAME))
@@ -157,6 +169,35 @@ class Graph:
         return next((node for node in self.node_list
                      if node.name == node_name), None)
 
+    def match_node_names(self, patterns, filter_show=False):
+        """Expands node names and shell-style globs, like `cos_*` for
+        nodes created with :func:`prefix`.
+
+        Args:
+
+            patterns (List[str]): Node names or glob patterns.
+
+            filter_show (bool, optional): Match only the nodes that are
+             marked with show. Default is `False`.
+
+        Returns:
+            List[str]: The matched names without repetitions, in
+            the order of the patterns.
+
+        Raises:
+            WorkflowError: If a pattern doesn't match any node.
+        """
+
+        node_names = self.get_node_names(filter_show)
+        matched = []
+        for pattern in patterns:
+            names = fnmatch.filter(node_names, pattern)
+            if not names:
+                raise WorkflowError(
+                    'No node matches {} in graph {}'.format(pattern, self.name))
+            matched.extend(name for name in names if name not in matched)
+        return matched
+
     def prefix(self, prefix_name):
         """Creates a graph wrapper, in which new every node is prefixed with a
         string.
@@ -186,6 +227,149 @@ class Graph:
         """
         return Subgraph(self, prefix_name)
 
+    def run(self, targets, jobs=1, redo=False, budget=None,
+            keep_going=False, profiler=None):
+        """Executes one or more nodes. Only the dirty part of the graph
+        is executed, and independent nodes are run at the same time
+        when `jobs` is greater than one.
+
+        Nodes are still executed with the graph's work directory as
+        current directory, so all parallel nodes should belong to
+        graphs sharing the same directory.
+
+        Args:
+
+            targets (Union[str, BaseNode, List[Union[str, BaseNode]]]):
+             Node names or nodes to run.
+
+            jobs (int, optional): Maximum number of nodes executing
+             at the same time. Default is 1.
+
+            redo (bool, optional): Evaluate the targets even if
+             they're updated.
+
+            budget (Dict[str: float], optional): Machine resources
+             shared by parallel nodes, see
+             :class:`rflow.scheduler.Scheduler`.
+
+            keep_going (bool, optional): Continue the nodes that don't
+             depend on a failed one.
+
+            profiler (:obj:`rflow.profiler.Profiler`, optional):
+             Profiles the `evaluate` and `load` calls of its nodes.
+
+        Returns:
+            object: The target's value, or a list of values if a list
+            of targets was passed.
+
+        Raises:
+            :obj:`rflow.common.NodeFailuresError`: On keep going
+            mode, if any node failed.
+
+        """
+        single = isinstance(targets, (str, BaseNode))
+        targets = self._get_targets(targets)
+        with begin_run() as run:
+            if profiler is not None:
+                run.profiler = profiler
+            Scheduler(jobs, budget, keep_going).run(
+                [get_node(target) for target in targets], redo)
+
+        values = [target.value if isinstance(target, Node) else target.call()
+                  for target in targets]
+        if single:
+            return values[0]
+        return values
+
+    def plan(self, targets, redo=False):
+        """Tells what :func:`run` would do, without calling any node's
+        `evaluate` or `load`.
+
+        Args:
+
+            targets (Union[str, BaseNode, List[Union[str, BaseNode]]]):
+             Node names or nodes to plan.
+
+            redo (bool, optional): Plan as the targets would be
+             evaluated even if they're updated.
+
+        Returns:
+            List[:obj:`rflow.scheduler.PlanEntry`]: The targets and their
+            ancestors in execution order, each one with its action and
+            reasons.
+
+        """
+        targets = self._get_targets(targets)
+        return Scheduler().plan([get_node(target) for target in targets],
+                                redo)
+
+    def estimate(self, targets, jobs=1, redo=False, budget=None):
+        """Estimates how long :func:`run` would take, using the
+        durations of previous node calls.
+
+        Args:
+
+            targets (Union[str, BaseNode, List[Union[str, BaseNode]]]):
+             Node names or nodes to estimate.
+
+            jobs (int, optional): Number of nodes executing at the same
+             time.
+
+            redo (bool, optional): Estimate as the targets would be
+             evaluated even if they're updated.
+
+            budget (Dict[str: float], optional): Machine resources
+             shared by parallel nodes.
+
+        Returns:
+            float: Estimated wall time in seconds.
+
+        """
+        targets = self._get_targets(targets)
+        return Scheduler(jobs, budget).estimate(
+            [get_node(target) for target in targets], redo)
+
+    def collect_garbage(self, max_size=None, max_age=None, policy="lru",
+                        include_referenced=False, dry_run=False, jobs=None):
+        """Removes the least recently used, or oldest, resources and
+        artifact cache entries until a disk budget is met. See
+        :func:`rflow.garbage.collect` for the arguments.
+
+        Returns:
+            List[:obj:`rflow.garbage.Garbage`]: What was removed.
+
+        """
+        return garbage.collect(self, max_size, max_age, policy,
+                               include_referenced, dry_run, jobs)
+
+    def get_history(self, node=None, since=None, until=None):
+        """Returns the graph's run history: one record per node on each
+        run, see
+        :func:`rflow._argument.ArgumentSignatureDB.get_history`.
+
+        Args:
+
+            node (str, optional): Only the records of this node.
+
+            since (float, optional): Only records started from it, in
+             seconds since the epoch.
+
+            until (float, optional): Only records started before it,
+             in seconds since the epoch.
+
+        Returns:
+            List[dict]: The records ordered by start time.
+
+        """
+        return self.args_context.get_history(self.name, node, since, until)
+
+    def _get_targets(self, targets):
+        if isinstance(targets, (str, BaseNode)):
+            targets = [targets]
+
+        return [self[target] if isinstance(target, str) else target
+                for target in targets]
+
     def clear_cache(self):
         """Clears previous in-memory saved values from node calls.
         """
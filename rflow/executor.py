@@ -0,0 +1,170 @@
+"""Execution backends for node evaluations. Nodes choose one by
+setting the `executor` class attribute:
+
+* `"thread"`: the default, evaluates in the calling process;
+
+* `"process"`: evaluates in a worker process, useful for CPU-bound
+  pure-Python nodes that would hold the GIL.
+
+Example::
+
+    class Tokenize(rflow.Interface):
+        executor = "process"
+
+        def evaluate(self, resource, text):
+            ...
+
+Evaluation functions sent to a worker process receive a copy of the
+node without its graph, arguments and previous value, so they can't
+use methods like :func:`rflow.node.Node.save_measurement` or
+:func:`rflow.node.Node.log_metric`. Their
+arguments and return value must be picklable. Signatures are still
+written by the main process.
+"""
+
+import os
+import sys
+import pickle
+import threading
+import importlib.util
+import multiprocessing
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+from . common import WorkflowError
+from . import _profile
+from .profiler import profile_call
+
+THREAD = "thread"
+PROCESS = "process"
+
+EXECUTORS = [THREAD, PROCESS]
+
+_PROCESS_POOL = None
+_PROCESS_POOL_LOCK = threading.Lock()
+
+
+def _get_mp_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _init_worker(sys_path):
+    for path in sys_path:
+        if path not in sys.path:
+            sys.path.append(path)
+
+
+def get_process_pool(max_workers=None):
+    """Returns the process pool shared by all nodes with the `"process"`
+    executor. It's created on the first call.
+
+    Args:
+
+        max_workers (int, optional): Number of worker processes used
+         when the pool is created. Default is the number of CPUs.
+
+    Returns:
+        :obj:`concurrent.futures.ProcessPoolExecutor`: The pool.
+
+    """
+    # pylint: disable=global-statement
+    global _PROCESS_POOL
+
+    with _PROCESS_POOL_LOCK:
+        if _PROCESS_POOL is None:
+            _PROCESS_POOL = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=_get_mp_context(),
+                initializer=_init_worker, initargs=(list(sys.path), ))
+        return _PROCESS_POOL
+
+
+def shutdown():
+    """Stops the worker processes, if any. It's called at the end of
+    :func:`rflow.command.main`, scripts calling
+    :func:`rflow.core.Graph.run` may call it when done.
+    """
+    # pylint: disable=global-statement
+    global _PROCESS_POOL
+
+    with _PROCESS_POOL_LOCK:
+        if _PROCESS_POOL is not None:
+            _PROCESS_POOL.shutdown()
+            _PROCESS_POOL = None
+
+
+def _get_module_files(func):
+    # Workflow scripts are loaded by file path (see
+    # `rflow.command._importdir`), so workers can't import them by
+    # name.
+    modules = {getattr(func, '__module__', None)}
+    owner = getattr(func, '__self__', None)
+    if owner is not None:
+        modules.add(owner.__class__.__module__)
+
+    module_files = {}
+    for module_name in modules:
+        module = sys.modules.get(module_name)
+        filepath = getattr(module, '__file__', None)
+        if filepath is not None:
+            module_files[module_name] = filepath
+    return module_files
+
+
+def _load_modules(module_files):
+    for module_name, filepath in module_files.items():
+        if module_name in sys.modules:
+            continue
+        try:
+            if importlib.util.find_spec(module_name) is not None:
+                continue
+        except (ImportError, ValueError):
+            pass
+        spec = importlib.util.spec_from_file_location(module_name, filepath)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+
+
+def _evaluate_pickled(work_directory, module_files, payload, profile_target):
+    _load_modules(module_files)
+    func, args = pickle.loads(payload)
+    os.chdir(work_directory)
+    started = _profile.start()
+    with (profile_call(*profile_target) if profile_target is not None
+          else nullcontext()):
+        value = func(*args)
+    return value, _profile.measure(started)
+
+
+def evaluate_in_process(work_directory, func, args, profile_target=None):
+    """Calls a function in the process pool and waits its result.
+
+    Args:
+
+        work_directory (str): The current directory while calling.
+
+        func (callable): The evaluation function, like
+         :attr:`rflow.node.Node.evaluate_func`.
+
+        args (List[object]): Its call values.
+
+        profile_target (tuple, optional): How the worker profiles the
+         call, see :func:`rflow.profiler.Profiler.get_target`.
+
+    Returns:
+        Tuple[object, dict]: What the function returned and the
+        resources used by the worker, see :func:`rflow._profile.measure`.
+
+    """
+    try:
+        payload = pickle.dumps((func, args), pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError) as err:
+        raise WorkflowError(
+            "Can't send evaluation to a worker process: {}".format(err))
+
+    future = get_process_pool().submit(
+        _evaluate_pickled, os.path.abspath(work_directory),
+        _get_module_files(func), payload, profile_target)
+    return future.result()
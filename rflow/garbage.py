@@ -0,0 +1,225 @@
+"""Garbage collection of node resources and cached artifacts. Nodes
+record in the workflow database when their resource files and
+artifact cache entries were first and last used. Collecting removes
+the least recently used, or the oldest, ones until a disk budget is
+met.
+
+Resources referenced by the graph, either as node resources or in the
+nodes' latest signatures, are never removed unless asked to. Artifact
+cache entries can always be removed, as nodes evaluate again on a
+cache miss.
+"""
+
+import os
+import time
+import shutil
+from collections import namedtuple
+from contextlib import suppress
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import WorkflowError
+from .resource import Resource, MAX_WORKERS
+from ._util import get_resource_paths
+
+POLICIES = ("lru", "age")
+
+Garbage = namedtuple("Garbage", ["kind", "path", "size", "created",
+                                 "accessed"])
+Garbage.__doc__ = """A removable file or artifact cache entry.
+
+Attributes:
+
+    kind (str): Either `"resource"` or `"artifact"`.
+
+    path (str): The resource path or the artifact's entry path.
+
+    size (int): Bytes freed by removing it.
+
+    created (float): When it was first used, seconds since the epoch.
+
+    accessed (float): When it was last used, seconds since the epoch.
+"""
+
+
+def _get_size(path):
+    if not os.path.isdir(path):
+        return os.stat(path).st_size
+
+    size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            with suppress(FileNotFoundError):
+                size += os.lstat(os.path.join(dirpath, filename)).st_size
+    return size
+
+
+def _is_referenced(path, referenced):
+    # Either the path is inside a referenced directory, or it's a
+    # directory holding referenced files.
+    if path in referenced:
+        return True
+    return any(path.startswith(ref_path + os.sep)
+               or ref_path.startswith(path + os.sep)
+               for ref_path in referenced)
+
+
+def get_referenced_paths(graph):
+    """Returns the paths used by the graph's nodes, either as their
+    resources or in their latest signatures.
+
+    Args:
+
+        graph (:obj:`rflow.core.Graph`): The graph.
+
+    Returns:
+        Set[str]: The absolute paths.
+    """
+    referenced = set()
+    for node in graph.node_list:
+        resource = node.get_resource()
+        if resource is not None:
+            referenced.update(get_resource_paths(resource))
+
+        signature = graph.args_context.get_argsignature(graph.name, node.name)
+        for value in signature.values():
+            if isinstance(value, Resource):
+                referenced.update(get_resource_paths(value))
+    return referenced
+
+
+def _get_resource_sizes(access_times, cache):
+    sizes = {}
+    missing = []
+    for path in access_times:
+        if cache is not None and path.startswith(cache.directory + os.sep):
+            continue
+        try:
+            sizes[path] = _get_size(path)
+        except FileNotFoundError:
+            missing.append(path)
+    return sizes, missing
+
+
+def _get_artifacts(cache, access_times):
+    artifacts = []
+    for key, files in cache.get_entries().items():
+        entry_path = cache.get_entry_path(key)
+        try:
+            mtime = os.stat(entry_path).st_mtime
+        except FileNotFoundError:
+            continue
+        # Entries used by other workflows sharing the cache are only
+        # known by their modification time.
+        created, accessed = access_times.get(entry_path, (mtime, mtime))
+        artifacts.append((Garbage("artifact", entry_path, 0, created,
+                                  max(accessed, mtime)),
+                          key, set(files.values())))
+    return artifacts
+
+
+def _select(candidates, object_refs, cache, total_size, max_size,
+            expire_time, sort_field):
+    # Picks candidates in eviction order. An artifact frees only the
+    # objects that no remaining entry refers to.
+    selected = []
+    for garbage, key, digests in sorted(
+            candidates, key=lambda item: getattr(item[0], sort_field)):
+        expired = (expire_time is not None
+                   and getattr(garbage, sort_field) < expire_time)
+        over_size = max_size is not None and total_size > max_size
+        if not expired and not over_size:
+            continue
+
+        freed_digests = set()
+        if key is not None:
+            for digest in digests:
+                object_refs[digest] -= 1
+                if object_refs[digest] == 0:
+                    freed_digests.add(digest)
+            garbage = garbage._replace(size=sum(
+                cache.get_object_size(digest) for digest in freed_digests))
+        total_size -= garbage.size
+        selected.append((garbage, key, freed_digests))
+    return selected
+
+
+def _remove(item, cache):
+    garbage, key, freed_digests = item
+    if key is not None:
+        cache.remove_entry(key)
+        for digest in freed_digests:
+            cache.remove_object(digest)
+    elif os.path.isdir(garbage.path):
+        shutil.rmtree(garbage.path, ignore_errors=True)
+    else:
+        with suppress(FileNotFoundError):
+            os.remove(garbage.path)
+
+
+def collect(graph, max_size=None, max_age=None, policy="lru",
+            include_referenced=False, dry_run=False, jobs=None):
+    """Removes the graph's unused resources and artifacts.
+
+    Args:
+
+        graph (:obj:`rflow.core.Graph`): The graph.
+
+        max_size (int, optional): Disk budget in bytes for the graph's
+         resources plus the artifact cache. `None` for no budget.
+
+        max_age (float, optional): Removes everything older than it,
+         in seconds. `None` for no limit.
+
+        policy (str): `"lru"` removes the least recently used first,
+         and applies `max_age` to the last use. `"age"` removes the
+         oldest first, and applies `max_age` to the first use.
+
+        include_referenced (bool): Whatever resources referenced by the
+         graph can be removed too.
+
+        dry_run (bool): Only returns what would be removed.
+
+        jobs (int, optional): How many files are removed at once,
+         defaults to :data:`rflow.resource.MAX_WORKERS`.
+
+    Returns:
+        List[:obj:`Garbage`]: What was removed, in eviction order.
+    """
+    if policy not in POLICIES:
+        raise WorkflowError("Unknown garbage collection policy {}".format(
+            policy))
+
+    db = graph.args_context
+    cache = graph.artifact_cache
+    access_times = db.get_access_times(graph.name)
+    sizes, missing = _get_resource_sizes(access_times, cache)
+    total_size = sum(sizes.values())
+
+    referenced = set() if include_referenced else get_referenced_paths(graph)
+    candidates = [
+        (Garbage("resource", path, size, *access_times[path]), None, set())
+        for path, size in sizes.items()
+        if not _is_referenced(path, referenced)]
+
+    object_refs = {}
+    if cache is not None:
+        artifacts = _get_artifacts(cache, access_times)
+        for _, _, digests in artifacts:
+            for digest in digests:
+                object_refs[digest] = object_refs.get(digest, 0) + 1
+        total_size += sum(cache.get_object_size(digest)
+                          for digest in object_refs)
+        candidates.extend(artifacts)
+
+    expire_time = None if max_age is None else time.time() - max_age
+    sort_field = "accessed" if policy == "lru" else "created"
+    selected = _select(candidates, object_refs, cache, total_size, max_size,
+                       expire_time, sort_field)
+
+    if not dry_run:
+        with ThreadPoolExecutor(max_workers=jobs or MAX_WORKERS) as pool:
+            list(pool.map(lambda item: _remove(item, cache), selected))
+        db.delete_access(graph.name, missing + [
+            garbage.path for garbage, _, _ in selected])
+
+    return [garbage for garbage, _, _ in selected]
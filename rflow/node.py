@@ -1,13 +1,43 @@
 """Node and Graph execution classes.
 """
 
+import os
 import sys
+import time
+import reprlib
+import hashlib
+import threading
+from contextlib import contextmanager, nullcontext
 
 from . common import WorkflowError, Uninit, BaseNode
 from . _argument import get_sig_difference
 from . resource import Resource, MultiResource
+from . signature import ArgDigest, get_signature, fingerprint
+from .cache import detach_hardlinks
+from ._encoding import encode
 from ._ui import ui
 from . import _util as util
+from . import _profile
+from .profiler import profile_call
+from ._run import begin_run, get_current_run
+from .executor import THREAD, PROCESS, EXECUTORS, evaluate_in_process
+
+METRIC_BUFFER_SIZE = 1000
+
+
+def _repr_signature(value):
+    if isinstance(value, ArgDigest):
+        # Already a short preview.
+        return repr(value)
+    return reprlib.repr(value)
+
+
+def _has_early_cutoff(edge):
+    # pylint: disable=import-outside-toplevel
+    from .scheduler import get_node
+    node = get_node(edge)
+    return (node is not None and node.early_cutoff
+            and node.get_resource() is not None)
 
 
 class BaseNodeLink(BaseNode):
@@ -23,6 +53,12 @@ class BaseNodeLink(BaseNode):
     def get_resource(self):
         return self._node.get_resource()
 
+    @property
+    def early_cutoff(self):
+        """Whatever the wrapped node has early cutoff.
+        """
+        return self._node.early_cutoff
+
     def is_dirty(self):
         return self._node.is_dirty()
 
@@ -128,6 +164,33 @@ class DependencyLink(object):
 
 
 class Node(BaseNode):
+    """Executable node.
+
+    Attributes:
+
+        executor (str): How `evaluate` is called, `"thread"` for the
+         current process or `"process"` for a worker process. Set it
+         as a class attribute. See :mod:`rflow.executor`.
+
+        requires (Dict[str: float]): Machine resources taken while
+         running, like `{"cpu": 8, "mem_gb": 20, "gpu_slot": 1}`. Set
+         it as a class attribute. See :class:`rflow.scheduler.Scheduler`.
+
+        early_cutoff (bool): Downstream nodes compare this node's
+         resource by its content digest instead of its modification
+         time. A re-evaluation that writes the same bytes doesn't
+         make them dirty. See :func:`rflow.resource.Resource.get_digest`.
+
+        cacheable (bool): Whatever the node's resource can be restored
+         from the artifact cache instead of evaluating. See
+         :mod:`rflow.cache`.
+
+    """
+    executor = THREAD
+    requires = {}
+    early_cutoff = False
+    cacheable = True
+
     def __init__(self, graph, name, evaluate_func,
                  args_namespace, load_func=None, load_arg_list=None):
         super(Node, self).__init__()
@@ -146,19 +209,59 @@ class Node(BaseNode):
         self.dependencies = []
 
         self.erase_resource_on_fail = False
+        self._call_lock = threading.RLock()
+        self._update_run = None
+
+        self._metric_lock = threading.Lock()
+        self._metric_buffer = []
+        self._metric_steps = {}
 
         # Debugging attributes
         self._curr_signature = None
         self._prev_signature = None
         self._signature_diff = None
+        self._dirty_reason = None
+        self._cutoff_check = False
 
     def __getitem__(self, idx):
         return ReturnSelNodeLink(self, idx)
 
+    def __getstate__(self):
+        # Nodes are pickled to be evaluated on worker processes, where
+        # only its own attributes are needed.
+        state = self.__dict__.copy()
+        for attr in ('graph', 'value', 'args', 'dependencies', 'evaluate_func',
+                     'load_func', '_call_lock', '_update_run',
+                     '_curr_signature', '_prev_signature', '_signature_diff',
+                     '_dirty_reason', '_metric_lock', '_metric_buffer',
+                     '_metric_steps'):
+            state.pop(attr, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.graph = None
+        self.value = Uninit
+        self._call_lock = threading.RLock()
+        self._update_run = None
+        self._metric_lock = threading.Lock()
+        self._metric_buffer = []
+        self._metric_steps = {}
+
     def fail(self, message):
+        """Stops the node's evaluation as failed. It's reported like
+        any other error, so keep going runs continue with the other
+        nodes.
+
+        Args:
+
+            message (str): Why the node failed.
+
+        Raises:
+            :obj:`rflow.common.WorkflowError`: Always.
+        """
         ui.error_ocurred(self, message)
-        self._asure_erase_res_on_fail()
-        sys.exit(0)
+        raise WorkflowError('{}: {}'.format(self.name, message))
 
     def non_collateral(self):
         # pylint: disable=no-self-use
@@ -216,49 +319,119 @@ class Node(BaseNode):
         return arg_edges + dep_edges
 
     def update(self):
+        """Updates the dirty state. The state is computed only once per
+        run, later calls on the same run use the cached one.
+        """
+        with begin_run() as run:
+            run.batch(self.graph.args_context)
+            if run.digest_db is None:
+                run.digest_db = self.graph.args_context
+            if self._update_run is not run:
+                self._update_dirty()
+                self._update_run = run
+
+    def _update_dirty(self):
         self._dirty = False
+        self._dirty_reason = None
+        self._signature_diff = None
+        self._cutoff_check = False
 
         signature = {}
         if self._resource is not None:
-            if not self._resource.exists():
+            if not self._resource_exists():
                 self._dirty = True
+                self._dirty_reason = "resource {} doesn't exist".format(
+                    self._resource)
                 return None
 
         non_collateral = set(self.non_collateral())
+        dirty_edges = []
         for edgename, edge in self.get_edges():
             if edgename in non_collateral:
                 continue
 
             if not isinstance(edge, BaseNode):
-                if hasattr(edge, 'get_signature'):
-                    signature[edgename] = edge.get_signature()
-                else:
-                    signature[edgename] = edge
+                signature[edgename] = get_signature(edge)
                 continue
 
             edge.update()
 
             if edge.is_dirty():
-                self._dirty = True
-                return None
-
-            if edge.get_resource() is not None:
-                with util.work_directory(self.graph.work_directory):
-                    signature[edgename] = edge.get_resource().get_hash()
+                dirty_edges.append((edgename, edge))
+            elif not dirty_edges and edge.get_resource() is not None:
+                signature[edgename] = self._get_resource_hash(edge)
+
+        if dirty_edges:
+            self._dirty = True
+            self._dirty_reason = "upstream `{}` is dirty".format(
+                dirty_edges[0][0])
+            # The upstream nodes may rewrite the same content, so the
+            # state is checked again before calling. Only if all of
+            # them do, as the others aren't on the signature.
+            self._cutoff_check = all(
+                _has_early_cutoff(edge) for _, edge in dirty_edges)
+            return None
 
         self._curr_signature = signature
         self._prev_signature = self._get_previous_signature()
         self._signature_diff = get_sig_difference(
             self._prev_signature, self._curr_signature)
         self._dirty = len(self._signature_diff) > 0
+        if not self._prev_signature:
+            self._dirty_reason = "no previous signature"
 
         return None
 
+    def get_dirty_reasons(self):
+        """Explains the last computed dirty state.
+
+        Returns:
+            List[str]: Why the node is dirty. Empty if it isn't.
+        """
+        if not self._dirty:
+            return []
+        if self._dirty_reason is not None:
+            return [self._dirty_reason]
+        return ["`{}` changed: {} -> {}".format(
+            argname, _repr_signature(diff.bef), _repr_signature(diff.now))
+                for argname, diff in sorted(self._signature_diff.items(),
+                                            key=lambda item: str(item[0]))]
+
     def call(self, redo=False):
+        """Executes the node main logic and returns its value.
+
+        Nodes with a resource are evaluated holding a file lock. So
+        processes running the same work directory at once don't
+        evaluate the same node twice. The second one waits, and then
+        loads the first one's result if the node is updated.
+
+        Args:
+
+            redo (bool): Evaluate even if the node is updated.
+
+        Returns:
+            object: The node's value.
+        """
+        if get_current_run() is None:
+            # Starts a run, so the dirty states are computed in a
+            # single pass.
+            from .scheduler import Scheduler
+            self._check_runnable()
+            Scheduler().run([self], redo)
+            return self.value
+
+        # Concurrent calls from parallel downstream nodes must wait
+        # the first one to evaluate or load this node.
+        with self._call_lock:
+            return self._call(redo)
+
+    def _call(self, redo):
         # pylint: disable=protected-access
         self._check_runnable()
         is_loadable = self._is_loadable()
         self.update()
+        if self._cutoff_check and not redo:
+            self._update_dirty()
 
         is_dirty = self.is_dirty() or redo
 
@@ -266,17 +439,54 @@ class Node(BaseNode):
             return self.value
 
         if not is_dirty and is_loadable:
-            self._check_variables(self.load_arg_list)
-            ui.executing_load(self)
-            call_values = self._bind_call(self.load_arg_list)
-            with util.work_directory(self.graph.work_directory):
-                try:
+            return self._load()
+
+        if self._resource is None:
+            return self._evaluate_call(redo)
+
+        # Other processes on the same work directory wait until the
+        # evaluation is committed, and then load it.
+        with util.file_lock(self.graph.args_context.get_lock_path(
+                self.graph.name, self.name)) as waited:
+            if waited and not redo and self._refresh():
+                if not self.is_dirty() and self._is_loadable():
+                    return self._load()
+            value = self._evaluate_call(redo)
+            self.graph.args_context.flush()
+        return value
+
+    def _refresh(self):
+        # Another process may have evaluated the node while this one
+        # waited for the lock. The dirty state is only computed again
+        # if it stored a new signature, as upstream nodes without
+        # resources aren't on it and are already evaluated.
+        prev_signature = self._get_previous_signature()
+        self.graph.args_context.refresh(self.graph.name, self.name)
+        if self._get_previous_signature() == prev_signature:
+            return False
+        self._invalidate_resource()
+        self._update_dirty()
+        return True
+
+    def _load(self):
+        self._check_variables(self.load_arg_list)
+        ui.executing_load(self)
+        call_values = self._bind_call(self.load_arg_list)
+        with self._history("load"), util.work_directory(
+                self.graph.work_directory):
+            try:
+                started = _profile.start()
+                with self._profile_call("load"):
                     self.value = self.load_func(*call_values)
-                except Exception as exp:
-                    ui.print_traceback(sys.exc_info(), exp)
-            ui.done_load(self)
-            return self.value
+                self._save_timing("load", _profile.measure(started))
+            except Exception as exp:
+                ui.print_traceback(sys.exc_info(), exp)
+        self._record_access([self._resource])
+        ui.done_load(self)
+        return self.value
 
+    def _evaluate_call(self, redo=False):
+        # pylint: disable=protected-access
         ui.executing_evaluate(self)
         self._check_variables(self.args._arg_names)
         call_arg_values = self._bind_call(self.args._arg_names)
@@ -285,31 +495,79 @@ class Node(BaseNode):
             if dep.is_dirty():
                 dep.call()
 
+        with self._history("evaluate") as history:
+            return self._evaluate_signature(call_arg_values, history, redo)
+
+    def _evaluate_signature(self, call_arg_values, history, redo=False):
+        signature = self._get_call_signature(call_arg_values)
+        cache, cache_key = self._get_artifact_key(signature, call_arg_values)
+        # Only files produced by nodes are recorded, so garbage
+        # collection never removes user inputs.
+        used_resources = [self._resource] + [
+            dep.get_resource() for dep in self.dependencies]
+        # Redoing evaluates again, and stores the new artifact.
+        if (cache_key is not None and not redo
+                and self._restore_artifact(cache, cache_key)):
+            history["action"] = "restore"
+            self._record_access(used_resources,
+                                cache.get_entry_path(cache_key))
+            ui.done_evaluate(self)
+            self._save_signature(signature)
+            return self.value
+
+        evaluated = False
         with util.work_directory(self.graph.work_directory):
             try:
-                self.save_measurement({})
+                if self.get_measurement():
+                    self.save_measurement({})
+                self._clear_metrics()
                 if self._resource is not None and not self._resource.rewritable:
                     self._resource.erase()
+                elif cache is not None and self._resource is not None:
+                    detach_hardlinks(self._resource)
                 ui.executing_run(self)
-                self.value = self.evaluate_func(*call_arg_values)
+                start = time.perf_counter()
+                self.value, usage = self._evaluate(call_arg_values)
+                # Includes sending the call to a worker process.
+                usage["wall"] = time.perf_counter() - start
+                self._save_timing("evaluate", usage)
+                evaluated = True
             except Exception as exp:
-                ui.print_traceback(sys.exc_info(), exp)
+                # The traceback policy may exit or raise.
                 self._asure_erase_res_on_fail()
+                ui.print_traceback(sys.exc_info(), exp)
+            finally:
+                self._invalidate_resource()
+                self.flush_metrics()
+
+        if evaluated and cache_key is not None:
+            try:
+                cache.store(cache_key, self.graph.work_directory,
+                            self._resource)
+            except OSError as exp:
+                ui.error_ocurred(
+                    self, "can't store on the artifact cache: {}".format(exp))
+        if evaluated:
+            self._record_access(
+                used_resources,
+                cache.get_entry_path(cache_key) if cache_key is not None
+                else None)
 
         ui.done_evaluate(self)
-        self._update_signature(call_arg_values)
+        self._save_signature(signature)
 
         return self.value
 
     def touch(self):
         # pylint: disable=protected-access
-        self.update()
+        with begin_run():
+            self.update()
 
-        ui.executing_touch(self)
-        call_arg_values = self._bind_call(self.args._arg_names)
+            ui.executing_touch(self)
+            call_arg_values = self._bind_call(self.args._arg_names)
 
-        self._update_signature(call_arg_values)
-        ui.done_touch(self)
+            self._update_signature(call_arg_values)
+            ui.done_touch(self)
 
     def _bind_call(self, bind_args):
         call_values = []
@@ -323,27 +581,199 @@ class Node(BaseNode):
 
         return call_values
 
+    def _evaluate(self, call_arg_values):
+        # Returns the value and the resources used, see
+        # `rflow._profile.measure`.
+        if self.executor == THREAD:
+            started = _profile.start()
+            with self._profile_call("evaluate"):
+                value = self.evaluate_func(*call_arg_values)
+            return value, _profile.measure(started)
+        if self.executor == PROCESS:
+            return evaluate_in_process(
+                self.graph.work_directory, self.evaluate_func, call_arg_values,
+                self._get_profile_target("evaluate"))
+
+        raise WorkflowError('{}: Unknown executor `{}`, use one of {}'.format(
+            self.name, self.executor, ', '.join(EXECUTORS)))
+
+    def _get_profile_target(self, action):
+        run = get_current_run()
+        if run is None or run.profiler is None:
+            return None
+        return run.profiler.get_target(self, action, run)
+
+    def _profile_call(self, action):
+        target = self._get_profile_target(action)
+        if target is None:
+            return nullcontext()
+        return profile_call(*target)
+
     def _update_signature(self, call_arg_values):
+        self._save_signature(self._get_call_signature(call_arg_values))
+
+    def _get_call_signature(self, call_arg_values):
         new_signature = {}
         non_collateral = self.non_collateral()
         for i, (edgename, edge) in enumerate(self.get_edges()):
             if edgename in non_collateral:
                 continue
             if not isinstance(edge, BaseNode):
-                if hasattr(edge, "get_signature"):
-                    new_signature[edgename] = edge.get_signature()
-                else:
-                    new_signature[edgename] = call_arg_values[i]
+                new_signature[edgename] = get_signature(call_arg_values[i])
                 continue
 
             if edge.get_resource() is not None:
-                with util.work_directory(self.graph.work_directory):
-                    new_signature[edgename] = edge.get_resource().get_hash()
+                new_signature[edgename] = self._get_resource_hash(edge)
+        return new_signature
 
+    def _save_signature(self, new_signature):
         self.graph.args_context.update_argsignature(
             self.graph.name, self.name,
             new_signature)
 
+        # The node is updated for the rest of the run.
+        self._curr_signature = new_signature
+        self._prev_signature = new_signature
+        self._signature_diff = {}
+        self._dirty = False
+        self._dirty_reason = None
+        self._update_run = get_current_run()
+
+    def _get_resource_hash(self, edge):
+        resource = edge.get_resource()
+        if getattr(edge, 'early_cutoff', False):
+            query, hash_func = "digest", resource.get_digest
+        else:
+            query, hash_func = "hash", resource.get_hash
+
+        def _hash():
+            with util.work_directory(self.graph.work_directory):
+                return hash_func()
+
+        with begin_run() as run:
+            return run.cached(resource, query, _hash)
+
+    def _resource_exists(self):
+        def _exists():
+            with util.work_directory(self.graph.work_directory):
+                return self._resource.exists()
+
+        with begin_run() as run:
+            return run.cached(self._resource, "exists", _exists)
+
+    def _invalidate_resource(self):
+        run = get_current_run()
+        if run is not None and self._resource is not None:
+            run.invalidate(self._resource)
+
+    def _get_artifact_key(self, signature, call_arg_values):
+        cache = getattr(self.graph, 'artifact_cache', None)
+        if (cache is None or not self.cacheable or self._resource is None
+                or self.load_func is None):
+            return None, None
+
+        key_signature = {}
+        for edgename, value in signature.items():
+            if isinstance(value, Resource):
+                filepaths = sorted(
+                    os.path.relpath(filepath, self.graph.work_directory)
+                    for filepath in util.get_resource_paths(value))
+                # The node's own resource is its output, only its
+                # location is part of the key.
+                value = (filepaths if value == self._resource
+                         else (filepaths, self._get_hash(value)))
+            key_signature[str(edgename)] = value
+
+        # Upstream nodes without resources aren't on the signature,
+        # so their values are.
+        non_collateral = self.non_collateral()
+        for i, (edgename, edge) in enumerate(self.get_edges()):
+            if (edgename not in non_collateral and isinstance(edge, BaseNode)
+                    and edge.get_resource() is None):
+                key_signature[str(edgename)] = get_signature(
+                    call_arg_values[i])
+
+        evaluate_func = getattr(self.evaluate_func, '__func__',
+                                self.evaluate_func)
+        try:
+            key = fingerprint((self.graph.name, self.name,
+                               evaluate_func.__module__,
+                               evaluate_func.__qualname__, key_signature))
+        except TypeError as exp:
+            ui.error_ocurred(
+                self, "can't use the artifact cache: {}".format(exp))
+            return cache, None
+        return cache, key
+
+    def _get_hash(self, resource):
+        with util.work_directory(self.graph.work_directory):
+            return resource.get_hash()
+
+    def _record_access(self, resources, cache_entry=None):
+        paths = set()
+        for resource in resources:
+            if resource is not None:
+                paths.update(util.get_resource_paths(resource))
+        if cache_entry is not None:
+            paths.add(cache_entry)
+        if paths:
+            self.graph.args_context.touch_access(self.graph.name, paths)
+
+    @contextmanager
+    def _history(self, action):
+        # Appends the call to the run history, as failed if it raises.
+        history = {"action": action}
+        start = time.time()
+        status = "failed"
+        try:
+            yield history
+            status = "ok"
+        finally:
+            self._append_history(history["action"], status, start)
+
+    def _append_history(self, action, status, start, end=None):
+        end = time.time() if end is None else end
+        try:
+            signature = hashlib.blake2b(
+                encode(self._get_previous_signature()),
+                digest_size=8).hexdigest()
+        except TypeError:
+            signature = None
+        run = get_current_run()
+        self.graph.args_context.append_history(self.graph.name, {
+            "node": self.name,
+            "run": run.start_time if run is not None else start,
+            "action": action,
+            "status": status,
+            "start": start,
+            "end": end,
+            "duration": end - start,
+            "signature": signature,
+            "peak_rss": util.get_peak_rss()})
+
+    def _restore_artifact(self, cache, cache_key):
+        try:
+            if not cache.restore(cache_key, self.graph.work_directory,
+                                 self._resource):
+                return False
+        except OSError as exp:
+            ui.error_ocurred(
+                self, "can't restore from the artifact cache: {}".format(exp))
+            return False
+        self._invalidate_resource()
+
+        ui.executing_restore(self)
+        call_values = self._bind_call(self.load_arg_list)
+        with util.work_directory(self.graph.work_directory):
+            try:
+                started = _profile.start()
+                with self._profile_call("load"):
+                    self.value = self.load_func(*call_values)
+                self._save_timing("load", _profile.measure(started))
+            except Exception as exp:
+                ui.print_traceback(sys.exc_info(), exp)
+        return True
+
     def _is_loadable(self):
         # pylint: disable=no-member
         if self.load_func is not None:
@@ -351,8 +781,7 @@ class Node(BaseNode):
                 raise WorkflowError(
                     '{} load method does not have a `resource` argument'.format(
                         self.name), self.instanciation_lineinfo)
-            with util.work_directory(self.graph.work_directory):
-                return self._resource.exists()
+            return self._resource_exists()
         return False
 
     def _check_variables(self, args):
@@ -367,8 +796,14 @@ class Node(BaseNode):
                 self.name))
 
     def _get_previous_signature(self):
-        return self.graph.args_context.get_argsignature(
+        signature = self.graph.args_context.get_argsignature(
             self.graph.name, self.name)
+        # Signatures of older versions hold the raw argument values.
+        for edgename, edge in self.get_edges():
+            if (edgename in signature and not isinstance(edge, BaseNode)
+                    and not isinstance(signature[edgename], ArgDigest)):
+                signature[edgename] = get_signature(signature[edgename])
+        return signature
 
     def _asure_erase_res_on_fail(self):
         if self.erase_resource_on_fail:
@@ -383,11 +818,113 @@ class Node(BaseNode):
         return self.graph.args_context.get_measurement(
             self.graph.name, self.name)
 
+    def log_metric(self, name, value, step=None):
+        """Appends a point to one of the node's metric streams, like
+        the loss of each training step. Points are kept in memory and
+        written to the workflow database in batches: when
+        :data:`METRIC_BUFFER_SIZE` are pending, on
+        :func:`flush_metrics` and when the evaluation ends. The
+        streams are cleared when the node evaluates again.
+
+        Args:
+
+            name (str): The metric name.
+
+            value (object): The value, usually a number.
+
+            step (int, optional): Non-negative position on the
+             stream, defaults to the one after the metric's last step.
+        """
+        if self.graph is None:
+            raise WorkflowError(
+                '{}: Metrics can only be logged on the main process'.format(
+                    self.name))
+
+        with self._metric_lock:
+            if step is None:
+                step = self._metric_steps.get(name, -1) + 1
+            self._metric_steps[name] = step
+            self._metric_buffer.append((name, step, time.time(), value))
+            if len(self._metric_buffer) < METRIC_BUFFER_SIZE:
+                return
+            points, self._metric_buffer = self._metric_buffer, []
+        self.graph.args_context.append_metrics(
+            self.graph.name, self.name, points)
+
+    def flush_metrics(self):
+        """Writes the buffered metric points to the workflow database.
+        """
+        with self._metric_lock:
+            points, self._metric_buffer = self._metric_buffer, []
+        if points:
+            self.graph.args_context.append_metrics(
+                self.graph.name, self.name, points)
+
+    def get_metrics(self, name=None, start=None, stop=None):
+        """Reads the node's metric streams, see :func:`log_metric`.
+
+        Args:
+
+            name (str, optional): Only this metric, defaults to all.
+
+            start (int, optional): First step to read.
+
+            stop (int, optional): Step where to stop reading, not
+             included.
+
+        Returns:
+            Dict[str: List[Tuple[int, float, object]]]: The step, time
+            in seconds since the epoch and value of each point, ordered
+            by step.
+        """
+        self.flush_metrics()
+        return self.graph.args_context.get_metrics(
+            self.graph.name, self.name, name, start, stop)
+
+    def get_metric_index(self):
+        """Summarizes the node's metric streams without reading them.
+
+        Returns:
+            Dict[str: Tuple[int, int, object]]: The number of points,
+            the last step and its value of each metric name.
+        """
+        self.flush_metrics()
+        return self.graph.args_context.get_metric_index(
+            self.graph.name, self.name)
+
+    def _clear_metrics(self):
+        with self._metric_lock:
+            self._metric_buffer = []
+            self._metric_steps = {}
+        self.graph.args_context.clear_metrics(self.graph.name, self.name)
+
+    def get_timing(self):
+        """Durations and resource usage of the last `evaluate` and
+        `load` calls. They're recorded on every call.
+
+        Returns:
+            Dict[str: Dict[str: float]]: Maps `"evaluate"` and
+            `"load"` to dictionaries with the `"wall"`, `"cpu"`,
+            `"user"` and `"sys"` time in seconds, the
+            `"peak_rss_delta"`, `"read_bytes"` and `"write_bytes"`,
+            see :func:`rflow._profile.measure`. Calls never done are
+            absent.
+        """
+        return self.graph.args_context.get_timing(
+            self.graph.name, self.name)
+
+    def _save_timing(self, action, usage):
+        timing = self.get_timing()
+        timing[action] = usage
+        self.graph.args_context.set_timing(
+            self.graph.name, self.name, timing)
+
     def clear(self):
         resource = self.get_resource()
         if resource is not None:
             print("Removing resource {}".format(str(resource)))
             resource.erase()
+            self._invalidate_resource()
         self.graph.args_context.clean_node(
             self.graph.name, self.name)
 
@@ -0,0 +1,243 @@
+"""Profiling of node calls. A :class:`Profiler` set on a run dumps one
+`.pstats` file per `evaluate` and `load` call of the selected nodes,
+readable by :mod:`pstats` or tools like snakeviz::
+
+    profiler = rflow.profiler.Profiler("profile", ["train*"])
+    g.run("report", profiler=profiler)
+    for location, calls, tottime, cumtime in profiler.get_hot_functions():
+        ...
+
+There are two modes:
+
+* `"deterministic"`: :mod:`cProfile`, exact call counts, but slows
+  down Python-heavy nodes;
+
+* `"sampling"`: the node's stack is sampled every `interval` seconds
+  by another thread. The overhead is low, so it suits long nodes.
+  Times are estimates and call counts are the number of samples.
+"""
+
+import os
+import sys
+import time
+import fnmatch
+import marshal
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+
+from .common import WorkflowError
+
+DETERMINISTIC = "deterministic"
+SAMPLING = "sampling"
+
+MODES = [DETERMINISTIC, SAMPLING]
+
+DEFAULT_INTERVAL = 0.005
+
+
+class _Sampler:
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        # Maps functions to [samples, own time, total time, callers],
+        # on the layout of `pstats.Stats.stats`.
+        self.stats = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(  # pylint: disable=protected-access
+                self.thread_id)
+            self._add(frame)
+
+    def _add(self, frame):
+        callee = None
+        callee_is_leaf = False
+        seen = set()
+        while frame is not None:
+            code = frame.f_code
+            func = (code.co_filename, code.co_firstlineno, code.co_name)
+            entry = self.stats.setdefault(func, [0, 0.0, 0.0, {}])
+            if callee is None:
+                entry[1] += self.interval
+            if func not in seen:
+                seen.add(func)
+                entry[0] += 1
+                entry[2] += self.interval
+            if callee is not None:
+                caller = self.stats[callee][3].setdefault(
+                    func, [0, 0.0, 0.0])
+                caller[0] += 1
+                caller[2] += self.interval
+                if callee_is_leaf:
+                    caller[1] += self.interval
+            callee_is_leaf = callee is None
+            callee = func
+            frame = frame.f_back
+
+    def dump(self, path):
+        stats = {}
+        for func, (samples, tottime, cumtime, callers) in self.stats.items():
+            stats[func] = (samples, samples, tottime, cumtime, {
+                caller: (count, count, caller_tottime, caller_cumtime)
+                for caller, (count, caller_tottime, caller_cumtime)
+                in callers.items()})
+        with open(path, 'wb') as stream:
+            marshal.dump(stats, stream)
+
+
+@contextmanager
+def profile_call(mode, interval, path):
+    """Profiles the calling thread while in the context, and dumps the
+    stats on exit, even if the call fails.
+
+    Args:
+
+        mode (str): One of :data:`MODES`.
+
+        interval (float): Seconds between samples, for the sampling
+         mode.
+
+        path (str): Where the `.pstats` file is written.
+    """
+    profile = None
+    if mode == DETERMINISTIC:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another thread holds the interpreter's profiler.
+            profile = None
+
+    if profile is not None:
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(path)
+        return
+
+    sampler = _Sampler(threading.get_ident(), interval)
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        sampler.dump(path)
+
+
+class Profiler:
+    """Profiles the node calls of a run, see
+    :func:`rflow.core.Graph.run`.
+
+    Attributes:
+
+        directory (str): Where the `.pstats` files are written, one
+         subdirectory per run named by its start time. The files are
+         named by graph, node, action and call time.
+
+        patterns (List[str]): Names or shell-style globs of the
+         profiled nodes. `None` profiles all nodes.
+
+        mode (str): One of :data:`MODES`.
+
+        interval (float): Seconds between samples, for the sampling
+         mode.
+
+        run_directory (str): The subdirectory of the latest run.
+
+        dumps (List[str]): The files written so far.
+    """
+
+    def __init__(self, directory, patterns=None, mode=DETERMINISTIC,
+                 interval=DEFAULT_INTERVAL):
+        if mode not in MODES:
+            raise WorkflowError(
+                "Unknown profiling mode {}, use one of {}".format(
+                    mode, ', '.join(MODES)))
+        self.directory = os.path.abspath(directory)
+        self.patterns = patterns
+        self.mode = mode
+        self.interval = interval
+        self.dumps = []
+        self._run_start = None
+        self.run_directory = None
+        self._lock = threading.Lock()
+
+    def selects(self, node):
+        """Returns whatever a node is profiled.
+        """
+        if self.patterns is None:
+            return True
+        return any(fnmatch.fnmatchcase(node.name, pattern)
+                   for pattern in self.patterns)
+
+    def get_target(self, node, action, run):
+        """Returns how to profile a node call, for
+        :func:`profile_call`.
+
+        Args:
+
+            node (:obj:`rflow.node.Node`): The node.
+
+            action (str): `"evaluate"` or `"load"`.
+
+            run (:obj:`rflow._run.Run`): The active run.
+
+        Returns:
+            Tuple[str, float, str]: The mode, interval and dump path,
+            or `None` if the node isn't profiled.
+        """
+        if not self.selects(node):
+            return None
+
+        now = time.time()
+        with self._lock:
+            if self._run_start != run.start_time:
+                self._run_start = run.start_time
+                self.run_directory = os.path.join(
+                    self.directory, _format_time(run.start_time))
+                os.makedirs(self.run_directory, exist_ok=True)
+            filename = "{}.{}.{}.{}.pstats".format(
+                node.graph.name, node.name, action, _format_time(now))
+            path = os.path.join(self.run_directory,
+                                filename.replace(os.sep, '_'))
+            self.dumps.append(path)
+        return self.mode, self.interval, path
+
+    def get_hot_functions(self, top=20):
+        """Merges the dumped stats and returns the functions that took
+        the most time, not counting their callees.
+
+        Args:
+
+            top (int): How many functions.
+
+        Returns:
+            List[Tuple[str, int, float, float]]: The location, number
+            of calls, own time and total time of each function.
+        """
+        paths = [path for path in self.dumps if os.path.exists(path)]
+        if not paths:
+            return []
+
+        stats = pstats.Stats(*paths).stats  # pylint: disable=no-member
+        hot = sorted(stats.items(), key=lambda item: -item[1][2])[:top]
+        return [(pstats.func_std_string(func), calls, tottime, cumtime)
+                for func, (_, calls, tottime, cumtime, _) in hot]
+
+
+def _format_time(timestamp):
+    return "{}.{:06d}".format(
+        time.strftime("%Y%m%d-%H%M%S", time.localtime(timestamp)),
+        int(timestamp % 1 * 1000000))
@@ -11,6 +11,12 @@ try:
 except:
     import pickle
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from ._digest import file_digest, tree_digest, combine_digests
+
+
+MAX_WORKERS = 16
 
 
 class Resource(object):
@@ -26,6 +32,13 @@ class Resource(object):
     def get_hash(self):
         raise NotImplementedError()
 
+    def get_digest(self):
+        """Returns a digest of the resource's content, used instead of
+        :func:`get_hash` by downstream nodes of nodes with
+        `early_cutoff`. The default is the same as :func:`get_hash`.
+        """
+        return self.get_hash()
+
 
 class FSResource(Resource):
     """
@@ -34,13 +47,26 @@ class FSResource(Resource):
     Attributes:
 
         filepath (str): The file path.
+
+        hash_content (bool): If `True`, :func:`get_hash` is a digest
+         of the file's content instead of its modification time. So
+         touching or checking out a file with the same content doesn't
+         make its consumers dirty. Digests are cached in the workflow
+         database by the file's stat.
+
+        chunk_size (int): How many bytes are read at once while
+         hashing the content. `None` uses
+         :data:`rflow._digest.CHUNK_SIZE`.
     """
 
-    def __init__(self, filepath, rewritable=True, make_dirs=False):
+    def __init__(self, filepath, rewritable=True, make_dirs=False,
+                 hash_content=False, chunk_size=None):
         super(FSResource, self).__init__(rewritable)
         self.filepath = os.path.abspath(str(filepath))
         self._str = str(filepath)
         self.make_dirs = make_dirs
+        self.hash_content = hash_content
+        self.chunk_size = chunk_size
 
     def exists(self):
         """
@@ -61,10 +87,17 @@ class FSResource(Resource):
                 os.remove(self.filepath)
 
     def get_hash(self):
+        if self.hash_content:
+            return self.get_digest()
         if os.path.exists(self.filepath):
             return os.path.getmtime(self.filepath)
         return None
 
+    def get_digest(self):
+        if os.path.isdir(self.filepath):
+            return tree_digest(self.filepath, chunk_size=self.chunk_size)
+        return file_digest(self.filepath, self.chunk_size)
+
     def pickle_dump(self, obj):
         if self.make_dirs:
             Path(self.filepath).parent.mkdir(parents=True, exist_ok=True)
@@ -86,23 +119,82 @@ class FSResource(Resource):
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
-        return (self.get_hash() == other.get_hash()
-                and self.filepath == other.filepath)
+        # Hashes of the same path are only different if they're
+        # computed in different modes, so the file isn't queried.
+        return (self.filepath == other.filepath
+                and (getattr(self, 'hash_content', False)
+                     == getattr(other, 'hash_content', False)))
+
+
+class DirResource(FSResource):
+    """Represent a directory stored resource. Its hash is a Merkle
+    tree over the directory's files, so rewriting a nested file
+    changes it, while the directory's own modification time is
+    ignored. Only files whose stat changed since the last hashing are
+    read again.
+
+    Attributes:
+
+        include (List[str]): Glob patterns of the file paths, relative
+         to the directory, that are part of the resource. `None`
+         includes all files.
+
+        exclude (List[str]): Glob patterns of file or directory paths,
+         relative to the directory, to ignore, like temporary files.
+    """
+
+    def __init__(self, dirpath, rewritable=True, make_dirs=False,
+                 include=None, exclude=None, chunk_size=None):
+        super(DirResource, self).__init__(dirpath, rewritable, make_dirs,
+                                          hash_content=True,
+                                          chunk_size=chunk_size)
+        self.include = list(include) if include is not None else None
+        self.exclude = list(exclude) if exclude is not None else None
+
+    def get_digest(self):
+        return tree_digest(self.filepath, self.include, self.exclude,
+                           self.chunk_size)
+
+    def __repr__(self):
+        return "@DirResource: {}".format(self._str)
+
+    def __eq__(self, other):
+        # The filters select which files are hashed.
+        return (super(DirResource, self).__eq__(other)
+                and (getattr(self, 'include', None)
+                     == getattr(other, 'include', None))
+                and (getattr(self, 'exclude', None)
+                     == getattr(other, 'exclude', None)))
 
 
 class MultiResource(Resource):
-    """Represent multiple resources
+    """Represent multiple resources. Its members are checked and
+    hashed in parallel, which helps when they're many files on
+    network storage.
 
     Attributes:
 
         fsresource_list (:obj:`shaperetrieval.workflow.resource.FSResource):
          List of filesystem resource that composes this one.
 
+        max_workers (int): Maximum number of threads checking the
+         members, defaults to :data:`MAX_WORKERS`.
+
     """
 
-    def __init__(self, *fsresource_list, rewritable=True):
+    def __init__(self, *fsresource_list, rewritable=True, max_workers=None):
         super(MultiResource, self).__init__(rewritable)
         self.fsresource_list = fsresource_list
+        self.max_workers = max_workers
+
+    def _map(self, func):
+        if len(self.fsresource_list) < 2:
+            return [func(fsresource) for fsresource in self.fsresource_list]
+
+        max_workers = min(self.max_workers or MAX_WORKERS,
+                          len(self.fsresource_list))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(func, self.fsresource_list))
 
     def exists(self):
         """
@@ -113,20 +205,25 @@ class MultiResource(Resource):
             (bool): `True` if exists.
         """
 
-        return all((fsresource.exists() for fsresource in self.fsresource_list))
+        return all(self._map(lambda fsresource: fsresource.exists()))
 
     def erase(self):
         for fsresource in self.fsresource_list:
             fsresource.erase()
 
     def get_hash(self):
-        hash_list = [fsresource.get_hash()
-                     for fsresource in self.fsresource_list]
+        """Combines the members' hashes in order.
 
-        if any((hash_val is None for hash_val in hash_list)):
-            return None
+        Returns:
+            str: The combined digest, or `None` if any member hash is
+            `None`.
+        """
+        return combine_digests(
+            self._map(lambda fsresource: fsresource.get_hash()))
 
-        return sum(hash_list)
+    def get_digest(self):
+        return combine_digests(
+            self._map(lambda fsresource: fsresource.get_digest()))
 
     def __str__(self):
         return ('[' + ' '.join((str(fsresource)
@@ -0,0 +1,509 @@
+"""Graph execution scheduling. Finds which nodes a set of targets
+need and run them, possibly in parallel.
+"""
+
+import time
+import heapq
+import itertools
+from collections import namedtuple
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from . common import WorkflowError, NodeFailuresError, Uninit, BaseNode
+from . node import Node
+from . import _util as util
+from ._run import begin_run
+from ._ui import ui
+
+
+def get_node(edge):
+    """Returns the executable node behind an edge. Links, like
+    :class:`rflow.node.ReturnSelNodeLink`, are resolved to their
+    wrapped node.
+
+    Args:
+
+        edge (object): An edge value from :func:`rflow.node.Node.get_edges`.
+
+    Returns:
+        :obj:`rflow.node.Node`: The node or `None` if the edge isn't
+        schedulable, like constants or user arguments.
+
+    """
+    while not isinstance(edge, Node):
+        edge = getattr(edge, '_node', None)
+        if edge is None:
+            return None
+    return edge
+
+
+def get_upstream(node, edge_set=None):
+    """Returns the nodes that a node is directly connected to.
+
+    Args:
+
+        node (:obj:`rflow.node.Node`): The target node.
+
+        edge_set (Set[str], optional): Restrict to those argument
+         names. `None` means all arguments plus dependencies.
+
+    Returns:
+        List[:obj:`rflow.node.Node`]: Upstream nodes without
+        repetitions.
+
+    """
+    upstream = []
+    for _, edge in node.get_edges(edge_set):
+        if not isinstance(edge, BaseNode):
+            continue
+        edge = get_node(edge)
+        if edge is not None and edge not in upstream:
+            upstream.append(edge)
+    return upstream
+
+
+def topological_sort(targets):
+    """Sorts the targets and all their ancestors, so that every node
+    comes after its upstream nodes.
+
+    Args:
+
+        targets (List[:obj:`rflow.node.Node`]): Goal nodes.
+
+    Returns:
+        List[:obj:`rflow.node.Node`]: The sorted nodes.
+
+    """
+
+    order = []
+    visited = set()
+    for target in targets:
+        if target in visited:
+            continue
+        visited.add(target)
+        stack = [(target, iter(get_upstream(target)))]
+        while stack:
+            node, upstream_iter = stack[-1]
+            upstream = next(upstream_iter, None)
+            if upstream is None:
+                order.append(node)
+                stack.pop()
+            elif upstream not in visited:
+                visited.add(upstream)
+                stack.append((upstream, iter(get_upstream(upstream))))
+    return order
+
+
+def update_pass(targets, redo_set=()):
+    """Updates the dirty state of the targets and all their ancestors,
+    checking each node only once. Must be called inside a run, see
+    :func:`rflow._run.begin_run`, so nodes keep their state for the
+    rest of it.
+
+    Args:
+
+        targets (List[:obj:`rflow.node.Node`]): Goal nodes.
+
+        redo_set (Set[:obj:`rflow.node.Node`]): Nodes that should be
+         considered dirty, their downstream nodes become dirty too.
+
+    Returns:
+        List[:obj:`rflow.node.Node`]: The nodes in topological order.
+
+    """
+    # pylint: disable=protected-access
+    order = topological_sort(targets)
+    for node in order:
+        node.update()
+        if node in redo_set:
+            node._dirty = True
+    return order
+
+
+EVALUATE = "evaluate"
+LOAD = "load"
+SKIP = "skip"
+
+PlanEntry = namedtuple("PlanEntry", ["node", "action", "reasons", "duration"])
+PlanEntry.__doc__ = """What a run would do with a node.
+
+Attributes:
+
+    node (:obj:`rflow.node.Node`): The node.
+
+    action (str): One of `"evaluate"`, `"load"` or `"skip"`.
+
+    reasons (List[str]): Why the action was chosen.
+
+    duration (float): The wall time in seconds of the last time that
+     the action was done. `None` if it's unknown or skipped.
+"""
+
+
+def plan_to_dict(plan):
+    """Converts a plan into JSON serializable values.
+
+    Args:
+
+        plan (List[:obj:`PlanEntry`]): Plan from :func:`Scheduler.plan`.
+
+    Returns:
+        List[dict]: One dictionary per entry.
+    """
+    return [{"graph": entry.node.graph.name,
+             "node": entry.node.name,
+             "action": entry.action,
+             "reasons": entry.reasons,
+             "duration": entry.duration}
+            for entry in plan]
+
+
+class _Job:
+    def __init__(self, node, redo, action, reasons):
+        self.node = node
+        self.redo = redo
+        self.action = action
+        self.reasons = reasons
+        self.upstream = []
+        self.downstream = []
+        self.waiting = 0
+
+        timing = node.get_timing().get(action, {})
+        self.duration = timing.get("wall")
+        self.cost = 0.0
+        self.priority = 0.0
+
+    def __lt__(self, other):
+        # Ready jobs are popped with the longest critical path first.
+        return self.priority > other.priority
+
+
+class Scheduler:
+    """Runs the dirty part of a graph. Nodes are executed as soon as
+    all their upstream nodes are done, using up to `jobs`
+    threads. When more nodes are ready than free threads, the ones
+    with the longest remaining path to the targets start first. Path
+    lengths are estimated from previous call durations, see
+    :func:`rflow.node.Node.get_timing`.
+
+    Nodes may declare what they need from the machine with the
+    `requires` class attribute, like `{"cpu": 8, "mem_gb": 20}`. A
+    node only starts if its requirements fit in what the `budget`
+    has left. Names missing from the budget are unlimited.
+
+    Attributes:
+
+        jobs (int): Maximum number of nodes running at the same
+         time. `1` runs everything on the calling thread.
+
+        budget (Dict[str: float]): Machine resources shared by the
+         running nodes, like `{"cpu": 32, "mem_gb": 64, "gpu_slot": 2}`.
+
+        keep_going (bool): When a node fails, only its downstream
+         nodes are blocked and the independent ones still run. The
+         failures are reported at the end of the run.
+
+    """
+
+    def __init__(self, jobs=1, budget=None, keep_going=False):
+        if jobs < 1:
+            raise WorkflowError('Number of jobs must be positive')
+        self.jobs = jobs
+        self.budget = dict(budget) if budget is not None else {}
+        self.keep_going = keep_going
+
+    def collect(self, targets, redo=False):
+        """Finds the nodes that must be executed to get the
+        targets. Upstream nodes that are loaded or already have their
+        values are not visited further.
+
+        Args:
+
+            targets (List[:obj:`rflow.node.Node`]): Goal nodes.
+
+            redo (bool): Evaluate the targets even if they are updated.
+
+        Returns:
+            List[_Job]: Jobs in a topological order.
+
+        """
+        return self._collect(targets, redo)[1]
+
+    def plan(self, targets, redo=False):
+        """Tells what running the targets would do, without calling
+        any `evaluate` or `load`.
+
+        Args:
+
+            targets (List[:obj:`rflow.node.Node`]): Goal nodes.
+
+            redo (bool): Evaluate the targets even if they are updated.
+
+        Returns:
+            List[:obj:`PlanEntry`]: The targets and all their
+            ancestors in execution order.
+
+        """
+        order, job_list = self._collect(targets, redo)
+        jobs = {job.node: job for job in job_list}
+
+        plan = []
+        for node in order:
+            job = jobs.get(node)
+            if job is not None:
+                plan.append(PlanEntry(node, job.action, job.reasons,
+                                      job.duration))
+            elif node.value is not Uninit:
+                plan.append(PlanEntry(node, SKIP, ["value in memory"], None))
+            else:
+                plan.append(PlanEntry(node, SKIP, ["not needed"], None))
+        return plan
+
+    def estimate(self, targets, redo=False):
+        """Estimates the wall time of running the targets with this
+        scheduler's number of jobs. Uses the durations of the nodes'
+        previous calls, nodes never called are assumed to take the
+        average of the known ones.
+
+        Args:
+
+            targets (List[:obj:`rflow.node.Node`]): Goal nodes.
+
+            redo (bool): Evaluate the targets even if they are updated.
+
+        Returns:
+            float: Estimated seconds.
+
+        """
+        job_list = self.collect(targets, redo)
+        self._check_requirements(job_list)
+
+        clock = 0.0
+        ready = [job for job in job_list if job.waiting == 0]
+        heapq.heapify(ready)
+        running = []
+        available = dict(self.budget)
+        counter = itertools.count()
+        while ready or running:
+            for job in self._pop_startable(ready, len(running), available):
+                heapq.heappush(running, (clock + job.cost, next(counter), job))
+
+            clock, _, job = heapq.heappop(running)
+            self._release(job, available)
+            for downjob in job.downstream:
+                downjob.waiting -= 1
+                if downjob.waiting == 0:
+                    heapq.heappush(ready, downjob)
+        return clock
+
+    def _collect(self, targets, redo):
+        redo_set = set(targets) if redo else set()
+        with begin_run():
+            order = update_pass(targets, redo_set)
+            jobs = self._collect_jobs(targets, redo_set)
+
+        job_list = []
+        for node in order:
+            job = jobs.get(node)
+            if job is None:
+                continue
+            job.upstream = [jobs[upnode] for upnode in job.upstream
+                            if upnode in jobs]
+            job.waiting = len(job.upstream)
+            for upjob in job.upstream:
+                upjob.downstream.append(job)
+            job_list.append(job)
+
+        self._set_priorities(job_list)
+        return order, job_list
+
+    @staticmethod
+    def _set_priorities(job_list):
+        durations = [job.duration for job in job_list
+                     if job.duration is not None]
+        default_cost = sum(durations) / len(durations) if durations else 0.0
+
+        for job in reversed(job_list):
+            job.cost = job.duration if job.duration is not None else default_cost
+            job.priority = job.cost + max(
+                (downjob.priority for downjob in job.downstream), default=0.0)
+
+    @staticmethod
+    def _collect_jobs(targets, redo_set):
+        # pylint: disable=protected-access
+        jobs = {}
+        stack = list(reversed(targets))
+        while stack:
+            node = stack.pop()
+            if node in jobs:
+                continue
+            node._check_runnable()
+            is_redo = node in redo_set
+
+            if is_redo or node.is_dirty():
+                action = EVALUATE
+                reasons = (["redo requested"] if is_redo
+                           else node.get_dirty_reasons())
+                upstream = get_upstream(node, set(node.args._arg_names))
+                upstream.extend(get_node(dep) for dep in node.dependencies
+                                if dep.is_dirty())
+            elif node.value is not Uninit:
+                continue
+            elif node._is_loadable():
+                action = LOAD
+                reasons = ["arguments are unchanged"]
+                upstream = get_upstream(node, set(node.load_arg_list))
+            else:
+                action = EVALUATE
+                reasons = ["no value in memory and no load method"]
+                upstream = get_upstream(node, set(node.args._arg_names))
+
+            job = jobs[node] = _Job(node, is_redo, action, reasons)
+            job.upstream = [upnode for upnode in upstream
+                            if upnode is not None]
+            stack.extend(job.upstream)
+        return jobs
+
+    def run(self, targets, redo=False):
+        """Executes the targets and the dirty nodes that they depend on.
+
+        Args:
+
+            targets (List[:obj:`rflow.node.Node`]): Goal nodes.
+
+            redo (bool): Evaluate the targets even if they are updated.
+
+        Raises:
+            :obj:`rflow.common.NodeFailuresError`: On keep going
+            mode, if any node failed.
+
+        """
+        with begin_run():
+            order, job_list = self._collect(targets, redo)
+            self._append_skips(order, job_list)
+            if not job_list:
+                return
+            self._check_requirements(job_list)
+
+            failures = []
+            blocked = set()
+            work_directory = targets[0].graph.work_directory
+            with ExitStack() as stack:
+                stack.enter_context(util.work_directory(work_directory))
+                if self.keep_going:
+                    # Node errors must reach the scheduler instead of
+                    # exiting the process.
+                    stack.enter_context(ui.traceback_policy("raise-exp"))
+
+                if self.jobs == 1:
+                    for job in job_list:
+                        if job in blocked:
+                            continue
+                        try:
+                            job.node.call(redo=job.redo)
+                        # Evaluations calling `sys.exit` fail too.
+                        except (Exception, SystemExit) as exp:
+                            self._fail(job, exp, failures, blocked)
+                else:
+                    self._run_parallel(job_list, failures, blocked)
+
+            if failures:
+                now = time.time()
+                for job in job_list:
+                    if job in blocked:
+                        # pylint: disable=protected-access
+                        job.node._append_history(job.action, "blocked", now)
+                blocked = [job.node for job in job_list if job in blocked]
+                ui.print_failures(failures, blocked)
+                raise NodeFailuresError(failures, blocked)
+
+    @staticmethod
+    def _append_skips(order, job_list):
+        # Nodes that are updated also go to the run history.
+        # pylint: disable=protected-access
+        jobs = set(job.node for job in job_list)
+        now = time.time()
+        for node in order:
+            if node not in jobs:
+                node._append_history(SKIP, "ok", now)
+
+    def _fail(self, job, exp, failures, blocked):
+        if not self.keep_going:
+            raise exp
+        failures.append((job.node, exp))
+
+        stack = list(job.downstream)
+        while stack:
+            downjob = stack.pop()
+            if downjob not in blocked:
+                blocked.add(downjob)
+                stack.extend(downjob.downstream)
+
+    def _check_requirements(self, job_list):
+        for job in job_list:
+            for name, amount in job.node.requires.items():
+                if amount > self.budget.get(name, amount):
+                    raise WorkflowError(
+                        '{}: requires {} {}, but the budget is {}'.format(
+                            job.node.name, amount, name, self.budget[name]))
+
+    def _pop_startable(self, ready, num_running, available):
+        # Starts the highest priority jobs that fit in the available
+        # budget, the others wait for running ones to finish.
+        started = []
+        postponed = []
+        while ready and num_running + len(started) < self.jobs:
+            job = heapq.heappop(ready)
+            requires = job.node.requires
+            if all(amount <= available.get(name, amount)
+                   for name, amount in requires.items()):
+                for name, amount in requires.items():
+                    if name in available:
+                        available[name] -= amount
+                started.append(job)
+            else:
+                postponed.append(job)
+
+        for job in postponed:
+            heapq.heappush(ready, job)
+        return started
+
+    @staticmethod
+    def _release(job, available):
+        for name, amount in job.node.requires.items():
+            if name in available:
+                available[name] += amount
+
+    def _run_parallel(self, job_list, failures, blocked):
+        ready = [job for job in job_list if job.waiting == 0]
+        heapq.heapify(ready)
+        running = {}
+        available = dict(self.budget)
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            try:
+                while ready or running:
+                    for job in self._pop_startable(ready, len(running),
+                                                   available):
+                        running[pool.submit(
+                            job.node.call, redo=job.redo)] = job
+
+                    done, _ = wait(running.keys(),
+                                   return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = running.pop(future)
+                        self._release(job, available)
+                        try:
+                            future.result()
+                        except (Exception, SystemExit) as exp:
+                            # Downstream jobs of a failure never get
+                            # ready.
+                            self._fail(job, exp, failures, blocked)
+                            continue
+                        for downjob in job.downstream:
+                            downjob.waiting -= 1
+                            if downjob.waiting == 0:
+                                heapq.heappush(ready, downjob)
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
@@ -0,0 +1,182 @@
+"""Argument signatures. Nodes store the signature of their last
+evaluation arguments to know when they're dirty. Scalars are stored as
+they are, while containers, arrays, large strings and objects with a
+registered fingerprint are stored as a fixed-size
+:class:`ArgDigest`. So large arguments don't bloat the workflow
+database and are compared by content.
+
+Types can provide their own signature by implementing a
+`get_signature()` method, or by registering a fingerprint function::
+
+    rflow.signature.register_fingerprint(
+        MyDataset, lambda dataset: dataset.version)
+"""
+
+import reprlib
+import hashlib
+from enum import Enum
+
+from .resource import Resource
+
+MAX_RAW_STR_LEN = 256
+
+_FINGERPRINTS = {}
+
+_PREVIEW = reprlib.Repr()
+_PREVIEW.maxlist = _PREVIEW.maxtuple = _PREVIEW.maxset = _PREVIEW.maxdict = 3
+_PREVIEW.maxstring = 16
+_PREVIEW.maxother = 16
+
+
+class ArgDigest:
+    """Signature of an argument stored as a digest.
+
+    Attributes:
+
+        digest (str): Hexadecimal digest of the argument's content.
+
+        preview (str): Short representation of the argument, only for
+         showing diffs.
+    """
+
+    def __init__(self, digest, preview):
+        self.digest = digest
+        self.preview = preview
+
+    def __eq__(self, other):
+        return isinstance(other, ArgDigest) and self.digest == other.digest
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __repr__(self):
+        return "{}#{}".format(self.preview, self.digest[:8])
+
+
+def register_fingerprint(type_, func):
+    """Sets how arguments of a type are fingerprinted.
+
+    Args:
+
+        type_ (type): The argument type, subclasses use it too.
+
+        func (Callable[[object], object]): Returns a value that
+         identifies the argument content, which is fingerprinted
+         again, like a version string or bytes.
+    """
+    _FINGERPRINTS[type_] = func
+
+
+def _is_array(value):
+    return all(hasattr(value, attr) for attr in ("dtype", "shape", "tobytes"))
+
+
+def _update(hasher, value):
+    # pylint: disable=too-many-branches
+    if value is None or isinstance(value, (bool, int, float, complex)):
+        hasher.update("{}:{!r};".format(type(value).__name__, value).encode())
+    elif isinstance(value, str):
+        hasher.update("str:{}:".format(len(value)).encode())
+        hasher.update(value.encode())
+    elif isinstance(value, (bytes, bytearray)):
+        hasher.update("bytes:{}:".format(len(value)).encode())
+        hasher.update(value)
+    elif isinstance(value, Enum):
+        hasher.update("enum:{}.{}:{};".format(
+            type(value).__module__, type(value).__qualname__,
+            value.name).encode())
+    elif isinstance(value, type) or callable(value) and hasattr(value, '__qualname__'):
+        hasher.update("ref:{}.{};".format(
+            value.__module__, value.__qualname__).encode())
+    elif _get_registered(value) is not None:
+        hasher.update("reg:{}:".format(type(value).__qualname__).encode())
+        _update(hasher, _get_registered(value)(value))
+    elif hasattr(value, 'get_signature'):
+        hasher.update(b"sig:")
+        _update(hasher, value.get_signature())
+    elif isinstance(value, (list, tuple)):
+        hasher.update("{}:{}[".format(type(value).__name__,
+                                      len(value)).encode())
+        for item in value:
+            _update(hasher, item)
+        hasher.update(b"]")
+    elif isinstance(value, (set, frozenset)):
+        hasher.update("set:{}{{".format(len(value)).encode())
+        for item_digest in sorted(fingerprint(item) for item in value):
+            hasher.update(item_digest.encode())
+        hasher.update(b"}")
+    elif isinstance(value, dict):
+        hasher.update("dict:{}{{".format(len(value)).encode())
+        for key_digest, item in sorted((fingerprint(key), item)
+                                       for key, item in value.items()):
+            hasher.update(key_digest.encode())
+            _update(hasher, item)
+        hasher.update(b"}")
+    elif _is_array(value):
+        hasher.update("array:{}:{}:".format(value.dtype,
+                                            tuple(value.shape)).encode())
+        hasher.update(value.tobytes())
+    else:
+        raise TypeError("Can't fingerprint {}".format(type(value).__name__))
+
+
+def _get_registered(value):
+    for type_ in type(value).__mro__:
+        func = _FINGERPRINTS.get(type_)
+        if func is not None:
+            return func
+    return None
+
+
+def fingerprint(value):
+    """Computes a stable digest of a value's content.
+
+    Args:
+
+        value (object): Scalars, strings, bytes, containers of those,
+         array-like objects with `dtype`, `shape` and `tobytes`, or
+         objects with `get_signature` or a registered fingerprint.
+
+    Returns:
+        str: Hexadecimal digest.
+
+    Raises:
+        TypeError: If the value or any item can't be fingerprinted.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    _update(hasher, value)
+    return hasher.hexdigest()
+
+
+# Signatures are fingerprinted again for artifact cache keys.
+register_fingerprint(ArgDigest, lambda value: value.digest)
+
+
+def get_signature(value):
+    """Returns what is stored in a node signature for an argument
+    value.
+
+    Args:
+
+        value (object): The argument value.
+
+    Returns:
+        object: The value itself for scalars, short strings and
+        resources. An :class:`ArgDigest` for other values that can be
+        fingerprinted. The value itself if it can't be.
+    """
+    if (value is None or isinstance(value, (bool, int, float, Enum, type,
+                                            Resource))
+            or isinstance(value, str) and len(value) <= MAX_RAW_STR_LEN):
+        return value
+
+    if hasattr(value, 'get_signature') and _get_registered(value) is None:
+        signature = value.get_signature()
+        if signature is not value:
+            return get_signature(signature)
+
+    try:
+        digest = fingerprint(value)
+    except TypeError:
+        return value
+    return ArgDigest(digest, _PREVIEW.repr(value))
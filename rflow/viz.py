@@ -10,6 +10,7 @@ import graphviz
 
 from .core import BaseNode
 from .node import Node, ReturnSelNodeLink, DependencyLink
+from ._ui import format_usage
 
 
 def _break_multi_line(string, max_line=40):
@@ -83,17 +84,29 @@ def dag2dot(graph):
 
     outgraph_nodes = set()
 
-    def _put_measurement(node, link_id_gen=link_id_gen):
+    def _put_box(node, label, fillcolor, link_id_gen=link_id_gen):
+        box_id = link_id_gen()
+        dot.node(box_id, label, shape="box", style="filled",
+                 fontname="monospace", fillcolor=fillcolor)
+        dot.edge(node.name, box_id)
+
+    def _put_measurement(node):
         if not isinstance(node, Node):
             return
         meas = node.get_measurement()
-        if not meas:
-            return
-        meas_id = link_id_gen()
-        meas = tabulate(meas)
-        dot.node(meas_id, str(meas), shape="box", style="filled",
-                 fontname="monospace", fillcolor="MistyRose")
-        dot.edge(node.name, meas_id)
+        for name, (_, last_step, last_value) in sorted(
+                node.get_metric_index().items()):
+            meas["{}@{}".format(name, last_step)] = last_value
+        if meas:
+            _put_box(node, str(tabulate(meas)), "MistyRose")
+
+        # On its own box, apart from the user's measurements.
+        usage_lines = []
+        for action, usage in sorted(node.get_timing().items()):
+            usage_lines.append("{}:".format(action))
+            usage_lines.extend(format_usage(usage).split(", "))
+        if usage_lines:
+            _put_box(node, "\n".join(usage_lines), "Lavender")
 
     for node in graph.node_list:
         dot.node(node.name, _break_multi_line(node.get_view_name()),
@@ -46,3 +46,42 @@ command:
 
 graph:
 	python -m unittest rflow._test.test_graph
+
+scheduler:
+	python -m unittest rflow._test.test_scheduler
+
+executor:
+	python -m unittest rflow._test.test_executor
+
+resource:
+	python -m unittest rflow._test.test_resource
+
+signature:
+	python -m unittest rflow._test.test_signature
+
+cache:
+	python -m unittest rflow._test.test_cache
+
+garbage:
+	python -m unittest rflow._test.test_garbage
+
+argument:
+	python -m unittest rflow._test.test_argument
+
+encoding:
+	python -m unittest rflow._test.test_encoding
+
+process:
+	python -m unittest rflow._test.test_process
+
+history:
+	python -m unittest rflow._test.test_history
+
+metric:
+	python -m unittest rflow._test.test_metric
+
+profile:
+	python -m unittest rflow._test.test_profile
+
+profiler:
+	python -m unittest rflow._test.test_profiler